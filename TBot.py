@@ -12,25 +12,27 @@ import asyncio
 import aiohttp
 import config
 
-from mysql.connector.errors import OperationalError
-from sqlalchemy import exc
-
 from loaders.loader import Loader, LoaderResponse, LoaderRequest
 from loaders.internet_loader import InternetLoader
 from loaders.file_loader import FileLoader
 from loaders.db_loader import DBLoader
-from send_service import send_dev_message
+from send_service import send_dev_message, dev_notifier
 from helpers import now_time, get_hash_name
 from loggers import get_logger, get_conversation_logger, init_dirs
 from exceptions import TBotException
 from users import tbot_users
 from localization import localization
+from stores.file_ids import file_ids
+from extentions import session_scope
 
 init_dirs()
 
 logger = get_logger(__name__)
 conversation_logger = get_conversation_logger()
 
+# ошибки Telegram, если сохраненный file_id устарел или неверен
+FILE_ID_ERRORS = ('file identifier', 'file_reference_expired')
+
 
 class TBot:
     """
@@ -47,6 +49,7 @@ class TBot:
         TBot.bot = telebot.TeleBot(config.TOKEN)
         TBot.check_bot_connection(TBot.bot)
         TBot.init_loaders()
+        dev_notifier.start()
         TBot.mapping = {
             'exchange': TBot.internet_loader.get_exchange,
             'weather': TBot.internet_loader.get_weather,
@@ -172,7 +175,7 @@ class TBot:
         TBot.internet_loader = InternetLoader()
         TBot.db_loader = DBLoader()
         TBot.file_loader = FileLoader()
-
+        TBot.internet_loader.run_background_tasks()
 
 
     @staticmethod
@@ -216,9 +219,13 @@ class TBot:
                 current_try += 1
                 try:
                     if photo is not None:
-                        if 'http' not in photo:
-                            photo = open(photo, 'rb')
-                        TBot.bot.send_photo(chat_id, photo=photo, caption=text)
+                        if os.path.exists(photo):
+                            with open(photo, 'rb') as photo_file:
+                                sent = TBot.bot.send_photo(chat_id, photo=photo_file, caption=text)
+                        else:
+                            sent = TBot.bot.send_photo(chat_id, photo=photo, caption=text)
+                        if replace.photo_key and sent.photo:
+                            file_ids.set(replace.photo_key, sent.photo[-1].file_id)
                     elif text is not None:
                         if start + config.MESSAGE_MAX_LEN >= len(replace.text):
                             TBot.bot.send_message(chat_id, text[start:],
@@ -240,6 +247,14 @@ class TBot:
                     logger.exception(f'File not ready yet: {te}')
                     time.sleep(1)
                 except telebot.apihelper.ApiException as e:
+                    if photo != replace.photo_file and replace.photo_key and replace.photo_file \
+                            and any(error in str(e).lower() for error in FILE_ID_ERRORS):
+                        # file_id отклонен, фото загружается заново из локального файла
+                        logger.warning(f'file_id of {replace.photo_key} is rejected: {e}')
+                        file_ids.discard(replace.photo_key)
+                        photo = replace.photo_file
+                        current_try -= 1
+                        continue
                     logger.exception(f'Message to {chat_id} is not send')
                     raise TBotException(code=1)
                 except Exception as ex:
@@ -257,6 +272,7 @@ class TBot:
                     break
 
     @staticmethod
+    @session_scope()
     def replace(message) -> LoaderResponse:
         """
         Send result message to chat
@@ -271,34 +287,20 @@ class TBot:
             first_name = message.json['chat'].get('first_name', None)
             if chat_id not in tbot_users:
                 privileges = Loader.privileges_levels['regular']
-                try:
-                    TBot.db_loader.add_user(
-                        chat_id=chat_id,
-                        privileges=privileges,
-                        login=login,
-                        first_name=first_name
-                    )
-                except (OperationalError, exc.OperationalError) as e:
-                    send_data = dict(
-                        subject=f'TBot DB connection error',
-                        text=f'{e}'
-                    )
-                    send_dev_message(data=send_data, by='telegram')
-                    TBot.internet_loader.tbot_restart(privileges=privileges)  
-                send_data = dict(
-                    subject='TBot NEW USER',
-                    text=f'New user added. Chat_id: {chat_id}, login: {login}, first_name: {first_name}'
+                TBot.db_loader.add_user(
+                    chat_id=chat_id,
+                    privileges=privileges,
+                    login=login,
+                    first_name=first_name
+                )
+                dev_notifier.notify(
+                    'TBot NEW USER',
+                    f'New user added. Chat_id: {chat_id}, login: {login}, first_name: {first_name}'
                 )
-                mail_resp = send_dev_message(send_data, 'mail')
-                if mail_resp and mail_resp['res'] == 'ERROR':
-                    logger.warning(f'Message do not received. MAIL = {mail_resp}')
-                telegram_resp = send_dev_message(send_data, 'telegram')
-                if telegram_resp and telegram_resp['res'] == 'ERROR':
-                    logger.warning(f'Message do not received. Telegram = {telegram_resp}')
             else:
                 if tbot_users(chat_id).login != login or \
                         tbot_users(chat_id).first_name != first_name:
-                    DBLoader.update_user(chat_id, login, first_name)
+                    TBot.db_loader.update_user(chat_id, login, first_name)
         privileges = tbot_users(chat_id).privileges
         if message.content_type == 'text':
             form_text = message.text.strip().rstrip()
@@ -310,16 +312,6 @@ class TBot:
                 privileges=privileges,
                 chat_id=chat_id
             )
-            log_request = None
-            if config.USE_DB:
-                try:
-                    log_request = TBot.db_loader.log_request(
-                        chat_id=chat_id
-                    )
-                except (OperationalError, exc.OperationalError) as e:
-                    send_data = dict(subject=f'TBot DB connection error', text=f'{e}')
-                    send_dev_message(data=send_data, by='telegram')
-                    TBot.internet_loader.tbot_restart(request=request)
             try:
                 res = asyncio.run(func(request=request)) \
                     if inspect.iscoroutinefunction(func.__wrapped__) \
@@ -330,8 +322,14 @@ class TBot:
                 RuntimeError
             ):
                 pass
-            if config.USE_DB and action in TBot.mapping.keys() and res.is_extra_log:
-                res.extra_log(request_id=log_request.lr_id, action=action)
+            finally:
+                # запрос логируется и при ошибке обработчика, со временем поступления
+                if config.USE_DB:
+                    TBot.db_loader.log_request(
+                        chat_id=chat_id,
+                        action=action if action in TBot.mapping.keys() and res.is_extra_log else None,
+                        date_ins=start
+                    )
         duration = datetime.datetime.now() - start
         dur = float(str(duration.seconds) + '.' + str(duration.microseconds)[:3])
         logger.info(f'Duration: {dur} sec')
@@ -0,0 +1,146 @@
+"""
+Async access to DB for coroutine handlers
+The same models are used, queries are executed by async SQLAlchemy engine (aiomysql, aiosqlite for tests)
+"""
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import config
+import models as md
+from extentions import db
+from rollups import count_requests, upsert_statements, stat_daily_query, stat_actions_query, stat_users_query
+
+SYNC_TO_ASYNC_DRIVERS = {
+    'mysql+mysqlconnector': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_url(url: str) -> str:
+    """
+    Get URL with async driver by URL of sync engine
+    """
+    scheme, rest = url.split('://', 1)
+    return f'{SYNC_TO_ASYNC_DRIVERS.get(scheme, scheme)}://{rest}'
+
+
+class AsyncDB:
+    """
+    Async DB layer: user lookup, request logging, poems and statistics
+    """
+
+    def __init__(self, url: str = None, **engine_options):
+        """
+        :param url: DB URL with async driver, by default config.DB['async_connection_string']
+        or URL of sync engine with async driver
+        """
+        url = url or config.DB.get('async_connection_string') or async_url(config.DB.get('connection_string'))
+        if url.startswith('sqlite'):
+            # в SQLite нет схем, таблицы TBot.* создаются в основной базе
+            engine_options.setdefault('execution_options', {'schema_translate_map': {'TBot': None}})
+        else:
+            engine_options.setdefault('pool_size', config.DB.get('pool_size', 5))
+            engine_options.setdefault('max_overflow', config.DB.get('max_overflow', 10))
+            engine_options.setdefault('pool_timeout', config.DB.get('pool_timeout', 10))
+            engine_options.setdefault('pool_recycle', config.DB.get('pool_recycle') or -1)
+            engine_options.setdefault('pool_pre_ping', config.DB.get('pool_pre_ping', True))
+        self.engine = create_async_engine(url, **engine_options)
+        self.session = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create_all(self) -> None:
+        """
+        Create tables of models (for local stand-in DB)
+        """
+        async with self.engine.begin() as conn:
+            await conn.run_sync(db.Model.metadata.create_all)
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+
+    async def get_user(self, chat_id: str):
+        """
+        Get user with privileges value
+        :return: row (chat_id, login, first_name, value, description, active) or None
+        """
+        async with self.session() as session:
+            result = await session.execute(
+                select(
+                    md.Users.chat_id,
+                    md.Users.login,
+                    md.Users.first_name,
+                    md.LibPrivileges.value,
+                    md.Users.description,
+                    md.Users.active
+                ).join(
+                    md.LibPrivileges,
+                    md.Users.privileges_id == md.LibPrivileges.p_id
+                ).where(
+                    md.Users.chat_id == chat_id
+                )
+            )
+            return result.one_or_none()
+
+    async def _upsert_counts(self, session: AsyncSession, model, counts) -> None:
+        for statement, insert in upsert_statements(model, counts, self.engine.dialect.name):
+            if not (await session.execute(statement)).rowcount and insert is not None:
+                await session.execute(insert)
+
+    async def log_requests(self, records: list) -> None:
+        """
+        Insert batch of requests info and add it to statistics rollups in one transaction
+        :param records: [{'chat_id': ..., 'date_ins': datetime, 'action': ...}, ...]
+        """
+        async with self.session() as session:
+            async with session.begin():
+                await session.execute(md.LogRequests.__table__.insert(), records)
+                for model, counts in count_requests(records).items():
+                    await self._upsert_counts(session, model, counts)
+
+    async def get_poem(self, poem_id: int):
+        """
+        :return: row (p_id, author, name, text) or None
+        """
+        async with self.session() as session:
+            result = await session.execute(
+                select(md.Poems.p_id, md.Poems.author, md.Poems.name, md.Poems.text).where(md.Poems.p_id == poem_id)
+            )
+            return result.one_or_none()
+
+    async def get_poems(self, poems_ids: list) -> list:
+        """
+        Get poems in order of ids
+        """
+        async with self.session() as session:
+            result = await session.execute(
+                select(md.Poems.p_id, md.Poems.author, md.Poems.name, md.Poems.text).where(
+                    md.Poems.p_id.in_(poems_ids)
+                )
+            )
+            poems = {poem.p_id: poem for poem in result}
+        return [poems[poem_id] for poem_id in poems_ids if poem_id in poems]
+
+    async def _all(self, query) -> list:
+        async with self.session() as session:
+            return (await session.execute(query)).all()
+
+    async def stat_daily(self, day_from: datetime.date = None) -> list:
+        """
+        :return: [(day, count), ...]
+        """
+        return await self._all(stat_daily_query(day_from))
+
+    async def stat_actions(self, day_from: datetime.date = None) -> list:
+        """
+        :return: [(action, count), ...], the most popular first
+        """
+        return await self._all(stat_actions_query(day_from))
+
+    async def stat_users(self, day_from: datetime.date = None) -> list:
+        """
+        :return: [(count, login, first_name), ...], the most active first
+        """
+        return await self._all(stat_users_query(day_from))
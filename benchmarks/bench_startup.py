@@ -0,0 +1,64 @@
+"""
+Startup benchmark of data layer: plain SQLAlchemy engine and session against Flask app with flask_sqlalchemy
+Each variant runs in a fresh interpreter, import time and max RSS of the process are measured.
+The plain variant imports extentions, so it includes config, db_pool and the bot's db object
+python -m benchmarks.bench_startup
+"""
+import sys
+import subprocess
+import textwrap
+
+MEASURE = '''
+import time
+import resource
+start = time.perf_counter()
+{setup}
+class Item(db.Model):
+    __tablename__ = 'items'
+    i_id = db.Column(db.Integer, primary_key=True)
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+VARIANTS = {
+    'sqlalchemy': '''
+        import threading
+        from extentions import SQLAlchemy
+        db = SQLAlchemy('sqlite://', session_options={'scopefunc': threading.get_ident})
+    ''',
+    'flask_sqlalchemy': '''
+        from flask import Flask
+        from flask_sqlalchemy import SQLAlchemy
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db = SQLAlchemy(app)
+    ''',
+}
+
+
+def run(setup: str) -> tuple or None:
+    """
+    :return: (seconds, max RSS in KB) or None, if the variant can not be imported
+    """
+    code = MEASURE.format(setup=textwrap.dedent(setup).strip())
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if res.returncode:
+        return None
+    elapsed, rss = res.stdout.split()
+    return float(elapsed), int(rss)
+
+
+def bench(repeat: int = 5) -> None:
+    for name, setup in VARIANTS.items():
+        results = [run(setup) for _ in range(repeat)]
+        if None in results:
+            print(f'{name:18} is not installed')
+            continue
+        elapsed = sorted(result[0] for result in results)[repeat // 2]
+        rss = sorted(result[1] for result in results)[repeat // 2]
+        print(f'{name:18} startup: {elapsed * 1000:8.1f} ms, max RSS: {rss / 1024:6.1f} MB')
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,123 @@
+import time
+import threading
+from functools import wraps
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from deadline import Deadline
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+DISCONNECT_ERRNOS = (2006, 2013, 2055)  # MySQL server has gone away, Lost connection
+
+
+class PoolMetrics:
+    """
+    Counters of connection pool: checkouts, waiting for connection, timeouts and retried disconnects
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def add_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def add_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def add_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def as_dict(self, pool=None) -> dict:
+        """
+        :param pool: pool to add its current state (size, checked out, overflow)
+        """
+        with self._lock:
+            metrics = {
+                'checkouts': self.checkouts,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'timeouts': self.timeouts,
+                'retries': self.retries,
+            }
+        if pool is not None:
+            metrics.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return metrics
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool, which measures time of waiting for connection
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.add_timeout()
+            raise
+        pool_metrics.add_wait(time.perf_counter() - start)
+        return connection
+
+
+def is_disconnect(error: Exception) -> bool:
+    """
+    Is error caused by lost DB connection
+    """
+    if isinstance(error, exc.DBAPIError) and error.connection_invalidated:
+        return True
+    return getattr(getattr(error, 'orig', error), 'errno', None) in DISCONNECT_ERRNOS
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Can write be repeated later: DB is unreachable or connection is lost
+    """
+    return isinstance(error, exc.OperationalError) or is_disconnect(error)
+
+
+def retry_on_disconnect(session, retries: int = 2, backoff: float = 0.2):
+    """
+    Decorator, which repeats function with a new connection if DB connection is lost
+    Function must be safe to repeat (read only or single transaction).
+    It is not repeated, if the current deadline of request is passed before retry
+    :param session: scoped session, it is reset before retry
+    :param retries: count of retries
+    :param backoff: delay before the first retry, it is doubled for each next retry
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrap(*args, **kwargs):
+            for attempt in range(retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except exc.DBAPIError as e:
+                    if attempt == retries or not is_disconnect(e):
+                        raise
+                    delay = backoff * 2 ** attempt
+                    deadline = Deadline.current()
+                    if deadline is not None and deadline.remaining() <= delay:
+                        raise
+                    logger.warning(f'DB connection is lost, retry {func.__qualname__}: {e}')
+                    pool_metrics.add_retry()
+                    session.rollback()
+                    session.remove()
+                    time.sleep(delay)
+        return wrap
+    return decorator
@@ -0,0 +1,57 @@
+import time
+from contextvars import ContextVar
+
+DEADLINE_MESSAGE = 'Источник отвечает слишком долго, попробуйте позже'
+
+_current_deadline = ContextVar('deadline', default=None)
+
+
+class Deadline:
+    """
+    Time budget of request
+    Deadline can be activated for a block of code ("with deadline:"),
+    then nested calls can get it by Deadline.current()
+    """
+
+    min_timeout = 0.5
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._tokens = []
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default: float = None) -> float:
+        """
+        Timeout for blocking call: remaining time, but not more than default
+        """
+        remaining = max(self.remaining(), self.min_timeout)
+        return min(remaining, default) if default else remaining
+
+    @staticmethod
+    def current():
+        """
+        Get activated deadline or None
+        """
+        return _current_deadline.get()
+
+    @staticmethod
+    def current_timeout(default: float = None) -> float:
+        deadline = _current_deadline.get()
+        return deadline.timeout(default) if deadline else default
+
+    def __enter__(self):
+        self._tokens.append(_current_deadline.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_deadline.reset(self._tokens.pop())
+
+    def __repr__(self):
+        return f'Deadline({self.seconds}s, remaining {self.remaining():.3f}s)'
@@ -12,6 +12,7 @@ RESPONSE_CODES_MAPPING = {
     6: 'PARAMETERS_ERROR',
     7: 'CACHE_ERROR',
     8: 'MARKUP_ERROR',
+    9: 'DEADLINE_ERROR',
     100: 'UNKNOWN_ERROR'
 }
 
@@ -1,11 +1,96 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+import threading
+from contextlib import contextmanager
+
+import sqlalchemy
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker, Session
 
 import config
+import sqlite_backend
+from db_pool import MeteredQueuePool
+
+
+class BoundSession(Session):
+    """
+    Session bound to engine of SQLAlchemy object, engine is created on first query
+    """
+
+    def __init__(self, db, **options):
+        self._db = db
+        super().__init__(**options)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return self._db.engine
+
+
+class SQLAlchemy:
+    """
+    Plain SQLAlchemy engine, thread scoped session and declarative base with Model.query
+    (the part of flask_sqlalchemy, which is used by bot, without Flask app)
+    Column types and functions of sqlalchemy are available as attributes: db.Column, db.Integer, ...
+    """
+
+    def __init__(self, url: str, engine_options: dict = None, session_options: dict = None):
+        """
+        :param url: DB URL
+        :param engine_options: keyword arguments of create_engine
+        :param session_options: keyword arguments of sessionmaker and 'scopefunc' of scoped session
+        """
+        self.url = url
+        self.engine_options = engine_options or {}
+        session_options = dict(session_options or {})
+        scopefunc = session_options.pop('scopefunc', None)
+        self.session = scoped_session(sessionmaker(class_=BoundSession, db=self, **session_options),
+                                      scopefunc=scopefunc)
+        self.Model = declarative_base()
+        self.Model.query = self.session.query_property()
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> sqlalchemy.engine.Engine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = sqlalchemy.create_engine(self.url, **self.engine_options)
+        return self._engine
+
+    def create_all(self) -> None:
+        self.Model.metadata.create_all(self.engine)
+
+    def __getattr__(self, name):
+        return getattr(sqlalchemy, name)
+
+
+engine_options = {
+    'poolclass': MeteredQueuePool,
+    'pool_recycle': config.DB.get('pool_recycle') or -1,
+    'pool_size': config.DB.get('pool_size', 5),
+    'max_overflow': config.DB.get('max_overflow', 10),
+    'pool_timeout': config.DB.get('pool_timeout', 10),
+    'pool_pre_ping': config.DB.get('pool_pre_ping', True),
+    'connect_args': {'connection_timeout': config.DB.get('connect_timeout', 10)},
+}
+if sqlite_backend.is_sqlite(config.DB.get('connection_string')):
+    engine_options = sqlite_backend.engine_options(config.DB.get('connection_string'), engine_options)
+# сессия своя у каждого потока, объекты остаются доступны после commit и закрытия сессии
+db = SQLAlchemy(
+    config.DB.get('connection_string'),
+    engine_options=engine_options,
+    session_options={'scopefunc': threading.get_ident, 'expire_on_commit': False}
+)
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = config.DB.get('connection_string')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_POOL_RECYCLE'] = config.DB.get('pool_recycle')
 
-db = SQLAlchemy(app)
+@contextmanager
+def session_scope():
+    """
+    Unit of work (one update from user): session of the current thread is rolled back on error
+    and removed at the end, so the next unit in the same thread of pool starts with a clean session.
+    Can be used as decorator
+    """
+    try:
+        yield db.session
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.remove()
@@ -30,10 +30,15 @@ class Graph:
     }
 
     @staticmethod
-    def get_base_graph(base: BaseGraphInfo):
+    def get_base_graph(base: BaseGraphInfo, file_name: str = None):
+        """
+        Render graph to tmp directory
+        :param file_name: name of file, it is overwritten (atomically), by default a new file is created
+        :return: path to image
+        """
         if not os.path.exists('tmp'):
             os.mkdir('tmp')
-        img_path = os.path.join('tmp', f'{base.type}_{now_time()}.png')
+        img_path = os.path.join('tmp', file_name or f'{base.type}_{now_time()}.png')
         plt.figure(figsize=(15, 5 * len(base.subplots)))
         colors = None
         for i, splot in enumerate(base.subplots):
@@ -47,6 +52,12 @@ class Graph:
             plt.xlabel(splot.xname, fontsize=14)
             plt.ylabel(splot.yname, fontsize=14)
             plt.grid()
-        plt.savefig(img_path)
+        if file_name:
+            # график может отправляться в это время, поэтому файл заменяется целиком
+            tmp_path = f'{img_path}.tmp.png'
+            plt.savefig(tmp_path)
+            os.replace(tmp_path, img_path)
+        else:
+            plt.savefig(img_path)
         plt.close()
         return img_path
@@ -1,13 +1,16 @@
+import os
 import random
 import datetime
+import threading
 from mysql.connector.errors import OperationalError
 import traceback
-from sqlalchemy import cast, Date, exc, desc
+from sqlalchemy import exc, bindparam
 from sqlalchemy.sql import func
 
 import config
 
 from loaders.loader import Loader, check_permission, LoaderResponse, LoaderRequest
+from loaders.privileges import privileges as privileges_map
 from helpers import (
     dict_to_str,
     cut_commands,
@@ -16,14 +19,28 @@ from helpers import (
 import models as md
 from extentions import db
 from markup import custom_markup
-from send_service import send_dev_message
+from send_service import send_dev_message, dev_notifier
 from loggers import get_logger
 from exceptions import TBotException
 from graph import Graph, BaseGraphInfo, BaseSubGraphInfo
 from users import tbot_users
+from deadline import Deadline, DEADLINE_MESSAGE
+from write_behind import WriteBehind
+from db_pool import pool_metrics, retry_on_disconnect, is_transient
+import rollups
+import sqlite_backend
+from workers import PeriodicWorker
+from stores.spool import Spool
+from stores.id_index import IdIndex
+from stores.cache import LRUCache
+from stores.search_index import SearchIndex
+from stores.quatrains import quatrain_offsets, quatrains_count, is_divination_poem, get_quatrain
 
 logger = get_logger(__name__)
 
+# стихи читаются строками, а не объектами ORM: их можно хранить в кэше без привязки к сессии
+POEM_COLUMNS = (md.Poems.p_id, md.Poems.author, md.Poems.name, md.Poems.text)
+
 
 class DBLoader(Loader):
     """
@@ -32,31 +49,113 @@ class DBLoader(Loader):
 
     def __init__(self):
         if config.USE_DB:
+            self.spool = Spool(getattr(config, 'SPOOL_FILE', os.path.join('file_db', 'spool.jsonl')))
+            self._spool_lock = threading.Lock()  # проверка и дополнение журнала, без записи в БД
+            self._spooling = False
+            # записи, отклоненные БД (нарушение ключей и т.п.), для ручного разбора
+            self.dead_letters = Spool(getattr(config, 'DEAD_LETTER_FILE',
+                                              os.path.join('file_db', 'dead_letters.jsonl')))
+            self._spool_handlers = {
+                'log_requests': self._insert_log_requests,
+                'add_user': self._insert_user,
+                'add_users': self._insert_users,
+                'update_user': self._update_user_row,
+                'update_users': self._update_user_rows,
+            }
+            self.spool_worker = PeriodicWorker(
+                'spool_replay',
+                self.replay_spool,
+                getattr(config, 'SPOOL_REPLAY_INTERVAL', 30)
+            )
+            self.spool_worker.start()
+            self.poem_ids = IdIndex(
+                'poem_ids',
+                lambda: (p_id for p_id, in db.session.query(md.Poems.p_id).order_by(md.Poems.p_id)),
+                self._poems_signature
+            )
+            self.poems_cache = LRUCache(getattr(config, 'POEM_CACHE_SIZE', 256))
+            self.fts = sqlite_backend.is_sqlite(db.url)
+            self.poem_search = None
+            self.poem_quatrains = None
+            self.divination_ids = []
+            self._divination_lock = threading.Lock()  # пул стихов для гадания меняется из разных потоков
+            self._poem_search_signature = None
+            self.poems_worker = PeriodicWorker(
+                'poems',
+                self.refresh_poems,
+                getattr(config, 'POEM_IDS_REFRESH_INTERVAL', 10 * 60)
+            )
+            self.poems_worker.start()
+            # пользователи пишутся раньше их запросов и профилей
+            self.new_users = WriteBehind(
+                'new_users',
+                self._write_new_users,
+                batch_size=getattr(config, 'NEW_USERS_BATCH_SIZE', 100),
+                interval=getattr(config, 'NEW_USERS_FLUSH_INTERVAL', 1),
+                is_retryable=is_transient,
+                dead_letter=self._reject_new_users
+            )
+            self.new_users.start()
+            self.request_log = WriteBehind(
+                'request_log',
+                self._write_log_requests,
+                batch_size=getattr(config, 'LOG_BATCH_SIZE', 100),
+                interval=getattr(config, 'LOG_FLUSH_INTERVAL', 5),
+                is_retryable=is_transient,
+                dead_letter=lambda records, error: self.dead_letters.append('log_requests', records)
+            )
+            self.request_log.start()
+            self.profile_updates = WriteBehind(
+                'profile_updates',
+                self._write_profile_updates,
+                batch_size=getattr(config, 'PROFILE_BATCH_SIZE', 100),
+                interval=getattr(config, 'PROFILE_FLUSH_INTERVAL', 10),
+                is_retryable=is_transient,
+                dead_letter=lambda records, error: self.dead_letters.append('update_users', records)
+            )
+            self.profile_updates.start()
+            self.pool_metrics_worker = PeriodicWorker(
+                'db_pool_metrics',
+                lambda: logger.info(f'DB pool metrics: {pool_metrics.as_dict(db.engine.pool)}'),
+                getattr(config, 'POOL_METRICS_INTERVAL', 10 * 60),
+                first_delay=getattr(config, 'POOL_METRICS_INTERVAL', 10 * 60)
+            )
+            self.pool_metrics_worker.start()
             self.get_users_from_db()
+            self.users_sync_worker = PeriodicWorker(
+                'users_sync',
+                self.sync_users,
+                getattr(config, 'USERS_SYNC_INTERVAL', 60),
+                first_delay=getattr(config, 'USERS_SYNC_INTERVAL', 60)
+            )
+            self.users_sync_worker.start()
             logger.info('Connection to DB success')
         else:
             self.get_users_from_config()
             logger.info('Load from config success')
 
     @staticmethod
-    def get_users_from_db() -> None:
+    def _users_query():
+        return md.Users.query \
+            .join(
+                md.LibPrivileges,
+                md.Users.privileges_id == md.LibPrivileges.p_id
+            ) \
+            .add_columns(md.Users.chat_id,
+                         md.Users.login,
+                         md.Users.first_name,
+                         md.LibPrivileges.value,
+                         md.Users.description,
+                         md.Users.active,
+                         md.Users.updated_at)
+
+    def get_users_from_db(self) -> None:
         """
         Get all users' information from DB to memory
         """
         logger.info('get_users_from_db')
         try:
-            users = md.Users.query \
-                .join(
-                    md.LibPrivileges,
-                    md.Users.privileges_id == md.LibPrivileges.p_id
-                ) \
-                .add_columns(md.Users.chat_id,
-                             md.Users.login,
-                             md.Users.first_name,
-                             md.LibPrivileges.value,
-                             md.Users.description,
-                             md.Users.active) \
-                .all()
+            users = self._users_query().all()
             if not users:
                 raise TBotException(code=3, message='TBot.users is empty', send=True)
         except exc.DatabaseError:
@@ -68,6 +167,29 @@ class DBLoader(Loader):
             e.send_error(traceback.format_exc())
             exit()
         tbot_users.add_users(users)
+        self.users_watermark = max(user.updated_at for user in users)
+
+    def sync_users(self) -> None:
+        """
+        Apply users changed in DB since the last sync (by other instances or directly in DB)
+        Rows are selected with overlap, so rows committed a bit later with the same time are not lost
+        """
+        overlap = datetime.timedelta(seconds=getattr(config, 'USERS_SYNC_OVERLAP', 5))
+        # профили в очереди еще не записаны в БД, изменения после запроса в нем не видны
+        pending = {record['chat_id']: ('login', 'first_name') for record in self.profile_updates.pending()}
+        changes = tbot_users.changes
+        try:
+            users = self._users_query().filter(
+                md.Users.updated_at >= self.users_watermark - overlap
+            ).all()
+        finally:
+            db.session.remove()
+        if not users:
+            return
+        changed = tbot_users.apply_users(users, skip_fields=pending, changed_since=changes)
+        self.users_watermark = max(self.users_watermark, max(user.updated_at for user in users))
+        if changed:
+            logger.info(f'Users sync: {changed} users changed')
 
     @staticmethod
     def get_users_from_config() -> None:
@@ -90,95 +212,241 @@ class DBLoader(Loader):
         Get privileges id by privileges value
         """
         try:
-            data = md.LibPrivileges.query.filter(
-                md.LibPrivileges.value == privileges
-            ).one_or_none()
-            if not data:
+            p_id = privileges_map.id_of(privileges)
+            if p_id is None:
                 raise TBotException(code=3, message=f'Privilege {privileges} not found')
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
             return None
         else:
-            return data.p_id
+            return p_id
 
     @staticmethod
     def _get_privileges(p_id: int) -> int or None:
         """
-        Get privileges id by privileges value
+        Get privileges value by privileges id
         """
         try:
-            data = md.LibPrivileges.query.filter(
-                md.LibPrivileges.p_id == p_id
-            ).one_or_none()
-            if not data:
+            value = privileges_map.value_of(p_id)
+            if value is None:
                 raise TBotException(code=3, message=f'P_id {p_id} not found')
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
             return None
         else:
-            return data.value
+            return value
 
-    @staticmethod
-    def log_request(chat_id: str) -> md.LogRequests:
+    def log_request(self, chat_id: str, action: str = None, date_ins: datetime.datetime = None) -> None:
         """
-        Insert base request info to DB
+        Add request info to the log, it is written to DB in background
         :param chat_id: person chat_id
         :param action: user action
-        :return:
+        :param date_ins: time of request, now by default
         """
+        self.request_log.add({
+            'chat_id': chat_id,
+            'date_ins': date_ins or datetime.datetime.now(),
+            'action': action
+        })
+
+    def _write(self, kind: str, data) -> None:
+        """
+        Write to DB or to the local spool, if DB is unreachable
+        Once a write is spooled, writes are spooled until the spool is replayed, so writes started after
+        the failed one are applied after it. DB is written without the lock, so handlers are not blocked
+        by DB timeouts
+        :param kind: kind of write (key of _spool_handlers)
+        :param data: write data
+        """
+        with self._spool_lock:
+            if self._spooling or len(self.spool):
+                self._spooling = True
+                self.spool.append(kind, data)
+                return
         try:
-            req = md.LogRequests(
-                chat_id=chat_id
-            )
-            db.session.add(req)
-            db.session.commit()
-            return req
+            self._spool_handlers[kind](data)
+            return
         except (OperationalError, exc.OperationalError) as e:
+            with self._spool_lock:
+                self._spooling = True
+                self.spool.append(kind, data)
             logger.exception(f'DB connection error: {e}')
+            dev_notifier.notify('TBot DB connection error', f'{e}. Writes are spooled')
+
+    def replay_spool(self) -> None:
+        """
+        Apply spooled writes to DB, new writes are appended to spool meanwhile
+        """
+        self.spool.sync()
+        if not len(self.spool):
+            return
+        applied = self.spool.replay(self._spool_handlers, (OperationalError, exc.OperationalError),
+                                    lambda kind, data, error: self.dead_letters.append(kind, data))
+        logger.info(f'Spool replay: {applied} writes applied, {len(self.spool)} left')
+        with self._spool_lock:
+            if len(self.spool):
+                return
+            self._spooling = False
+        dev_notifier.notify('TBot DB connection restored', f'{applied} spooled writes applied')
+
+    def _write_log_requests(self, records: list) -> None:
+        """
+        Write batch of requests info
+        """
+        self.new_users.flush()  # запросы ссылаются на пользователей
+        self._write('log_requests', records)
+
+    @staticmethod
+    @retry_on_disconnect(db.session)
+    def _insert_log_requests(records: list) -> None:
+        """
+        Insert batch of requests info to DB
+        """
+        records = [dict(record, date_ins=datetime.datetime.fromisoformat(record['date_ins']))
+                   if isinstance(record['date_ins'], str) else record for record in records]
+        try:
+            db.session.execute(md.LogRequests.__table__.insert(), records)
+            rollups.add_requests(records)
+            db.session.commit()
+        except exc.SQLAlchemyError:
+            db.session.rollback()
             raise
+        finally:
+            db.session.remove()
 
-    def add_user(self, chat_id: str, login: str, first_name: str, privileges: int) -> None:
+    @retry_on_disconnect(db.session)
+    def _insert_user(self, data: dict) -> None:
+        try:
+            db.session.add(md.Users(chat_id=data['chat_id'],
+                                    login=data['login'],
+                                    first_name=data['first_name'],
+                                    privileges_id=self._get_p_id(data['privileges'])))
+            db.session.commit()
+        except exc.SQLAlchemyError:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+    def _write_new_users(self, records: list) -> None:
         """
-        Add new user to DB and memory
+        Write batch of new users
+        """
+        self._write('add_users', records)
+
+    @retry_on_disconnect(db.session)
+    def _insert_users(self, records: list) -> None:
+        """
+        Insert batch of users to DB
         """
-        logger.info('add_user')
         try:
-            if config.USE_DB:
-                p_id = self._get_p_id(privileges)
-                db.session.add(md.Users(chat_id=chat_id,
-                                        login=login,
-                                        first_name=first_name,
-                                        privileges_id=p_id))
-                db.session.commit()
-        except (OperationalError, exc.OperationalError) as e:
-            logger.exception(f'DB connection error: {e}')
+            db.session.execute(md.Users.__table__.insert(), [{
+                'chat_id': record['chat_id'],
+                'login': record['login'],
+                'first_name': record['first_name'],
+                'privileges_id': self._get_p_id(record['privileges'])
+            } for record in records])
+            db.session.commit()
+        except exc.SQLAlchemyError:
+            db.session.rollback()
             raise
-        logger.info(f'New user {chat_id} added')
+        finally:
+            db.session.remove()
+
+    def _reject_new_users(self, records: list, error: Exception) -> None:
+        """
+        Keep users rejected by DB (e.g. already added by another instance of bot),
+        they are served from memory
+        """
+        self.dead_letters.append('add_users', records)
+        chat_ids = ', '.join(record['chat_id'] for record in records)
+        dev_notifier.notify('TBot user is not written', f'Users {chat_ids} are rejected by DB: {error}')
+
+    def _write_profile_updates(self, records: list) -> None:
+        """
+        Write batch of profile updates, only the last update of each user is written
+        """
+        self.new_users.flush()  # профиль нового пользователя обновляется после его добавления
+        self._write('update_users', list({record['chat_id']: record for record in records}.values()))
+
+    @staticmethod
+    @retry_on_disconnect(db.session)
+    def _update_user_rows(records: list) -> None:
+        """
+        Update login and first_name of users by one statement
+        """
+        users = md.Users.__table__
+        try:
+            db.session.execute(
+                users.update().where(
+                    users.c.chat_id == bindparam('b_chat_id')
+                ).values(
+                    login=bindparam('b_login'),
+                    first_name=bindparam('b_first_name')
+                ),
+                [{'b_chat_id': record['chat_id'],
+                  'b_login': record['login'],
+                  'b_first_name': record['first_name']} for record in records]
+            )
+            db.session.commit()
+        except exc.SQLAlchemyError:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+    @staticmethod
+    @retry_on_disconnect(db.session)
+    def _update_user_row(data: dict) -> None:
+        try:
+            # NoResultFound, если пользователя нет: запись из журнала уходит в dead letters
+            user = md.Users.query.filter(md.Users.chat_id == data['chat_id']).one()
+            user.login = data['login']
+            user.first_name = data['first_name']
+            db.session.commit()
+        except exc.SQLAlchemyError:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+    def add_user(self, chat_id: str, login: str, first_name: str, privileges: int) -> None:
+        """
+        Add new user to memory, DB is updated in background
+        """
+        logger.info('add_user')
         tbot_users.add_user(
             chat_id=chat_id,
             login=login,
             first_name=first_name,
             privileges=privileges
         )
+        if config.USE_DB:
+            self.new_users.add({
+                'chat_id': chat_id,
+                'login': login,
+                'first_name': first_name,
+                'privileges': privileges
+            })
+        logger.info(f'New user {chat_id} added')
 
-    @staticmethod
-    def update_user(chat_id: str, login: str, first_name: str) -> None:
+    def update_user(self, chat_id: str, login: str, first_name: str) -> None:
         """
-        Update user info in DB and memory
+        Update user info in memory, DB is updated in background
         :param chat_id: unique user_id
         :param login: login
         :param first_name: first_name
         """
         logger.info('update_user')
         if config.USE_DB:
-            user = md.Users.query.filter(md.Users.chat_id == chat_id).one_or_none()
-            user.login = login
-            user.first_name = first_name
-            db.session.commit()
-        tbot_users(chat_id).login = login
-        tbot_users(chat_id).first_name = first_name
+            self.profile_updates.add({
+                'chat_id': chat_id,
+                'login': login,
+                'first_name': first_name
+            })
+        tbot_users.update_user(chat_id, login=login, first_name=first_name)
         logger.info('User info updated')
 
     @check_permission(needed_level='root')
@@ -226,23 +494,25 @@ class DBLoader(Loader):
                 if len(user) > 1:
                     raise TBotException(code=3, return_message='Найдено несколько пользователей')
                 if cmd[1] == 'privileges':
-                    new_value = self._get_p_id(new_value)
+                    p_id = self._get_p_id(new_value)
+                    if p_id is None:
+                        raise TBotException(code=3, return_message=f'Привилегия {new_value} не найдена')
                 for u in user:
                     chat_id = u.chat_id
                     if cmd[1] == 'description':
                         u.description = new_value
                     elif cmd[1] == 'privileges':
-                        u.privileges_id = new_value
+                        u.privileges_id = p_id
                     elif cmd[1] == 'active':
                         u.active = new_value
                 db.session.commit()
             logger.info(f'Updating memory')
             if cmd[1] == 'privileges':
-                tbot_users(chat_id).privileges = new_value
+                tbot_users.update_user(chat_id, privileges=new_value)
             elif cmd[1] == 'description':
-                tbot_users(chat_id).description = new_value
+                tbot_users.update_user(chat_id, description=new_value)
             elif cmd[1] == 'active':
-                tbot_users(chat_id).active = new_value
+                tbot_users.update_user(chat_id, active=new_value)
             logger.info(f'User {chat_id} {cmd[1]} updated')
             resp.text = f'User {chat_id} {cmd[1]} updated'
             return resp
@@ -359,16 +629,142 @@ class DBLoader(Loader):
             return e.return_message()
 
     @staticmethod
-    def _get_random_poem():
+    def _with_deadline(query, deadline: Deadline):
+        """
+        Limit query execution time by the remaining time of request (MySQL only)
+        """
+        if deadline.expired:
+            raise TBotException(code=9, return_message=DEADLINE_MESSAGE, message='Deadline exceeded before query')
+        if db.engine.dialect.name == 'mysql':
+            query = query.prefix_with(f'/*+ MAX_EXECUTION_TIME({int(deadline.remaining() * 1000)}) */')
+        return query
+
+    @staticmethod
+    def _poems_signature() -> tuple:
+        """
+        Count, max id and last update of poems, they are changed when poems are added, deleted or edited
+        """
+        try:
+            return tuple(db.session.query(
+                func.count(md.Poems.p_id),
+                func.max(md.Poems.p_id),
+                func.max(md.Poems.updated_at)
+            ).one())
+        finally:
+            db.session.remove()
+
+    def refresh_poems(self) -> None:
+        """
+        Reload poem ids, rebuild search index and quatrains of divination poems, if poems are changed
+        """
+        self.poem_ids.refresh()
+        signature = self._poems_signature()
+        if signature == self._poem_search_signature:
+            return
+        # в SQLite стихи ищутся по индексу FTS5, локальный индекс не нужен
+        poem_search = None if self.fts else SearchIndex(weights={'author': 3, 'name': 2, 'text': 1})
+        poem_quatrains = {}
+        try:
+            poems = db.session.query(*POEM_COLUMNS).yield_per(1000)
+            for poem in poems:
+                if poem_search is not None:
+                    poem_search.add(poem.p_id, {'author': poem.author, 'name': poem.name, 'text': poem.text})
+                offsets = quatrain_offsets(poem.text)
+                if is_divination_poem(offsets):
+                    poem_quatrains[poem.p_id] = offsets
+        finally:
+            db.session.remove()
+        self.poem_search, self._poem_search_signature = poem_search, signature
+        with self._divination_lock:
+            self.poem_quatrains, self.divination_ids = poem_quatrains, list(poem_quatrains)
+        self.poems_cache.clear()
+        logger.info(f'Poems are loaded: {len(poem_search) if poem_search is not None else "FTS5"} search index, '
+                    f'{len(poem_quatrains)} poems for divination')
+
+    @retry_on_disconnect(db.session)
+    def _search_poems(self, search_string: str, limit: int, deadline: Deadline) -> list:
+        """
+        Find the most relevant poems
+        FTS5 index is used in SQLite, else local search index, when it is built, else LIKE query.
+        Indexes match words by stems, not any substring as LIKE does: "бер" does not find "берёза"
+        """
+        if self.fts:
+            poems_ids = sqlite_backend.search_poems(db.session, search_string, limit)
+        elif self.poem_search is None:
+            return self._with_deadline(db.session.query(*POEM_COLUMNS), deadline).filter(
+                md.Poems.author.like(f'%{search_string}%') |
+                md.Poems.name.like(f'%{search_string}%') |
+                md.Poems.text.like(f'%{search_string}%')
+            ).order_by(
+                md.Poems.author
+            ).limit(limit).all()
+        else:
+            poems_ids = self.poem_search.search(search_string, limit)
+        if not poems_ids:
+            return []
+        poems = self._with_deadline(db.session.query(*POEM_COLUMNS), deadline).filter(
+            md.Poems.p_id.in_(poems_ids)
+        ).all()
+        order = {poem_id: i for i, poem_id in enumerate(poems_ids)}
+        return sorted(poems, key=lambda poem: order[poem.p_id])
+
+    @retry_on_disconnect(db.session)
+    def _get_poem_by_id(self, poem_id: int):
         """
-        Get random poem
+        Get poem by primary key from cache or DB
         """
-        max_id = db.session.query(func.max(md.Poems.p_id)).scalar()
-        min_id = db.session.query(func.min(md.Poems.p_id)).scalar()
-        random_id = random.randint(min_id, max_id + 1)
-        return md.Poems.query.filter(
-                md.Poems.p_id == random_id
+        poem = self.poems_cache.get(poem_id)
+        if poem is None:
+            poem = db.session.query(*POEM_COLUMNS).filter(
+                md.Poems.p_id == poem_id
             ).one_or_none()
+            if poem is not None:
+                self.poems_cache.set(poem_id, poem)
+        return poem
+
+    def _get_random_poem(self):
+        """
+        Get random poem: random id from index and fetch by primary key (or from cache)
+        """
+        while True:
+            random_id = self.poem_ids.random()
+            if random_id is None:
+                return None
+            poem = self._get_poem_by_id(random_id)
+            if poem is None:
+                self.poem_ids.discard(random_id)
+                continue
+            return poem
+
+    def _get_divination_poem(self) -> dict or None:
+        """
+        Get random poem for divination with its quatrains
+        :return: {'text': poem text, 'quatrains': offsets of quatrains} or None
+        """
+        if self.poem_quatrains is None:
+            # пул еще не построен, ищем подходящий стих среди случайных
+            for _ in range(10):
+                poem = self._get_random_poem()
+                if poem is None:
+                    return None
+                offsets = quatrain_offsets(poem.text)
+                if is_divination_poem(offsets):
+                    return {'text': poem.text, 'quatrains': offsets}
+            return None
+        with self._divination_lock:
+            poem_quatrains, divination_ids = self.poem_quatrains, self.divination_ids
+        while True:
+            with self._divination_lock:
+                if not divination_ids:
+                    return None
+                poem_id = random.choice(divination_ids)
+            poem = self._get_poem_by_id(poem_id)
+            if poem is not None:
+                return {'text': poem.text, 'quatrains': poem_quatrains[poem_id]}
+            # стих удален, другой поток мог убрать его раньше
+            with self._divination_lock:
+                if poem_id in divination_ids:
+                    divination_ids.remove(poem_id)
 
     @check_permission()
     def get_poem(self, request: LoaderRequest) -> LoaderResponse:
@@ -394,18 +790,14 @@ class DBLoader(Loader):
                     except ValueError:
                         poem_id = None
                     if len(lst) == 2 and poem_id is not None:
-                        poem = md.Poems.query.filter(md.Poems.p_id == poem_id).first()
+                        poem = self._get_poem_by_id(poem_id)
+                        if not poem:
+                            raise TBotException(code=3, return_message='Стих не найден')
                         resp.text = f"{poem.author}\n\n{poem.name}\n\n{poem.text}"
                         return resp
                     else:
                         search_string = ' '.join(lst[1:])
-                        poems = md.Poems.query.filter(
-                            md.Poems.author.like(f'%{search_string}%') |
-                            md.Poems.name.like(f'%{search_string}%') |
-                            md.Poems.text.like(f'%{search_string}%')
-                        ).order_by(
-                            md.Poems.author
-                        ).all()
+                        poems = self._search_poems(search_string, count, request.deadline)
                     if not poems:
                         raise TBotException(code=3, return_message='По вашему запросу ничего не найдено')
                     if len(poems) == 1:
@@ -413,7 +805,6 @@ class DBLoader(Loader):
                         return resp
                     else:
                         poems_ids = []
-                        poems = poems if len(poems) < count else poems[:count]
                         for poem in poems:
                             poems_ids.append(f'{poem.p_id} {poem.author}. {poem.name}')
                         resp.text = 'Вот, несколько стихов, подходящих под описание'
@@ -426,6 +817,11 @@ class DBLoader(Loader):
                         return resp
             else:
                 raise TBotException(code=3, return_message='Нет подключения к БД')
+        except exc.DatabaseError as e:
+            if getattr(e.orig, 'errno', None) != 3024:  # запрос прерван по MAX_EXECUTION_TIME
+                raise
+            logger.exception(f'Query is interrupted: {e}')
+            return LoaderResponse(text=DEADLINE_MESSAGE)
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
@@ -447,26 +843,14 @@ class DBLoader(Loader):
                 if 'poem' in tbot_users(request.chat_id).cache:
                     tbot_users(request.chat_id).cache.pop('poem')
                 if not tbot_users(request.chat_id).cache.get('poem'):
-                    while True:
-                        poem = self._get_random_poem()
-                        count_of_quatrains = poem.text.count('\n\n')
-                        if count_of_quatrains == 1:
-                            lines = poem.text.split('\n')
-                            buf = ''
-                            quatrains = []
-                            for line in lines:
-                                buf += line
-                                if buf.count('\n') == 4:
-                                    quatrains.append(buf)
-                                buf = ''
-                            count_of_quatrains = len(quatrains)
-                        if count_of_quatrains:
-                            break
+                    poem = self._get_divination_poem()
+                    if not poem:
+                        raise TBotException(code=3, message='Стих не найден')
                     tbot_users(request.chat_id).cache['poem'] = poem
                     resp.text = 'Выберите четверостишие'
                     resp.markup = custom_markup(
                         command='divination',
-                        category=[str(i) for i in range(1, count_of_quatrains + 1)],
+                        category=[str(i) for i in range(1, quatrains_count(poem['quatrains']) + 1)],
                         smile='🔮'
                     )
                     resp.is_extra_log = False
@@ -478,11 +862,10 @@ class DBLoader(Loader):
                                         return_message=f'Отсутствует сохраненный стих. Нажми на гадание еще разок',
                                         chat_id=request.chat_id,
                                         cache_field='poem')
-                quatrains = poem.text.split('\n\n')
                 cmd = request.text.split()
                 try:
                     number_of_quatrain = int(cmd[1])
-                    resp.text = quatrains[number_of_quatrain - 1]
+                    resp.text = get_quatrain(poem['text'], poem['quatrains'], number_of_quatrain)
                 except ValueError:
                     raise TBotException(code=6, return_message=f'Неправильный тип параметра {type(cmd[1])}')
                 except IndexError:
@@ -496,6 +879,7 @@ class DBLoader(Loader):
             return e.return_message()
 
     @check_permission(needed_level='root')
+    @retry_on_disconnect(db.session)
     def get_statistic(self, request: LoaderRequest) -> LoaderResponse:
         """
         Get statistic
@@ -511,15 +895,21 @@ class DBLoader(Loader):
                     resp.text = 'Выберите тип статистики'
                     resp.markup = custom_markup(
                         command='statistic',
-                        category=['Count', 'Functions'],
+                        category=['Count', 'Functions', 'Pool'],
                         smile='📋'
                     )
                     resp.is_extra_log = False
                     return resp
+                elif len(lst) == 2 and lst[1] == 'pool':
+                    resp.text = dict_to_str(pool_metrics.as_dict(db.engine.pool), ': ')
+                    resp.is_extra_log = False
+                    return resp
                 elif len(lst) == 2:
                     if lst[1].lower() not in ('count', 'functions'):
                         raise TBotException(code=6, return_message=f'Неправильное значение параметра: {lst[1]}')
-                    resp.text = 'Выберите интервал'
+                    # статистика считается по суточным сводкам: интервалы - календарные дни, включая сегодня
+                    resp.text = ('Выберите интервал (календарные дни: '
+                                 'Today - с полуночи, Week - 7 дней, Month - 30 дней)')
                     resp.markup = custom_markup(
                         command='statistic',
                         category=['Today', 'Week', 'Month', 'All'],
@@ -530,21 +920,16 @@ class DBLoader(Loader):
                 interval_map = {'today': 1,
                                 'week': 7,
                                 'month': 30,
-                                'all': 100000}
+                                'all': None}
                 if lst[2] not in interval_map.keys():
                     raise TBotException(code=6, return_message=f'Неправильное значение параметра: {lst[2]}')
-                interval = datetime.datetime.now() - datetime.timedelta(days=interval_map[lst[2]])
+                day_from = None
+                if interval_map[lst[2]]:
+                    day_from = datetime.date.today() - datetime.timedelta(days=interval_map[lst[2]] - 1)
                 if lst[1] == 'count':
                     if lst[2] != 'today':
-                        plot_data = md.LogRequests.query.with_entities(
-                            cast(md.LogRequests.date_ins, Date),
-                            func.count(md.LogRequests.chat_id)
-                        ).filter(
-                            md.LogRequests.date_ins >= interval,
-                            md.LogRequests.action.is_not(None),
-                            md.LogRequests.action != 'hello'
-                        ).group_by(
-                            cast(md.LogRequests.date_ins, Date)
+                        plot_data = db.session.execute(
+                            self._with_deadline(rollups.stat_daily_query(day_from), request.deadline)
                         ).all()
                         dt = []
                         cnt = []
@@ -560,45 +945,28 @@ class DBLoader(Loader):
                                 )
                             ]
                         )
-                        resp.photo = Graph.get_base_graph(bgi)
-                    to_sort = md.LogRequests.query.join(
-                        md.Users,
-                        md.LogRequests.chat_id == md.Users.chat_id
-                    ).filter(
-                        md.LogRequests.date_ins >= interval,
-                        md.LogRequests.action.is_not(None),
-                        md.LogRequests.action != 'hello'
-                    ).with_entities(
-                        func.count(md.Users.chat_id),
-                        md.Users.login,
-                        md.Users.first_name
-                    ).group_by(
-                        md.Users.chat_id
-                    ).order_by(
-                        desc(func.count(md.Users.chat_id))
+                        if not request.deadline.expired:
+                            resp.photo = Graph.get_base_graph(bgi)
+                    to_sort = db.session.execute(
+                        self._with_deadline(rollups.stat_users_query(day_from), request.deadline)
                     ).all()
                     resp.text = ''
                     for cur in to_sort:
                         resp.text += ' '.join([str(i) for i in cur]) + '\n'
                     return resp
                 elif lst[1] == 'functions':
-                    bar_data = md.LogRequests.query.with_entities(
-                        md.LogRequests.action,
-                        func.count(md.LogRequests.action)
-                    ).filter(
-                        md.LogRequests.date_ins >= interval,
-                        md.LogRequests.action.is_not(None),
-                        md.LogRequests.action != 'hello'
-                    ).group_by(
-                        md.LogRequests.action
-                    ).order_by(
-                        desc(func.count(md.LogRequests.action))
+                    bar_data = db.session.execute(
+                        self._with_deadline(rollups.stat_actions_query(day_from), request.deadline)
                     ).all()
+                    if request.deadline.expired:
+                        resp.text = dict_to_str({name: int(count) for name, count in bar_data}, ': ')
+                        resp.text += '\nГрафик не успел построиться, попробуйте позже'
+                        return resp
                     func_name = []
                     cnt = []
                     for cur in bar_data:
                         func_name.append(cur[0])
-                        cnt.append(cur[1])
+                        cnt.append(int(cur[1]))
                     subbars = []
                     if len(func_name) > 10:
                         index = 10
@@ -630,6 +998,11 @@ class DBLoader(Loader):
                     return resp
             else:
                 raise TBotException(code=3, return_message='Нет подключения к БД')
+        except exc.DatabaseError as e:
+            if getattr(e.orig, 'errno', None) != 3024:  # запрос прерван по MAX_EXECUTION_TIME
+                raise
+            logger.exception(f'Query is interrupted: {e}')
+            return LoaderResponse(text=DEADLINE_MESSAGE)
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
@@ -15,6 +15,7 @@ from users import tbot_users
 from localization import Rus
 
 from exceptions import TBotException
+from stores.quatrains import quatrain_offsets, quatrains_count, is_divination_poem, get_quatrain
 
 logger = get_logger(__name__)
 
@@ -28,6 +29,7 @@ class FileLoader(Loader):
         self.files_list = ['poems.xlsx']
         self._check_file_db()
         self.poems = []
+        self.divination_poems = []
         if not config.USE_DB:
             self.load_poems()
 
@@ -66,7 +68,10 @@ class FileLoader(Loader):
                         poem['author'] = author
                         poem['name'] = name
                         poem['text'] = text
+                        poem['quatrains'] = quatrain_offsets(text)
                         self.poems.append(poem)
+                        if is_divination_poem(poem['quatrains']):
+                            self.divination_poems.append(poem)
                     logger.info(f'{file_path} download. len = {len(self.poems)}')
                 else:
                     raise TBotException(code=2, message='Файл poems.xlsx не найден', send=True)
@@ -123,26 +128,14 @@ class FileLoader(Loader):
                 if 'poem' in tbot_users(request.chat_id).cache:
                     tbot_users(request.chat_id).cache.pop('poem')
                 if not tbot_users(request.chat_id).cache.get('poem'):
-                    while True:
-                        poem = random.choice(self.poems)
-                        count_of_quatrains = poem['text'].count('\n\n')
-                        if count_of_quatrains == 1:
-                            lines = poem['text'].split('\n')
-                            buf = ''
-                            quatrains = []
-                            for line in lines:
-                                buf += line
-                                if buf.count('\n') == 4:
-                                    quatrains.append(buf)
-                                buf = ''
-                            count_of_quatrains = len(quatrains)
-                        if count_of_quatrains:
-                            break
+                    if not self.divination_poems:
+                        raise TBotException(code=3, return_message='Стих не найден')
+                    poem = random.choice(self.divination_poems)
                     tbot_users(request.chat_id).cache['poem'] = poem
                     resp.text = 'Выберите четверостишие'
                     resp.markup = custom_markup(
                         command='divination',
-                        category=[str(i) for i in range(1, count_of_quatrains+1)],
+                        category=[str(i) for i in range(1, quatrains_count(poem['quatrains']) + 1)],
                         smile='🔮'
                     )
                     resp.is_extra_log = False
@@ -154,11 +147,10 @@ class FileLoader(Loader):
                                         return_message=f'Отсутствует сохраненный стих. Нажми на гадание еще разок',
                                         chat_id=request.chat_id,
                                         cache_field='poem')
-                quatrains = poem['text'].split('\n\n')
                 cmd = request.text.split()
                 try:
                     number_of_quatrain = int(cmd[1])
-                    resp.text = quatrains[number_of_quatrain - 1]
+                    resp.text = get_quatrain(poem['text'], poem['quatrains'], number_of_quatrain)
                 except ValueError:
                     raise TBotException(code=6,
                                         return_message='Неправильный тип параметра',
@@ -202,12 +194,14 @@ class FileLoader(Loader):
         os.system(cmd)
         i = 0
         try:
-            while i < config.MAX_TRY:
+            while i < config.MAX_TRY and not request.deadline.expired:
                 if os.path.exists(path):
                     resp.photo = path
                     return resp
-                time.sleep(1)
+                time.sleep(min(1, request.deadline.remaining()))
                 i += 1
+            if request.deadline.expired:
+                raise TBotException(code=9, return_message='Камера не успела сделать снимок, попробуйте позже')
             raise TBotException(code=2)
         except TBotException as e:
             logger.exception(e.context)
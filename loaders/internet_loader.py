@@ -5,11 +5,27 @@ from bs4 import BeautifulSoup
 import asyncio
 import aiohttp
 import json
+import os
+import re
+import time
+import hashlib
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 import config
 
 from loaders.loader import Loader, check_permission, LoaderResponse, LoaderRequest
+from stores.phone_index import PhoneIndex
+from stores.cache import TTLCache
+from stores.painting_catalog import PaintingCatalog
+from stores.news_feed import NewsFeed
+from stores.exchange_rates import ExchangeRates
+from stores.random_buffer import RandomBuffer
+from stores.catalog import Catalog
+from stores.file_ids import file_ids
+from workers import PeriodicWorker
+from single_flight import single_flight
+from deadline import Deadline, DEADLINE_MESSAGE
 from graph import Graph, BaseGraphInfo, BaseSubGraphInfo
 from markup import custom_markup
 from helpers import (
@@ -23,6 +39,10 @@ from exceptions import TBotException
 
 logger = get_logger(__name__)
 
+EXCHANGE_CHART_KEY = 'exchange_chart'  # ключ file_id графика курса валют
+# промежутки годов в меню фильмов, только для них фильмы готовятся заранее
+MOVIE_YEARS_RANGES = ((1950, 1960), (1960, 1970), (1970, 1980), (1980, 1990), (1990, 2000), (2000, 2010), (2010, 2020))
+
 
 class InternetLoader(Loader):
     """
@@ -36,12 +56,107 @@ class InternetLoader(Loader):
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
+        self.phone_index = PhoneIndex()
+        self.phone_index.load(*getattr(config, 'PHONE_RANGES_FILES', [os.path.join('file_db', 'DEF-9xx.csv')]))
+        self.phone_operators = TTLCache(ttl=getattr(config, 'PHONE_OPERATOR_CACHE_TTL', 24 * 60 * 60))
+        self.painting_catalog = PaintingCatalog(getattr(config, 'PAINTINGS_DIR', os.path.join('file_db', 'paintings')))
+        self.news_feed = NewsFeed(getattr(config, 'NEWS_STORE_SIZE', 200))
+        self.exchange_rates = ExchangeRates(config.EXCHANGES_CURRENCIES, getattr(config, 'EXCHANGE_STORE_SIZE', 365))
+        self.exchange_chart = None
+        self.random_buffer = RandomBuffer(
+            getattr(config, 'RANDOM_BUFFER_SIZE', 3),
+            getattr(config, 'RANDOM_BUFFER_FILLERS', 1)
+        )
+        self.random_buffer.register('movie', self.random_movie, keys=MOVIE_YEARS_RANGES)
+        self.random_buffer.register('book', self.random_book)
+        self.random_buffer.register('food', self.random_restaurant)
+        self.random_buffer.register('poem', self.random_poem)
+        self.catalog = Catalog(getattr(config, 'CATALOG_FILE', os.path.join('file_db', 'catalog.sqlite')))
+        self.catalog_parsers = {
+            'movie_index': self._parse_movie_index,
+            'movie_list': self._parse_movie_list,
+            'book_index': self._parse_book_index,
+            'book_genre': self._parse_book_genre,
+            'book_list': self._parse_book_list,
+            'restaurant_index': self._parse_restaurant_index,
+            'restaurant_list': self._parse_restaurant_list,
+            'restaurant': self._parse_restaurant,
+        }
+        self.workers = []
+
+    def run_background_tasks(self) -> None:
+        """
+        Start background workers, which prepare data for requests
+        """
+        self.workers = [
+            PeriodicWorker(
+                'painting_catalog',
+                self.refresh_painting_catalog,
+                getattr(config, 'PAINTINGS_REFRESH_INTERVAL', 6 * 60 * 60)
+            ),
+            PeriodicWorker(
+                'news_feed',
+                self.refresh_news,
+                getattr(config, 'NEWS_REFRESH_INTERVAL', 5 * 60)
+            ),
+            PeriodicWorker(
+                'exchange_rates',
+                self.refresh_exchange,
+                getattr(config, 'EXCHANGE_REFRESH_INTERVAL', 60 * 60)
+            ),
+            PeriodicWorker(
+                'catalog_crawler',
+                self.crawl_catalog,
+                getattr(config, 'CATALOG_CRAWL_INTERVAL', 10 * 60)
+            ),
+            PeriodicWorker(
+                'random_buffer_metrics',
+                lambda: logger.info(f'Random buffer metrics: {self.random_buffer.metrics()}'),
+                getattr(config, 'METRICS_LOG_INTERVAL', 10 * 60),
+                first_delay=getattr(config, 'METRICS_LOG_INTERVAL', 10 * 60)
+            ),
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.random_buffer.start()
+        for command in ('food', 'poem'):
+            self.random_buffer.request_refill(command)
 
     @staticmethod
-    def regular_request(url: str, method: str = 'GET', data: dict = None) -> requests.models.Response:
+    def regular_request(
+            url: str,
+            method: str = 'GET',
+            data: dict = None,
+            timeout: float = None
+    ) -> requests.models.Response:
         """
         Regular request to site
+        Concurrent GET requests of the same url share one response
+        Timeout is limited by the deadline of current request
         """
+        deadline = Deadline.current()
+        if deadline and deadline.expired:
+            raise TBotException(code=9,
+                                return_message=DEADLINE_MESSAGE,
+                                message=f'Deadline exceeded before request to {url}')
+        timeout = Deadline.current_timeout(timeout or getattr(config, 'REQUEST_TIMEOUT', 30))
+        try:
+            if method.upper() == 'GET':
+                return single_flight.do(('GET', url), InternetLoader._regular_request, url, method, data, timeout,
+                                        wait_timeout=timeout)
+            return InternetLoader._regular_request(url, method, data, timeout)
+        except FutureTimeoutError:
+            raise TBotException(code=9,
+                                return_message=DEADLINE_MESSAGE,
+                                message=f'Timeout of waiting for {url}')
+
+    @staticmethod
+    def _regular_request(
+            url: str,
+            method: str = 'GET',
+            data: dict = None,
+            timeout: float = None
+    ) -> requests.models.Response:
         headers = {
             'User-Agent': 'Mozilla/5.0',
             'Connection': 'close'
@@ -49,9 +164,9 @@ class InternetLoader(Loader):
         try:
             logger.info(f'Try to get info from {url}')
             if method.upper() == 'GET':
-                resp = requests.get(url, headers=headers)
+                resp = requests.get(url, headers=headers, timeout=timeout)
             elif method.upper() == 'POST':
-                resp = requests.post(url, headers=headers, data=data)
+                resp = requests.post(url, headers=headers, data=data, timeout=timeout)
             else:
                 raise TBotException(code=6, message=f'Method is not allowed: {method}')
             if resp.status_code == 200:
@@ -65,9 +180,38 @@ class InternetLoader(Loader):
             raise
         except requests.exceptions.ConnectionError:
             raise TBotException(code=1, message=f"Error connection to {url}", send=True)
+        except requests.exceptions.Timeout:
+            raise TBotException(code=9,
+                                return_message=DEADLINE_MESSAGE,
+                                message=f"Timeout of connection to {url}")
         except Exception:
             raise TBotException(code=100, message=f'Exception in {__name__}', send=True)
 
+    @staticmethod
+    def fetch(url: str, parse):
+        """
+        Get site and parse it
+        Concurrent calls with the same url and parse function share one parsed result,
+        so the result must not be changed by callers
+        :param url: https://site.com/
+        :param parse: function, which receives response and returns parsed result
+        :return: parsed result
+        """
+        try:
+            return single_flight.do((url, parse), lambda: parse(InternetLoader.regular_request(url)),
+                                    wait_timeout=Deadline.current_timeout())
+        except FutureTimeoutError:
+            raise TBotException(code=9,
+                                return_message=DEADLINE_MESSAGE,
+                                message=f'Timeout of waiting for {url}')
+
+    @staticmethod
+    def _parse_lxml(resp: requests.models.Response) -> BeautifulSoup:
+        soup = BeautifulSoup(resp.text, 'lxml')
+        if soup is None:
+            raise TBotException(code=1, message=f'Bad soup parsing {resp.url}')
+        return soup
+
     @staticmethod
     def site_to_lxml(url: str) -> BeautifulSoup or None:
         """
@@ -75,35 +219,70 @@ class InternetLoader(Loader):
         :param url: https://site.com/
         :return: BeautifulSoup object
         """
-        try:
-            resp = InternetLoader.regular_request(url)
-            soup = BeautifulSoup(resp.text, 'lxml')
-            if soup is None:
-                raise TBotException(code=1, message=f'Bad soup parsing {url}')
-            return soup
-        except TBotException as e:
-            raise
+        return InternetLoader.fetch(url, InternetLoader._parse_lxml)
+
+    def refresh_exchange(self) -> None:
+        """
+        Add exchange rates from internet to the time series
+        Chart is rendered only when rates are changed
+        """
+        url = check_config_attribute('exchange_url')
+        ex = config.EXCHANGES_CURRENCIES
+        soup = InternetLoader.site_to_lxml(url)
+        parse = soup.find_all('tr')
+        exchange = {}
+        for item in parse[1:]:
+            inf = item.find_all('td')
+            if inf[1].text not in ex:
+                continue
+            try:
+                exchange[inf[1].text] = float(inf[4].text.replace(',', '.'))
+            except ValueError:
+                continue
+        if not self.exchange_rates.add(datetime.datetime.now().timestamp(), exchange):
+            return
+        times, rates = self.exchange_rates.series()
+        dates = [datetime.datetime.fromtimestamp(timestamp) for timestamp in times]
+        bgi = BaseGraphInfo(
+            'Exchange',
+            'exchange',
+            [BaseSubGraphInfo('plot', 2, None, 'Date', currency, dates, rates[currency]) for currency in rates]
+        )
+        # график один, при изменении курса он перезаписывается, а его старый file_id забывается
+        self.exchange_chart = Graph.get_base_graph(bgi, file_name='exchange.png')
+        file_ids.discard(EXCHANGE_CHART_KEY)
+        logger.info(f'Exchange rates refreshed. len = {len(self.exchange_rates)}')
 
     @check_permission()
     def get_exchange(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get exchange from internet
+        Get exchange from the time series
         :param:
         :return: string like {'USD': '73,6059', 'EUR':'83,1158'}
         """
         resp = LoaderResponse()
         try:
-            url = check_config_attribute('exchange_url')
-            ex = config.EXCHANGES_CURRENCIES
-            soup = InternetLoader.site_to_lxml(url)
-            parse = soup.find_all('tr')
-            exchange = {}
-            for item in parse[1:]:
-                inf = item.find_all('td')
-                if inf[1].text not in ex:
-                    continue
-                exchange[inf[1].text] = inf[4].text
+            if not len(self.exchange_rates):
+                self.refresh_exchange()
+            cmd = request.text.split()
+            if len(cmd) == 2 and cmd[1].lower() in ('график', 'chart'):
+                if not self.exchange_chart:
+                    raise TBotException(code=2, return_message='График еще не готов')
+                resp.photo = file_ids.get(EXCHANGE_CHART_KEY) or self.exchange_chart
+                resp.photo_key = EXCHANGE_CHART_KEY
+                resp.photo_file = self.exchange_chart
+                resp.text = 'Динамика курса валют'
+                return resp
+            exchange = {currency: f'{rate:.4f}'.replace('.', ',') for currency, rate in self.exchange_rates.latest().items()}
+            if not exchange:
+                raise TBotException(code=1, message='Exchange rates are empty', send=True)
             resp.text = dict_to_str(exchange, ' = ')
+            if len(self.exchange_rates) > 1:
+                resp.markup = custom_markup(
+                    command='exchange',
+                    category=['График'],
+                    smile='📈'
+                )
             return resp
         except TBotException as e:
             logger.exception(e.context)
@@ -174,6 +353,11 @@ class InternetLoader(Loader):
                 time = [time[11:] for time in weather['hourly']['time']]
                 # переводим hPa в mmhg
                 weather['hourly']['pressure_msl'] = [int(press * 0.75) for press in weather['hourly']['pressure_msl']]
+                if request.deadline.expired:
+                    temperature = weather['hourly']['temperature_2m']
+                    resp.text = (f'Погода на сутки в городе {cmd[1]}: от {min(temperature)} до {max(temperature)} °C\n'
+                                 f'График не успел построиться, попробуйте позже')
+                    return resp
                 subplots = []
                 for param in weather_params:
                     subplots.append(BaseSubGraphInfo('plot', 5, None, 'Date', param, time, weather['hourly'][param]))
@@ -248,10 +432,38 @@ class InternetLoader(Loader):
             e.send_error(traceback.format_exc())
             return e.return_message()
 
+    def refresh_news(self) -> None:
+        """
+        Add new headlines from internet to the news feed
+        Only headlines newer than the last seen one are parsed
+        """
+        url = check_config_attribute('news_url')
+        soup = InternetLoader.site_to_lxml(url)
+        headlines = []
+        # Добавление главной новости
+        main_new = soup.find('div', class_='cell-main-photo__hover')
+        if main_new:
+            main_href = main_new.find('a', class_='cell-main-photo__link').get('href')
+            if main_href not in self.news_feed:
+                main_title = shild_special_symbols(main_new.find('div', class_='cell-main-photo__title').text)
+                main_time = shild_special_symbols(main_new.find('div', class_='cell-info__date').text)
+                headlines.append((main_href, f"{main_time} [{main_title}]({main_href})"))
+        # Добавление остальных
+        for n in soup.find_all('a', class_='cell-list__item-link'):
+            href = n.get('href')
+            if href in self.news_feed:
+                break
+            news_time = n.find('div', class_='cell-info__date')
+            if news_time and n.get('title'):
+                form_text = shild_special_symbols(n.get('title'))
+                headlines.append((href, f"{shild_special_symbols(news_time.text)} [{form_text}]({href})"))
+        added = self.news_feed.add(headlines)
+        logger.info(f'News feed refreshed. Added: {added}, len = {len(self.news_feed)}')
+
     @check_permission()
     def get_news(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get news from internet
+        Get news from the news feed
         :param:
         :return:
         """
@@ -268,29 +480,11 @@ class InternetLoader(Loader):
                     raise TBotException(code=6,
                                         return_message='Неверный тип количества новостей',
                                         message=f'{lst[1]} is not int')
-            url = check_config_attribute('news_url')
-            soup = InternetLoader.site_to_lxml(url)
-
-            news = {}
-            # Добавление главной новости
-            main_new = soup.find('div', class_='cell-main-photo__hover')
-            main_title = main_new.find('div', class_='cell-main-photo__title').text
-            main_title = shild_special_symbols(main_title)
-            main_time = main_new.find('div', class_='cell-info__date').text
-            main_href = main_new.find('a', class_='cell-main-photo__link').get('href')
-            news[main_time] = f"[{main_title}]({main_href})"
-
-            # Добавление остальных
-            div_raw = soup.find_all('a', class_='cell-list__item-link')
-            for n in div_raw:
-                news_time = n.find('div', class_='cell-info__date')
-                if news_time and request.text:
-                    form_text = n.get('title')
-                    form_text = shild_special_symbols(form_text)
-                    news[news_time.text] = f"[{form_text}]({n.get('href')})"
-                if len(news) == count:
-                    break
-            resp.text = dict_to_str(news, ' ')
+                if count < 1:
+                    raise TBotException(code=6, return_message='Количество новостей должно быть больше 0')
+            if not len(self.news_feed):
+                self.refresh_news()
+            resp.text = '\n'.join(self.news_feed.latest(count)) + '\n'
             resp.parse_mode = 'MarkdownV2'
             return resp
         except TBotException as e:
@@ -323,20 +517,27 @@ class InternetLoader(Loader):
             e.send_error(traceback.format_exc())
             return e.return_message()
 
-    async def _get_url(self, session, url) -> None:
+    @staticmethod
+    async def _request_url(session, url) -> aiohttp.ClientResponse:
+        async with session.get(url) as res:
+            await res.text()
+            if res.status >= 400:
+                raise TBotException(code=1, message=f'URL: {url}. Bad response status: {res.status}')
+            return res
+
+    async def _get_url(self, session, url) -> aiohttp.ClientResponse or None:
         """
         Get async url data
+        Concurrent requests of the same url share one response with already read body
         """
         try:
-            async with session.get(url) as res:
-                await res.text()
-                if res.status >= 400:
-                    raise TBotException(code=1, message=f'URL: {url}. Bad response status: {res.status}')
-                self.async_url_data.append(res)
+            return await single_flight.do_async(('GET', url), self._request_url, session, url,
+                                                wait_timeout=session.timeout.total)
         except (
             TBotException,
             aiohttp.client_exceptions.ClientConnectionError,
             aiohttp.client_exceptions.ClientConnectorCertificateError,
+            asyncio.TimeoutError,
             RuntimeError
         ):
             pass
@@ -348,7 +549,6 @@ class InternetLoader(Loader):
         :param:
         :return: events digest
         """
-        self.async_url_data = []
         tasks = []
         resp = LoaderResponse()
         headers = {
@@ -357,11 +557,11 @@ class InternetLoader(Loader):
         }
         try:
             url = check_config_attribute('events_url')
-            async with aiohttp.ClientSession(headers=headers) as session:
-                tasks.append(asyncio.create_task(self._get_url(session, url)))
-                await asyncio.gather(*tasks)
-                tasks = []
-                res = self.async_url_data.pop()
+            timeout = aiohttp.ClientTimeout(total=request.deadline.timeout())
+            async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+                res = await self._get_url(session, url)
+                if res is None:
+                    raise TBotException(code=1, message=f'Error connection to {url}')
                 res_text = await res.text()
                 soup = BeautifulSoup(res_text, 'lxml')
                 if not soup:
@@ -373,9 +573,10 @@ class InternetLoader(Loader):
                     links[a.text] = a.get('href')
                 for _, link in links.items():
                     tasks.append(asyncio.create_task(self._get_url(session, link)))
-                await asyncio.gather(*tasks)
                 events = {}
-                for raw in self.async_url_data:
+                for raw in await asyncio.gather(*tasks):
+                    if raw is None:
+                        continue
                     events_links = []
                     raw_text = await raw.text()
                     soup_curr = BeautifulSoup(raw_text, 'lxml')
@@ -399,129 +600,177 @@ class InternetLoader(Loader):
             e.send_error(traceback.format_exc())
             return e.return_message()
 
+    def random_restaurant(self, key=None) -> str:
+        """
+        Get random restaurant from local catalog or internet
+        :return: restaurant string
+        """
+        record = self.catalog.random('restaurant')
+        if record:
+            return record['text']
+        url = check_config_attribute('restaurant_url')
+        soup = InternetLoader.site_to_lxml(url + '/msk/catalog/restaurants/all/')
+        div_nav_raw = soup.find('div', class_='pagination-wrapper')
+        a_raw = div_nav_raw.find('a')
+        page_count = int(a_raw.get('data-nav-page-count'))
+        rand_page = random.choice(range(1, page_count + 1))
+        if rand_page > 1:
+            soup = InternetLoader.site_to_lxml(config.LINKS['restaurant_url']
+                                               + '/msk/catalog/restaurants/all/'
+                                               + f'?page={rand_page}')
+        names = soup.find_all('a', class_='name')
+        restaurant = random.choice(names)
+        link = config.LINKS['restaurant_url'] + restaurant.get('href')
+        return self._restaurant_text(InternetLoader.site_to_lxml(link), restaurant.text, link)
+
+    @staticmethod
+    def _restaurant_text(soup: BeautifulSoup, title: str, link: str) -> str:
+        """
+        Make restaurant description from its page
+        """
+        div_raw = soup.find('div', class_='props one-line-props')
+        final_restaurant = dict()
+        final_restaurant[0] = title
+        for d in div_raw:
+            name = d.find('div', class_='name')
+            if name:
+                name = name.text
+            value = d.find('a')
+            if value:
+                value = value.text.strip().replace('\n', '')
+            if name is not None and value is not None:
+                final_restaurant[name] = value
+        final_restaurant[1] = link
+        return dict_to_str(final_restaurant, ' ')
+
     @check_permission()
     def get_restaurant(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get restaurant from internet
+        Get random restaurant from buffer or internet
         :param:
         :return: restaurant string
         """
         resp = LoaderResponse()
         try:
-            url = check_config_attribute('restaurant_url')
-            soup = InternetLoader.site_to_lxml(url + '/msk/catalog/restaurants/all/')
-            div_nav_raw = soup.find('div', class_='pagination-wrapper')
-            a_raw = div_nav_raw.find('a')
-            page_count = int(a_raw.get('data-nav-page-count'))
-            rand_page = random.choice(range(1, page_count + 1))
-            if rand_page > 1:
-                soup = InternetLoader.site_to_lxml(config.LINKS['restaurant_url']
-                                                   + '/msk/catalog/restaurants/all/'
-                                                   + f'?page={rand_page}')
-            names = soup.find_all('a', class_='name')
-            restaurant = random.choice(names)
-            soup = InternetLoader.site_to_lxml(config.LINKS['restaurant_url'] + restaurant.get('href'))
-            div_raw = soup.find('div', class_='props one-line-props')
-            final_restaurant = dict()
-            final_restaurant[0] = restaurant.text
-            for d in div_raw:
-                name = d.find('div', class_='name')
-                if name:
-                    name = name.text
-                value = d.find('a')
-                if value:
-                    value = value.text.strip().replace('\n', '')
-                if name is not None and value is not None:
-                    final_restaurant[name] = value
-            final_restaurant[1] = config.LINKS['restaurant_url'] + restaurant.get('href')
-            resp.text = dict_to_str(final_restaurant, ' ')
+            resp.text = self.random_buffer.pop('food') or self.random_restaurant()
             return resp
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
             return e.return_message()
 
+    def random_poem(self, key=None) -> str:
+        """
+        Get random poem from internet
+        :return: poesy string
+        """
+        url = check_config_attribute('poesy_url')
+        soup = InternetLoader.site_to_lxml(url)
+        div_raw = soup.find('div', class_='_2uPBE')
+        a_raw = div_raw.find_all('a', class_='GmJ5E')
+        count = int(a_raw[-1].text)
+        rand = random.randint(1, count)
+        if rand > 1:
+            soup = InternetLoader.site_to_lxml(config.LINKS['poesy_url'] + f'?page={rand}')
+        poems_raw = soup.find('div', class_='_2VELq')
+        poems_raw = poems_raw.find_all('div', class_='_1jGw_')
+        rand_poem_raw = random.choice(poems_raw)
+        href = rand_poem_raw.find('a', class_='_2A3Np').get('href')
+        link = '/'.join(config.LINKS['poesy_url'].split('/')[:-3]) + href
+
+        soup = InternetLoader.site_to_lxml(link)
+
+        div_raw = soup.find('div', class_='_1MTBU _3RpDE _47J4f _3IEeu')
+        author = div_raw.find('div', class_='_14JnI').text
+        name = div_raw.find('div', class_='_2jzeL').text
+        strings_raw = div_raw.find('div', class_='_3P9bi')
+        year = ''
+        year_raw = strings_raw.find('div')
+        if year_raw:
+            year = f'\n\n{year_raw.text}'
+        raw_p = strings_raw.find_all('p', class_='')
+        quatrains = []
+        for p in raw_p:
+            quatrain = p.decode()
+            quatrain = quatrain.replace('<p class="">', '')
+            quatrain = quatrain.replace('<strong>', '\t')
+            quatrain = quatrain.replace('</strong>', '')
+            quatrain = quatrain.replace('<em>', '')
+            quatrain = quatrain.replace('</em>', '')
+            quatrain = quatrain.replace('</p>', '')
+            quatrain = quatrain.replace('<br/>', '\n')
+            quatrains.append(quatrain)
+        poem = '\n\n'.join(quatrains)
+        return f'{author}\n\n{name}\n\n{poem}{year}'
+
     @check_permission()
     def get_poem(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get poem from internet
+        Get random poem from buffer or internet
         :param:
         :return: poesy string
         """
         resp = LoaderResponse()
         try:
-            url = check_config_attribute('poesy_url')
-            soup = InternetLoader.site_to_lxml(url)
-            div_raw = soup.find('div', class_='_2uPBE')
-            a_raw = div_raw.find_all('a', class_='GmJ5E')
-            count = int(a_raw[-1].text)
-            rand = random.randint(1, count)
-            if rand > 1:
-                soup = InternetLoader.site_to_lxml(config.LINKS['poesy_url'] + f'?page={rand}')
-            poems_raw = soup.find('div', class_='_2VELq')
-            poems_raw = poems_raw.find_all('div', class_='_1jGw_')
-            rand_poem_raw = random.choice(poems_raw)
-            href = rand_poem_raw.find('a', class_='_2A3Np').get('href')
-            link = '/'.join(config.LINKS['poesy_url'].split('/')[:-3]) + href
-
-            soup = InternetLoader.site_to_lxml(link)
-
-            div_raw = soup.find('div', class_='_1MTBU _3RpDE _47J4f _3IEeu')
-            author = div_raw.find('div', class_='_14JnI').text
-            name = div_raw.find('div', class_='_2jzeL').text
-            strings_raw = div_raw.find('div', class_='_3P9bi')
-            year = ''
-            year_raw = strings_raw.find('div')
-            if year_raw:
-                year = f'\n\n{year_raw.text}'
-            raw_p = strings_raw.find_all('p', class_='')
-            quatrains = []
-            for p in raw_p:
-                quatrain = p.decode()
-                quatrain = quatrain.replace('<p class="">', '')
-                quatrain = quatrain.replace('<strong>', '\t')
-                quatrain = quatrain.replace('</strong>', '')
-                quatrain = quatrain.replace('<em>', '')
-                quatrain = quatrain.replace('</em>', '')
-                quatrain = quatrain.replace('</p>', '')
-                quatrain = quatrain.replace('<br/>', '\n')
-                quatrains.append(quatrain)
-            poem = '\n\n'.join(quatrains)
-            resp.text = f'{author}\n\n{name}\n\n{poem}{year}'
+            resp.text = self.random_buffer.pop('poem') or self.random_poem()
             return resp
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
             return e.return_message()
 
+    def get_phone_operator_info(self, number: str) -> dict:
+        """
+        Get current phone number operator from internet
+        Results are cached per number
+        :param number: number like 89161234567
+        :return: phone info dict
+        """
+        phone_info = self.phone_operators.get(number)
+        if phone_info is not None:
+            return phone_info
+        url = check_config_attribute('kodi_url')
+        res = InternetLoader.regular_request(url, method='POST', data={'number': number})
+        if 'Ошибка: Номер не найден' in res.text:
+            raise TBotException(code=1, return_message='Номер не найден')
+        soup = BeautifulSoup(res.text, 'lxml')
+        div_raw = soup.find('div', class_='content__in')
+        table = div_raw.find('table', class_='teltr tel-mobile')
+        tr_raw = table.find_all('tr', class_='')
+        td_raw = tr_raw[-1].find_all('td')
+        phone_info = dict()
+        phone_info['Страна'] = td_raw[0].find('strong').text
+        operator_info = td_raw[1].find('strong').text
+        phone_info['Регион'] = operator_info.split('[')[1].replace(']', '').replace(',', '')
+        phone_info['Изначальный оператор'] = operator_info.split(' ')[0]
+        p_raw = div_raw.find('p', style='')
+        span_raw = p_raw.find_all('span')
+        phone_info['Текущий оператор'] = span_raw[-1].text
+        self.phone_operators.set(number, phone_info)
+        return phone_info
+
     @check_permission()
     def get_phone_number_info(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get phone number info from internet
+        Get phone number info from local index
+        Current operator is taken from internet
         :param:
-        :return: poesy string
+        :return: phone info string
         """
         resp = LoaderResponse()
         try:
-            url = check_config_attribute('kodi_url')
             lst = request.text.split()
-            number = is_phone_number(lst[1])
-            res = requests.post(url, data={'number': number})
-            if 'Ошибка: Номер не найден' in res.text:
-                raise TBotException(code=1, returt_message='Номер не найден')
-            soup = BeautifulSoup(res.text, 'lxml')
-            div_raw = soup.find('div', class_='content__in')
-            table = div_raw.find('table', class_='teltr tel-mobile')
-            tr_raw = table.find_all('tr', class_='')
-            td_raw = tr_raw[-1].find_all('td')
-            phone_info = dict()
-            phone_info['Страна'] = td_raw[0].find('strong').text
-            operator_info = td_raw[1].find('strong').text
-            phone_info['Регион'] = operator_info.split('[')[1].replace(']', '').replace(',', '')
-            phone_info['Изначальный оператор'] = operator_info.split(' ')[0]
-            p_raw = div_raw.find('p', style='')
-            span_raw = p_raw.find_all('span')
-            phone_info['Текущий оператор'] = span_raw[-1].text
+            number = is_phone_number(''.join(lst[1:])) if len(lst) > 1 else None
+            if not number:
+                raise TBotException(code=6, return_message='Неправильный формат номера')
+            phone_info = self.phone_index.find(number)
+            if phone_info is None:
+                phone_info = self.get_phone_operator_info(number)
+            else:
+                try:
+                    phone_info['Текущий оператор'] = self.get_phone_operator_info(number)['Текущий оператор']
+                except (TBotException, AttributeError, IndexError) as e:
+                    logger.warning(f'Current operator of {number} not found: {e}')
             resp.text = dict_to_str(phone_info, ': ')
             return resp
         except TBotException as e:
@@ -532,14 +781,12 @@ class InternetLoader(Loader):
     @check_permission()
     def get_random_movie(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get random movie from internet
+        Get random movie from buffer or internet
         :param:
         :return: random movie string
         """
         resp = LoaderResponse()
         command = request.text.split()
-        year_from = 0
-        year_to = 0
         try:
             if len(command) > 2:
                 raise TBotException(code=6,
@@ -549,10 +796,7 @@ class InternetLoader(Loader):
                 resp.text = 'Выберите промежуток'
                 resp.markup = custom_markup(
                     command='movie',
-                    category=[
-                       '1950-1960', '1960-1970', '1970-1980',
-                       '1980-1990', '1990-2000', '2000-2010', '2010-2020'
-                    ],
+                    category=[f'{year_from}-{year_to}' for year_from, year_to in MOVIE_YEARS_RANGES],
                     smile='🎞'
                 )
                 resp.is_extra_log = False
@@ -562,8 +806,6 @@ class InternetLoader(Loader):
                     try:
                         act_year_from = int(command[1])
                         act_year_to = act_year_from
-                        year_from = act_year_from
-                        year_to = act_year_to
                     except ValueError:
                         raise TBotException(code=6, return_message=f'Неправильный тип параметра: {command[1]}')
                     else:
@@ -585,56 +827,74 @@ class InternetLoader(Loader):
                                                                        'чем год конца интервала')
                     except ValueError:
                         raise TBotException(code=6, return_message='Неправильный тип параметра')
-            url = check_config_attribute('random_movie_url')
-            soup = InternetLoader.site_to_lxml(url)
-            result_top = soup.find('div', class_='search_results_top')
-            span_raw = result_top.find('span')
-            is_result = int(span_raw.text.split(' ')[-1])
-            if not is_result:
-                raise TBotException(code=1, return_message=f'Фильмы {year_from}-{year_to} не найдены')
-            div_raw = soup.find('div', class_='search_results search_results_last')
-            div_nav = div_raw.find('div', class_='navigator')
-            from_to = div_nav.find('div', class_='pagesFromTo').text.split(' ')[0].split('—')
-            per_page = int(from_to[1]) - int(from_to[0]) - 1
-            page_count = int(div_nav.find('div', class_='pagesFromTo').text.split(' ')[-1]) // per_page
-            current_try = 0
-            max_try = 5
-            symbols = 'аоуыэяеёюибвгдйжзклмнпрстфхцчшщьъАОУЫЭЯЕЁЮИБВГДЙЖЗКЛМНПРСТФХЦЧШЩЬЪ'
-            while current_try < max_try:
-                current_try += 1
-                random_page_number = str(random.choice(range(1, page_count)))
-                movie_soup = InternetLoader.site_to_lxml(url + str(random_page_number))
-                movie_div_raw = movie_soup.find('div', class_='search_results search_results_last')
-                div_elements = movie_div_raw.find_all('div', class_='element')
-                div_elements = list(filter(lambda x: 'no-poster' not in x.find('img').get('title'), div_elements))
-                if not div_elements:
-                    logger.warning(f'No elements with poster')
-                    continue
-                try_count = 0
-                while True:
-                    random_movie_raw = random.choice(div_elements)
-                    p_raw = random_movie_raw.find('p', class_='name')
-                    name = p_raw.text
-                    name = name.replace('видео', '')
-                    name = name.replace('ТВ', '')
-                    for simb in name:
-                        if simb in symbols:
-                            movie_id = p_raw.find('a').get('href')
-                            movie_url = '/'.join(url.split('/')[:3])
-                            text = f'Случайный фильм {act_year_from}-{act_year_to} годов'
-                            link = movie_url + movie_id
-                            resp.text = f'{text}\n{link}'
-                            return resp
-                    try_count += 1
-                    if try_count > per_page:
-                        logger.warning(f'No elements with cyrillic symbols')
-                        break
-            raise TBotException(code=1, return_message=f'Фильм {year_from}-{year_to} годов не найден')
+            resp.text = self.random_buffer.pop('movie', (act_year_from, act_year_to)) \
+                or self.random_movie((act_year_from, act_year_to))
+            return resp
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
             return e.return_message()
 
+    def random_movie(self, years: tuple) -> str:
+        """
+        Get random movie from local catalog or internet
+        :param years: (year from, year to)
+        :return: random movie string
+        """
+        act_year_from, act_year_to = years
+        record = self.catalog.random('movie', year_from=act_year_from, year_to=act_year_to)
+        if record:
+            return f"Случайный фильм {act_year_from}-{act_year_to} годов\n{record['url']}"
+        deadline = Deadline.current()
+        url = check_config_attribute('random_movie_url')
+        soup = InternetLoader.site_to_lxml(url)
+        result_top = soup.find('div', class_='search_results_top')
+        span_raw = result_top.find('span')
+        is_result = int(span_raw.text.split(' ')[-1])
+        if not is_result:
+            raise TBotException(code=1, return_message=f'Фильмы {act_year_from}-{act_year_to} не найдены')
+        div_raw = soup.find('div', class_='search_results search_results_last')
+        div_nav = div_raw.find('div', class_='navigator')
+        from_to = div_nav.find('div', class_='pagesFromTo').text.split(' ')[0].split('—')
+        per_page = int(from_to[1]) - int(from_to[0]) - 1
+        page_count = int(div_nav.find('div', class_='pagesFromTo').text.split(' ')[-1]) // per_page
+        current_try = 0
+        max_try = 5
+        symbols = 'аоуыэяеёюибвгдйжзклмнпрстфхцчшщьъАОУЫЭЯЕЁЮИБВГДЙЖЗКЛМНПРСТФХЦЧШЩЬЪ'
+        while current_try < max_try and not (deadline and deadline.expired):
+            current_try += 1
+            random_page_number = str(random.choice(range(1, page_count)))
+            movie_soup = InternetLoader.site_to_lxml(url + str(random_page_number))
+            movie_div_raw = movie_soup.find('div', class_='search_results search_results_last')
+            div_elements = movie_div_raw.find_all('div', class_='element')
+            div_elements = list(filter(lambda x: 'no-poster' not in x.find('img').get('title'), div_elements))
+            if not div_elements:
+                logger.warning(f'No elements with poster')
+                continue
+            try_count = 0
+            while True:
+                random_movie_raw = random.choice(div_elements)
+                p_raw = random_movie_raw.find('p', class_='name')
+                name = p_raw.text
+                name = name.replace('видео', '')
+                name = name.replace('ТВ', '')
+                for simb in name:
+                    if simb in symbols:
+                        movie_id = p_raw.find('a').get('href')
+                        movie_url = '/'.join(url.split('/')[:3])
+                        text = f'Случайный фильм {act_year_from}-{act_year_to} годов'
+                        link = movie_url + movie_id
+                        return f'{text}\n{link}'
+                try_count += 1
+                if try_count > per_page:
+                    logger.warning(f'No elements with cyrillic symbols')
+                    break
+        if deadline and deadline.expired:
+            raise TBotException(code=9,
+                                return_message=f'Не успел найти фильм {act_year_from}-{act_year_to} годов, '
+                                               f'попробуйте еще раз')
+        raise TBotException(code=1, return_message=f'Фильм {act_year_from}-{act_year_to} годов не найден')
+
     def get_book_genres(self) -> None or dict:
         """
         Get list of book's genres
@@ -659,7 +919,7 @@ class InternetLoader(Loader):
     @check_permission()
     def get_book(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get random book from internet
+        Get random book from buffer or internet
         :param:
         :return: book
         """
@@ -684,34 +944,244 @@ class InternetLoader(Loader):
                     category = self.book_genres[genre].lower()
             if not category:
                 raise TBotException(code=2, return_message='Жанр не найден')
-            site = '/'.join(config.LINKS['book_url'].split('/')[:3])
-            soup = InternetLoader.site_to_lxml(f'{site}/genre/{category.capitalize()}/listview/biglist/~2')
-            div_raw = soup.find_all('div', class_='pagination-right')
-            a_raw = div_raw[0].find_all('a', class_='pagination-page pagination-wide')
-            last_page_raw = a_raw[-1].get('href')
-            last_page = last_page_raw.split('~')[-1]
-            random_page = random.choice(range(1, int(last_page) + 1))
-            soup = InternetLoader.site_to_lxml(f'{site}/genre/{category.capitalize()}/listview/biglist/~{random_page}')
-            div_raw = soup.find('div', class_='blist-biglist')
-            book_list = div_raw.find_all('div', class_='book-item-manage')
-            random_book_raw = random.choice(book_list)
-            random_book = random_book_raw.find('a', class_='brow-book-name with-cycle')
-            resp.text = f"{random_book.get('title')}\n{site}{random_book.get('href')}"
+            resp.text = self.random_buffer.pop('book', category) or self.random_book(category)
             return resp
         except TBotException as e:
             logger.exception(e.context)
             e.send_error(traceback.format_exc())
             return e.return_message()
 
+    def random_book(self, category: str) -> str:
+        """
+        Get random book of genre from local catalog or internet
+        :param category: genre
+        :return: book
+        """
+        record = self.catalog.random('book', genre=category)
+        if record:
+            return f"{record['title']}\n{record['url']}"
+        site = '/'.join(config.LINKS['book_url'].split('/')[:3])
+        soup = InternetLoader.site_to_lxml(f'{site}/genre/{category.capitalize()}/listview/biglist/~2')
+        div_raw = soup.find_all('div', class_='pagination-right')
+        a_raw = div_raw[0].find_all('a', class_='pagination-page pagination-wide')
+        last_page_raw = a_raw[-1].get('href')
+        last_page = last_page_raw.split('~')[-1]
+        random_page = random.choice(range(1, int(last_page) + 1))
+        soup = InternetLoader.site_to_lxml(f'{site}/genre/{category.capitalize()}/listview/biglist/~{random_page}')
+        div_raw = soup.find('div', class_='blist-biglist')
+        book_list = div_raw.find_all('div', class_='book-item-manage')
+        random_book_raw = random.choice(book_list)
+        random_book = random_book_raw.find('a', class_='brow-book-name with-cycle')
+        return f"{random_book.get('title')}\n{site}{random_book.get('href')}"
+
+    def crawl_catalog(self) -> None:
+        """
+        Fetch due pages of the local catalog
+        Only new, changed or stale pages are fetched, not more than CATALOG_CONCURRENCY at once
+        """
+        self.catalog.add_pages([
+            (check_config_attribute('random_movie_url'), 'movie_index', None),
+            (check_config_attribute('book_url'), 'book_index', None),
+            (check_config_attribute('restaurant_url') + '/msk/catalog/restaurants/all/', 'restaurant_index', None),
+        ])
+        pages = self.catalog.due_pages(getattr(config, 'CATALOG_PAGES_PER_RUN', 50))
+        with ThreadPoolExecutor(max_workers=getattr(config, 'CATALOG_CONCURRENCY', 2)) as pool:
+            list(pool.map(self._crawl_page, pages))
+        logger.info(f"Catalog crawled {len(pages)} pages. "
+                    f"Movies: {self.catalog.count('movie')}, "
+                    f"books: {self.catalog.count('book')}, "
+                    f"restaurants: {self.catalog.count('restaurant')}")
+
+    def _crawl_page(self, page) -> None:
+        """
+        Fetch page with conditional request and parse it, if it is changed
+        :param page: row of catalog pages
+        """
+        url = page['url']
+        revisit = getattr(config, 'CATALOG_REVISIT_INTERVAL', 7 * 24 * 60 * 60)
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        if page['etag']:
+            headers['If-None-Match'] = page['etag']
+        if page['last_modified']:
+            headers['If-Modified-Since'] = page['last_modified']
+        try:
+            res = requests.get(url, headers=headers, timeout=getattr(config, 'REQUEST_TIMEOUT', 30))
+        except requests.exceptions.RequestException as e:
+            logger.warning(f'Catalog page {url} is not fetched: {e}')
+            self.catalog.page_failed(url, revisit / 7)
+            return
+        finally:
+            time.sleep(getattr(config, 'CATALOG_REQUEST_DELAY', 1))
+        if res.status_code == 304:
+            self.catalog.page_visited(url, time.time() + revisit)
+            return
+        if res.status_code != 200:
+            logger.warning(f'Catalog page {url} bad response status: {res.status_code}')
+            self.catalog.page_failed(url, revisit / 7)
+            return
+        content_hash = hashlib.sha1(res.content).hexdigest()
+        if content_hash != page['content_hash']:
+            res.encoding = 'utf-8'
+            try:
+                kind, records, pages = self.catalog_parsers[page['kind']](BeautifulSoup(res.text, 'lxml'), page)
+            except (AttributeError, IndexError, ValueError, TypeError) as e:
+                logger.warning(f'Catalog page {url} is not parsed: {e}')
+                self.catalog.page_failed(url, revisit / 7)
+                return
+            if records:
+                self.catalog.upsert_records(kind, records)
+            if pages:
+                self.catalog.add_pages(pages)
+        self.catalog.page_visited(url, time.time() + revisit, res.headers.get('ETag'),
+                                  res.headers.get('Last-Modified'), content_hash)
+
+    @staticmethod
+    def _parse_movie_index(soup: BeautifulSoup, page) -> tuple:
+        div_raw = soup.find('div', class_='search_results search_results_last')
+        div_nav = div_raw.find('div', class_='navigator')
+        from_to = div_nav.find('div', class_='pagesFromTo').text.split(' ')[0].split('—')
+        per_page = int(from_to[1]) - int(from_to[0]) - 1
+        page_count = int(div_nav.find('div', class_='pagesFromTo').text.split(' ')[-1]) // per_page
+        return 'movie', [], [(page['url'] + str(number), 'movie_list', None) for number in range(1, page_count)]
+
+    @staticmethod
+    def _parse_movie_list(soup: BeautifulSoup, page) -> tuple:
+        symbols = 'аоуыэяеёюибвгдйжзклмнпрстфхцчшщьъАОУЫЭЯЕЁЮИБВГДЙЖЗКЛМНПРСТФХЦЧШЩЬЪ'
+        site = '/'.join(page['url'].split('/')[:3])
+        movies = []
+        movie_div_raw = soup.find('div', class_='search_results search_results_last')
+        for element in movie_div_raw.find_all('div', class_='element'):
+            img = element.find('img')
+            if not img or 'no-poster' in (img.get('title') or ''):
+                continue
+            p_raw = element.find('p', class_='name')
+            name = p_raw.text.replace('видео', '').replace('ТВ', '')
+            if not any(simb in symbols for simb in name):
+                continue
+            year = re.search(r'\b(1[89]\d{2}|20\d{2})\b', element.text)
+            movies.append({
+                'url': site + p_raw.find('a').get('href'),
+                'title': name.strip(),
+                'year': int(year.group(0)) if year else None
+            })
+        return 'movie', movies, []
+
+    @staticmethod
+    def _parse_book_index(soup: BeautifulSoup, page) -> tuple:
+        site = '/'.join(page['url'].split('/')[:3])
+        pages = []
+        for genre in soup.find_all('div', class_='card-white genre-block'):
+            title_raw = genre.find('a', class_='main-genre-title')
+            if title_raw and title_raw.text:
+                category = title_raw.get('href').replace('/genre/', '').lower()
+                pages.append((f'{site}/genre/{category.capitalize()}/listview/biglist/~2', 'book_genre', category))
+        return 'book', [], pages
+
+    @staticmethod
+    def _parse_book_genre(soup: BeautifulSoup, page) -> tuple:
+        site = '/'.join(page['url'].split('/')[:3])
+        category = page['key']
+        div_raw = soup.find_all('div', class_='pagination-right')
+        a_raw = div_raw[0].find_all('a', class_='pagination-page pagination-wide')
+        last_page = int(a_raw[-1].get('href').split('~')[-1])
+        return 'book', [], [(f'{site}/genre/{category.capitalize()}/listview/biglist/~{number}', 'book_list', category)
+                            for number in range(1, last_page + 1)]
+
+    @staticmethod
+    def _parse_book_list(soup: BeautifulSoup, page) -> tuple:
+        site = '/'.join(page['url'].split('/')[:3])
+        books = []
+        div_raw = soup.find('div', class_='blist-biglist')
+        for book_raw in div_raw.find_all('div', class_='book-item-manage'):
+            book = book_raw.find('a', class_='brow-book-name with-cycle')
+            if book:
+                books.append({'url': f"{site}{book.get('href')}", 'title': book.get('title'), 'genre': page['key']})
+        return 'book', books, []
+
+    @staticmethod
+    def _parse_restaurant_index(soup: BeautifulSoup, page) -> tuple:
+        div_nav_raw = soup.find('div', class_='pagination-wrapper')
+        page_count = int(div_nav_raw.find('a').get('data-nav-page-count'))
+        return 'restaurant', [], [(page['url'] + f'?page={number}', 'restaurant_list', None)
+                                  for number in range(1, page_count + 1)]
+
+    @staticmethod
+    def _parse_restaurant_list(soup: BeautifulSoup, page) -> tuple:
+        site = config.LINKS['restaurant_url']
+        return 'restaurant', [], [(site + name.get('href'), 'restaurant', name.text)
+                                  for name in soup.find_all('a', class_='name')]
+
+    def _parse_restaurant(self, soup: BeautifulSoup, page) -> tuple:
+        return 'restaurant', [{
+            'url': page['url'],
+            'title': page['key'],
+            'text': self._restaurant_text(soup, page['key'], page['url'])
+        }], []
+
+    @staticmethod
+    def _parse_painting_page(link: str) -> tuple:
+        """
+        Get image url and title from painting page
+        :param link: painting page
+        :return: (image url, title)
+        """
+        soup = InternetLoader.site_to_lxml(link)
+        p_raw = soup.find('p', class_='xpic')
+        img_raw = p_raw.find('img')
+        picture = img_raw.get('src')
+        if not picture:
+            raise TBotException(code=1, return_message='Картина не найдена')
+        text = img_raw.get('title')
+        if text:
+            text = text.split('900')[0]
+        else:
+            text = 'Picture'
+        return picture, text
+
+    def refresh_painting_catalog(self) -> None:
+        """
+        Add new paintings to the local catalog and download their images
+        """
+        url = check_config_attribute('russian_painting_url')
+        site = '/'.join(url.split('/')[:3])
+        max_new = getattr(config, 'PAINTINGS_REFRESH_SIZE', 50)
+        try:
+            soup = InternetLoader.site_to_lxml(url)
+            pages = [site + div.find('a').get('href') for div in soup.find_all('div', class_='pic') if div.find('a')]
+            new_pages = [page for page in pages if page not in self.painting_catalog][:max_new]
+            for page in new_pages:
+                try:
+                    picture, text = self._parse_painting_page(page)
+                except (TBotException, AttributeError) as e:
+                    logger.warning(f'Painting {page} is not parsed: {e}')
+                    continue
+                self.painting_catalog.add(page, picture, text)
+            for painting in self.painting_catalog.without_image()[:max_new]:
+                try:
+                    image = InternetLoader.regular_request(painting['image_url'])
+                    self.painting_catalog.save_image(painting['page'], image.content)
+                except (TBotException, OSError) as e:
+                    logger.warning(f"Image {painting['image_url']} is not downloaded: {e}")
+        finally:
+            self.painting_catalog.save()
+        logger.info(f'Painting catalog refreshed. len = {len(self.painting_catalog)}')
+
     @check_permission()
     def get_russian_painting(self, request: LoaderRequest) -> LoaderResponse:
         """
-        Get russian painting from internet
+        Get russian painting from local catalog or internet
         :param:
         :return: dict
         """
         resp = LoaderResponse()
         try:
+            painting = self.painting_catalog.random()
+            if painting:
+                resp.photo = file_ids.get(painting['page']) or painting['image_path']
+                resp.photo_key = painting['page']
+                resp.photo_file = painting['image_path']
+                resp.text = painting['title']
+                return resp
             url = check_config_attribute('russian_painting_url')
             soup = InternetLoader.site_to_lxml(url)
             div_raw = soup.find_all('div', class_='pic')
@@ -719,21 +1189,7 @@ class InternetLoader(Loader):
             a_raw = random_painting.find('a')
             href = a_raw.get('href')
             site = '/'.join(config.LINKS['russian_painting_url'].split('/')[:3])
-            link = site + href
-            soup = InternetLoader.site_to_lxml(link)
-            p_raw = soup.find('p', class_='xpic')
-            img_raw = p_raw.find('img')
-            picture = img_raw.get('src')
-            if picture:
-                resp.photo = picture
-            else:
-                raise TBotException(code=1, return_message='Картина не найдена')
-            text = img_raw.get('title')
-            if text:
-                text = text.split('900')[0]
-            else:
-                text = 'Picture'
-            resp.text = text
+            resp.photo, resp.text = self._parse_painting_page(site + href)
             return resp
         except TBotException as e:
             logger.exception(e.context)
@@ -1,11 +1,11 @@
+import inspect
 from functools import wraps
-from sqlalchemy import exc
 from telebot.types import InlineKeyboardMarkup
 
 import config
-from extentions import db
+from deadline import Deadline
 from loggers import get_logger
-from models import LibPrivileges, LogRequests
+from loaders.privileges import privileges
 
 logger = get_logger(__name__)
 
@@ -20,21 +20,37 @@ def check_permission(needed_level: str = 'regular'):
     :param needed_level: permission level needed to get func result
     :return: wrapped function
     """
+    def is_allowed(request: LoaderRequest) -> bool:
+        logger.info(f'Check permission')
+        if needed_level not in Loader.privileges_levels.keys():
+            logger.error(f'{needed_level} is not permission level name')
+        user_permission = request.privileges
+        logger.info(f'User permission: {user_permission}, '
+                    f'needed permission: {Loader.privileges_levels[needed_level]}')
+        if user_permission < Loader.privileges_levels[needed_level]:
+            logger.info('Access denied')
+            return False
+        logger.info('Access allowed')
+        return True
+
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            # deadline активируется внутри корутины, которая выполняется после возврата из декоратора
+            @wraps(func)
+            async def async_wrap(self, request: LoaderRequest) -> LoaderResponse:
+                if not is_allowed(request):
+                    return LoaderResponse(text='Permission denied')
+                logger.info(func.__qualname__)
+                with request.deadline:
+                    return await func(self, request)
+            return async_wrap
+
         @wraps(func)
         def wrap(self, request: LoaderRequest) -> LoaderResponse:
-            logger.info(f'Check permission')
-            if needed_level not in Loader.privileges_levels.keys():
-                logger.error(f'{needed_level} is not permission level name')
-            user_permission = request.privileges
-            logger.info(f'User permission: {user_permission}, '
-                        f'needed permission: {Loader.privileges_levels[needed_level]}')
-            if user_permission < Loader.privileges_levels[needed_level]:
-                logger.info('Access denied')
+            if not is_allowed(request):
                 return LoaderResponse(text='Permission denied')
-            else:
-                logger.info('Access allowed')
-                logger.info(func.__qualname__)
+            logger.info(func.__qualname__)
+            with request.deadline:
                 resp = func(self, request)
             return resp
         return wrap
@@ -46,17 +62,7 @@ class Loader:
     Common loaders class
     """
 
-    if config.USE_DB:
-        try:
-            privileges_levels = {privileges.name: privileges.value
-                                 for privileges in LibPrivileges.query.with_entities(LibPrivileges.name,
-                                                                                     LibPrivileges.value).all()}
-        except exc.DatabaseError as e:
-            logger.exception(f'DB connection error: {e}')
-            privileges_levels = config.PRIVILEGES_LEVELS
-            exit()
-    else:
-        privileges_levels = config.PRIVILEGES_LEVELS
+    privileges_levels = privileges
 
 
 class LoaderRequest:
@@ -64,14 +70,19 @@ class LoaderRequest:
         self,
         text: str,
         privileges: int,
-        chat_id: str
+        chat_id: str,
+        deadline: Deadline = None
     ):
         self.text = text
         self.privileges = privileges
         self.chat_id = chat_id
+        self.deadline = deadline or Deadline(getattr(config, 'REQUEST_DEADLINE', 30))
 
     def __repr__(self):
-        return f'TEXT: {self.text}, PRIVILEGES: {self.privileges}, CHAT_ID: {self.chat_id}'
+        return (f'TEXT: {self.text}, '
+                f'PRIVILEGES: {self.privileges}, '
+                f'CHAT_ID: {self.chat_id}, '
+                f'DEADLINE: {self.deadline}')
 
 
 class LoaderResponse:
@@ -82,24 +93,19 @@ class LoaderResponse:
         chat_id: int or list = None,
         markup: InlineKeyboardMarkup = None,
         parse_mode: str = None,
-        is_extra_log: bool = True  # Нужно ли логировать название функции
+        is_extra_log: bool = True,  # Нужно ли логировать название функции
+        photo_key: str = None,  # Ключ для сохранения file_id отправленного фото
+        photo_file: str = None  # Локальный файл фото, если photo - сохраненный file_id
     ):
         self.text = text
         self.photo = photo
+        self.photo_key = photo_key
+        self.photo_file = photo_file
         self.chat_id = chat_id
         self.markup = markup
         self.parse_mode = parse_mode
         self.is_extra_log = is_extra_log
 
-    @staticmethod
-    def extra_log(request_id: int, action: str):
-        lr = LogRequests.query.filter(
-            LogRequests.lr_id == request_id
-        ).one_or_none()
-        if lr:
-            lr.action = action
-            db.session.commit()
-
     def __repr__(self):
         return (f'CHAT_ID: {self.chat_id}, '
                 f'TEXT: {self.text}, '
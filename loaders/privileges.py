@@ -0,0 +1,131 @@
+import time
+import threading
+from collections.abc import Mapping
+
+from sqlalchemy import exc
+
+import config
+from loggers import get_logger
+from models import LibPrivileges
+
+logger = get_logger(__name__)
+
+
+class Privileges(Mapping):
+    """
+    Privileges levels {name: value}, loaded from DB on first use
+    Also keeps bidirectional map of privileges id and value.
+    If DB is unreachable, levels from config are used and loading is retried later
+    """
+
+    def __init__(self, retries: int = 3, backoff: float = 0.5, retry_interval: float = 60):
+        """
+        :param retries: count of load attempts in a row
+        :param backoff: delay before the second attempt, it is doubled for each next attempt
+        :param retry_interval: delay before the next loading, if all attempts are failed
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_interval = retry_interval
+        self._levels = None
+        self._ids = {}  # значение привилегий -> p_id
+        self._values = {}  # p_id -> значение привилегий
+        self._retry_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _query() -> list:
+        return LibPrivileges.query.with_entities(LibPrivileges.p_id,
+                                                 LibPrivileges.name,
+                                                 LibPrivileges.value).all()
+
+    def _load(self, retries: int = None) -> None:
+        """
+        :param retries: count of attempts, self.retries by default
+        """
+        retries = retries or self.retries
+        for attempt in range(retries):
+            try:
+                rows = self._query()
+            except exc.DatabaseError as e:
+                logger.warning(f'Privileges are not loaded (attempt {attempt + 1}): {e}')
+                if attempt + 1 < retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+                continue
+            self._levels = {privileges.name: privileges.value for privileges in rows}
+            self._ids = {privileges.value: privileges.p_id for privileges in rows}
+            self._values = {privileges.p_id: privileges.value for privileges in rows}
+            self._retry_at = None
+            logger.info(f'Privileges are loaded: {self._levels}')
+            return
+        logger.error(f'Privileges are not loaded, levels from config are used')
+        if self._levels is None:
+            self._levels = dict(config.PRIVILEGES_LEVELS)
+        self._retry_at = time.monotonic() + self.retry_interval
+
+    def _loaded(self) -> dict:
+        if self._levels is not None and (self._retry_at is None or time.monotonic() < self._retry_at):
+            return self._levels
+        with self._lock:
+            if self._levels is None and not config.USE_DB:
+                self._levels = dict(config.PRIVILEGES_LEVELS)
+            elif self._levels is None or (self._retry_at is not None and time.monotonic() >= self._retry_at):
+                self._load()
+            return self._levels
+
+    def reload(self) -> None:
+        """
+        Invalidate loaded privileges and load them again
+        """
+        with self._lock:
+            if config.USE_DB:
+                self._load()
+            else:
+                self._levels = dict(config.PRIVILEGES_LEVELS)
+
+    def _reload_unknown(self) -> None:
+        """
+        Reload privileges for unknown id or value: one attempt without backoff,
+        and no attempt until retry_interval is passed after a failed load
+        """
+        with self._lock:
+            if not config.USE_DB or (self._retry_at is not None and time.monotonic() < self._retry_at):
+                return
+            self._load(retries=1)
+
+    def id_of(self, value: int) -> int or None:
+        """
+        Get privileges id by value, privileges are reloaded once, if the value is unknown
+        """
+        self._loaded()
+        if value not in self._ids:
+            self._reload_unknown()
+        return self._ids.get(value)
+
+    def value_of(self, p_id: int) -> int or None:
+        """
+        Get privileges value by id, privileges are reloaded once, if the id is unknown
+        """
+        self._loaded()
+        if p_id not in self._values:
+            self._reload_unknown()
+        return self._values.get(p_id)
+
+    def __getitem__(self, name: str) -> int:
+        return self._loaded()[name]
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self):
+        return len(self._loaded())
+
+    def __repr__(self):
+        return repr(self._levels)
+
+
+privileges = Privileges(
+    retries=getattr(config, 'PRIVILEGES_LOAD_RETRIES', 3),
+    backoff=getattr(config, 'PRIVILEGES_LOAD_BACKOFF', 0.5),
+    retry_interval=getattr(config, 'PRIVILEGES_RETRY_INTERVAL', 60)
+)
@@ -0,0 +1,66 @@
+"""
+Maintenance commands
+python manage.py create-schema
+python manage.py migrate
+python manage.py explain
+python manage.py create-rollups
+python manage.py backfill-stats [--from 2022-01-01]
+"""
+import argparse
+import datetime
+
+import rollups
+import migrations
+import query_plans
+from extentions import db
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+def create_schema(args) -> None:
+    migrations.create_schema()
+    logger.info('Schema is created')
+
+
+def migrate(args) -> None:
+    applied = migrations.migrate()
+    logger.info(f'Applied migrations: {applied or "nothing to apply"}')
+
+
+def explain(args) -> None:
+    with db.engine.connect() as connection:
+        for name, (uses_index, plan) in query_plans.check(connection).items():
+            index = query_plans.HOT_QUERIES_INDEXES[name]
+            logger.info(f'{name}: {index} is {"used" if uses_index else "NOT used"}\n  ' + '\n  '.join(plan))
+
+
+def create_rollups(args) -> None:
+    rollups.create_tables()
+    logger.info('Rollup tables are created')
+
+
+def backfill_stats(args) -> None:
+    date_from = datetime.date.fromisoformat(args.date_from) if args.date_from else None
+    rollups.create_tables()
+    rollups.backfill(date_from)
+    logger.info(f'Statistics rollups are rebuilt from {date_from or "the beginning"}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='TBot maintenance')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create-schema', help='create schema of a new DB (SQLite or MySQL)').set_defaults(
+        func=create_schema)
+    commands.add_parser('migrate', help='apply schema migrations').set_defaults(func=migrate)
+    commands.add_parser('explain', help='check plans of hot queries').set_defaults(func=explain)
+    commands.add_parser('create-rollups', help='create statistics rollup tables').set_defaults(func=create_rollups)
+    backfill = commands.add_parser('backfill-stats', help='rebuild statistics rollups from log_requests')
+    backfill.add_argument('--from', dest='date_from', help='first date (YYYY-MM-DD), all history by default')
+    backfill.set_defaults(func=backfill_stats)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Schema migrations, they are applied in order by "python manage.py migrate"
+"""
+from sqlalchemy import text
+
+import rollups
+import sqlite_backend
+from extentions import db
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+def create_indexes(*names):
+    """
+    Migration, which creates indexes declared in models
+    """
+    def migration():
+        indexes = {index.name: index for table in db.Model.metadata.tables.values() for index in table.indexes}
+        for name in names:
+            indexes[name].create(db.engine, checkfirst=True)
+    return migration
+
+
+MIGRATIONS = [
+    ('0001_stat_rollups', rollups.create_tables),
+    ('0002_users_updated_at', [
+        'ALTER TABLE TBot.users '
+        'ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+        'CREATE INDEX ix_users_updated_at ON TBot.users (updated_at)',
+    ]),
+    ('0003_hot_queries_indexes', create_indexes(
+        'ix_log_requests_date_ins_action_chat_id',
+        'ix_users_login',
+        'ix_users_first_name',
+    )),
+    ('0004_poems_updated_at', [
+        'ALTER TABLE TBot.poems '
+        'ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+        'CREATE INDEX ix_poems_updated_at ON TBot.poems (updated_at)',
+    ]),
+]
+
+
+def applied_migrations() -> set:
+    db.session.execute(text(
+        'CREATE TABLE IF NOT EXISTS TBot.schema_migrations ('
+        'name VARCHAR(100) PRIMARY KEY, '
+        'applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)'
+    ))
+    db.session.commit()
+    return {name for name, in db.session.execute(text('SELECT name FROM TBot.schema_migrations'))}
+
+
+def migrate() -> list:
+    """
+    Apply not applied migrations
+    :return: names of applied migrations
+    """
+    applied = applied_migrations()
+    done = []
+    for name, migration in MIGRATIONS:
+        if name in applied:
+            continue
+        logger.info(f'Apply migration {name}')
+        if callable(migration):
+            migration()
+        else:
+            for statement in migration:
+                db.session.execute(text(statement))
+        db.session.execute(text('INSERT INTO TBot.schema_migrations (name) VALUES (:name)'), {'name': name})
+        db.session.commit()
+        done.append(name)
+    return done
+
+
+def create_schema() -> None:
+    """
+    Create schema of a new DB from models, all migrations are marked as applied.
+    In SQLite also FTS5 index of poems and triggers of updated_at are created
+    """
+    db.create_all()
+    applied = applied_migrations()
+    if sqlite_backend.is_sqlite(db.url):
+        sqlite_backend.create_fts(db.session)
+        sqlite_backend.create_triggers(db.session)
+    for name, _ in MIGRATIONS:
+        if name not in applied:
+            db.session.execute(text('INSERT INTO TBot.schema_migrations (name) VALUES (:name)'), {'name': name})
+    db.session.commit()
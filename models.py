@@ -15,9 +15,14 @@ class LibPrivileges(db.Model):
 
 class Users(db.Model):
     __tablename__ = 'users'
-    __table_args__ = {
-        'schema': 'TBot'
-    }
+    __table_args__ = (
+        # поиск пользователя по chat_id, логину или имени в update_user_data
+        db.Index('ix_users_login', 'login'),
+        db.Index('ix_users_first_name', 'first_name'),
+        # для синхронизации измененных пользователей, имя совпадает с миграцией 0002
+        db.Index('ix_users_updated_at', 'updated_at'),
+        {'schema': 'TBot'}
+    )
 
     chat_id = db.Column(db.String(20), primary_key=True)
     login = db.Column(db.String(100))
@@ -27,28 +32,79 @@ class Users(db.Model):
                          server_default=func.now())
     description = db.Column(db.String(300))
     active = db.Column(db.Boolean, default=True)
+    updated_at = db.Column(db.DateTime(timezone=True),
+                           server_default=func.now(),
+                           server_onupdate=db.FetchedValue())
 
 
 class Poems(db.Model):
     __tablename__ = 'poems'
-    __table_args__ = {
-        'schema': 'TBot'
-    }
+    __table_args__ = (
+        # признак изменения стихов для индексов в памяти, имя совпадает с миграцией 0004
+        db.Index('ix_poems_updated_at', 'updated_at'),
+        {'schema': 'TBot'}
+    )
 
     p_id = db.Column(db.Integer, primary_key=True)
     author = db.Column(db.String(100))
     name = db.Column(db.String(200))
     text = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime(timezone=True),
+                           server_default=func.now(),
+                           server_onupdate=db.FetchedValue())
 
 
 class LogRequests(db.Model):
     __tablename__ = 'log_requests'
-    __table_args__ = {
-        'schema': 'TBot'
-    }
+    __table_args__ = (
+        # покрывающий индекс для подсчета запросов по дням, действиям и пользователям
+        db.Index('ix_log_requests_date_ins_action_chat_id', 'date_ins', 'action', 'chat_id'),
+        {'schema': 'TBot'}
+    )
 
     lr_id = db.Column(db.Integer, primary_key=True)
     chat_id = db.Column(db.String(20), db.ForeignKey(Users.chat_id))
     date_ins = db.Column(db.DateTime(timezone=True),
                          server_default=func.now())
     action = db.Column(db.String(200))
+
+
+class StatDaily(db.Model):
+    """
+    Count of requests per day (rollup of log_requests)
+    """
+    __tablename__ = 'stat_daily'
+    __table_args__ = {
+        'schema': 'TBot'
+    }
+
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class StatActions(db.Model):
+    """
+    Count of requests per day and action (rollup of log_requests)
+    """
+    __tablename__ = 'stat_actions'
+    __table_args__ = {
+        'schema': 'TBot'
+    }
+
+    day = db.Column(db.Date, primary_key=True)
+    action = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class StatUsers(db.Model):
+    """
+    Count of requests per day and user (rollup of log_requests)
+    """
+    __tablename__ = 'stat_users'
+    __table_args__ = {
+        'schema': 'TBot'
+    }
+
+    day = db.Column(db.Date, primary_key=True)
+    chat_id = db.Column(db.String(20), db.ForeignKey(Users.chat_id), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,72 @@
+"""
+Query plans of hot queries: counting of log_requests by rollups and search of user for update
+python manage.py explain
+"""
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+import models as md
+import rollups
+
+HOT_QUERIES_INDEXES = {
+    'stat_daily': 'ix_log_requests_date_ins_action_chat_id',
+    'stat_actions': 'ix_log_requests_date_ins_action_chat_id',
+    'stat_users': 'ix_log_requests_date_ins_action_chat_id',
+    'user_for_update': 'ix_users_login',
+}
+
+
+def hot_queries(dialect: str, date_from: datetime.date = None, user: str = 'login') -> dict:
+    """
+    :return: {name: select}
+    """
+    queries = {model.__tablename__: query
+               for model, query in rollups.backfill_queries(date_from or datetime.date.today(), dialect).items()}
+    queries['user_for_update'] = select(md.Users.chat_id).where(
+        (md.Users.chat_id == user) |
+        (md.Users.login == user) |
+        (md.Users.first_name == user)
+    )
+    return queries
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN of select with its parameters
+    """
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kwargs):
+    prefix = 'EXPLAIN QUERY PLAN' if compiler.dialect.name == 'sqlite' else 'EXPLAIN'
+    return f'{prefix} {compiler.process(element.query, **kwargs)}'
+
+
+def explain(connection, query) -> list:
+    """
+    Plan of query (EXPLAIN in MySQL, EXPLAIN QUERY PLAN in SQLite)
+    :return: lines of plan
+    """
+    result = connection.execute(Explain(query))
+    if connection.dialect.name == 'sqlite':
+        return [row.detail for row in result]
+    return [' '.join(f'{key}={value}' for key, value in row._mapping.items() if value is not None) for row in result]
+
+
+def check(connection) -> dict:
+    """
+    Explain hot queries and check, that they use supporting indexes
+    :return: {name: (index is used, lines of plan)}
+    """
+    plans = {}
+    for name, query in hot_queries(connection.dialect.name).items():
+        plan = explain(connection, query)
+        plans[name] = (any(HOT_QUERIES_INDEXES[name] in line for line in plan), plan)
+    return plans
@@ -0,0 +1,167 @@
+import datetime
+from collections import Counter
+
+from sqlalchemy import cast, Date, select, desc
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import func
+
+import models as md
+from extentions import db
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+ROLLUPS = (md.StatDaily, md.StatActions, md.StatUsers)
+EXCLUDED_ACTIONS = ('hello',)  # запросы без действия и приветствия не попадают в статистику
+
+
+def _day(value) -> datetime.date:
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def count_requests(records: list) -> dict:
+    """
+    Count requests of log by rollups
+    :param records: [{'chat_id': ..., 'date_ins': ..., 'action': ...}, ...]
+    :return: {rollup model: Counter({key: count})}
+    """
+    daily, actions, users = Counter(), Counter(), Counter()
+    for record in records:
+        if record['action'] is None or record['action'] in EXCLUDED_ACTIONS:
+            continue
+        day = _day(record['date_ins'])
+        daily[(day,)] += 1
+        actions[(day, record['action'])] += 1
+        users[(day, record['chat_id'])] += 1
+    return {md.StatDaily: daily, md.StatActions: actions, md.StatUsers: users}
+
+
+def upsert_statements(model, counts: Counter, dialect: str) -> list:
+    """
+    Statements, which add counts to rollup rows
+    MySQL and SQLite get one upsert, other DB get UPDATE and INSERT per row
+    :param dialect: name of DB dialect
+    :return: [(statement, insert or None), ...], insert is executed, if statement has not updated any row
+    """
+    table = model.__table__
+    keys = [column.name for column in table.primary_key.columns]
+    rows = [dict(zip(keys, key), count=count) for key, count in counts.items()]
+    if not rows:
+        return []
+    if dialect == 'mysql':
+        stmt = mysql_insert(table).values(rows)
+        return [(stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted.count), None)]
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(table).values(rows)
+        return [(stmt.on_conflict_do_update(index_elements=keys, set_={'count': table.c.count + stmt.excluded.count}),
+                 None)]
+    return [(table.update().where(*[table.c[key] == row[key] for key in keys]).values(
+        count=table.c.count + row['count']
+    ), table.insert().values(row)) for row in rows]
+
+
+def _upsert_counts(model, counts: Counter) -> None:
+    """
+    Add counts to rollup rows (in the current transaction)
+    """
+    for statement, insert in upsert_statements(model, counts, db.engine.dialect.name):
+        if not db.session.execute(statement).rowcount and insert is not None:
+            db.session.execute(insert)
+
+
+def add_requests(records: list) -> None:
+    """
+    Add batch of logged requests to rollups (in the current transaction)
+    """
+    for model, counts in count_requests(records).items():
+        _upsert_counts(model, counts)
+
+
+def backfill_queries(date_from: datetime.date = None, dialect: str = None) -> dict:
+    """
+    Queries, which count requests of log_requests by rollups
+    :param dialect: name of DB dialect, dialect of db engine by default
+    :return: {rollup model: select}
+    """
+    log = md.LogRequests
+    # CAST(... AS DATE) в SQLite дает число
+    day = func.date(log.date_ins) if (dialect or db.engine.dialect.name) == 'sqlite' else cast(log.date_ins, Date)
+    filters = [log.action.is_not(None), log.action.not_in(EXCLUDED_ACTIONS)]
+    if date_from is not None:
+        filters.append(log.date_ins >= date_from)
+    return {
+        md.StatDaily: select(day, func.count()).where(*filters).group_by(day),
+        md.StatActions: select(day, log.action, func.count()).where(*filters).group_by(day, log.action),
+        md.StatUsers: select(day, log.chat_id, func.count()).where(*filters).group_by(day, log.chat_id),
+    }
+
+
+def backfill(date_from: datetime.date = None) -> None:
+    """
+    Rebuild rollups from log_requests
+    Requests, which are logged during backfill, may be counted twice, so it is better to run it with the bot stopped
+    :param date_from: rebuild from the date, all history if None
+    """
+    try:
+        for model, query in backfill_queries(date_from).items():
+            table = model.__table__
+            delete = table.delete()
+            if date_from is not None:
+                delete = delete.where(table.c.day >= date_from)
+            db.session.execute(delete)
+            db.session.execute(table.insert().from_select([column.name for column in table.columns], query))
+            logger.info(f'Rollup {table.name} is rebuilt')
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def stat_daily_query(day_from: datetime.date = None):
+    """
+    Query of statistics by days, shared by sync and async DB layers
+    :return: select of (day, count)
+    """
+    query = select(md.StatDaily.day, md.StatDaily.count).order_by(md.StatDaily.day)
+    if day_from:
+        query = query.where(md.StatDaily.day >= day_from)
+    return query
+
+
+def stat_actions_query(day_from: datetime.date = None):
+    """
+    Query of statistics by actions, the most popular first
+    :return: select of (action, count)
+    """
+    query = select(md.StatActions.action, func.sum(md.StatActions.count))
+    if day_from:
+        query = query.where(md.StatActions.day >= day_from)
+    return query.group_by(md.StatActions.action).order_by(desc(func.sum(md.StatActions.count)))
+
+
+def stat_users_query(day_from: datetime.date = None):
+    """
+    Query of statistics by users, the most active first
+    :return: select of (count, login, first_name)
+    """
+    query = select(
+        func.sum(md.StatUsers.count),
+        md.Users.login,
+        md.Users.first_name
+    ).join(
+        md.Users,
+        md.StatUsers.chat_id == md.Users.chat_id
+    )
+    if day_from:
+        query = query.where(md.StatUsers.day >= day_from)
+    return query.group_by(
+        md.Users.chat_id, md.Users.login, md.Users.first_name
+    ).order_by(desc(func.sum(md.StatUsers.count)))
+
+
+def create_tables() -> None:
+    for model in ROLLUPS:
+        model.__table__.create(db.engine, checkfirst=True)
@@ -2,6 +2,7 @@ import requests
 
 import config
 from loggers import get_logger
+from write_behind import WriteBehind
 
 logger = get_logger(__name__)
 
@@ -35,3 +36,35 @@ def send_dev_message(data: dict, by: str = 'mail') -> dict:
             data.pop('to')
             return resp
     logger.error('Max try exceeded')
+
+
+class DevNotifier:
+    """
+    Background delivery of admin alerts
+    Alerts with the same subject, collected during interval, are sent as one digest
+    """
+
+    def __init__(self, interval: float = 60, channels: tuple = ('mail', 'telegram'), send=send_dev_message):
+        self.channels = channels
+        self.send = send
+        self._alerts = WriteBehind('dev_notifier', self._send_digests, batch_size=1000, interval=interval)
+
+    def start(self) -> None:
+        self._alerts.start()
+
+    def notify(self, subject: str, text: str) -> None:
+        self._alerts.add((subject, text))
+
+    def _send_digests(self, alerts: list) -> None:
+        digests = {}
+        for subject, text in alerts:
+            digests.setdefault(subject, []).append(text)
+        for subject, texts in digests.items():
+            data = dict(subject=subject if len(texts) == 1 else f'{subject} ({len(texts)})', text='\n'.join(texts))
+            for channel in self.channels:
+                resp = self.send(dict(data), channel)
+                if resp and resp.get('res') == 'ERROR':
+                    logger.warning(f'Message do not received. {channel} = {resp}')
+
+
+dev_notifier = DevNotifier(interval=getattr(config, 'DEV_NOTIFY_INTERVAL', 60))
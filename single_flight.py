@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalescing of identical concurrent calls
+    The first caller with the key makes the call, other callers with the same key wait for its result
+    Waiters may be in other threads and other event loops
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key) -> tuple:
+        """
+        :return: (future of call, is caller a leader)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _done(self, key) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key, func, *args, wait_timeout: float = None, **kwargs):
+        """
+        Call func or wait for result of the same call
+        :param key: hashable key of call
+        :param func: function
+        :param wait_timeout: max time of waiting for result of the same call
+        :return: result of func
+        """
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return future.result(wait_timeout)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._done(key)
+
+    async def do_async(self, key, coro_func, *args, wait_timeout: float = None, **kwargs):
+        """
+        Await coroutine function or wait for result of the same call
+        :param key: hashable key of call
+        :param coro_func: coroutine function
+        :param wait_timeout: max time of waiting for result of the same call
+        :return: result of coroutine
+        """
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), wait_timeout)
+        try:
+            result = await coro_func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._done(key)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,120 @@
+"""
+Embedded SQLite backend for single node deployments: config.DB['connection_string'] = 'sqlite:///file_db/tbot.db'
+DB file is attached as schema TBot, so models and SQL with TBot.* work unchanged.
+Poems are searched by FTS5 index
+"""
+import sqlite3
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from stores.search_index import tokenize
+
+SCHEMA = 'TBot'
+# прагмы соединения
+CONNECTION_PRAGMAS = {
+    'foreign_keys': 'ON',
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+# прагмы файла БД
+SCHEMA_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -32000,  # 32 МБ
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+FTS_STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS TBot.poems_fts USING fts5("
+    "author, name, text, content='poems', content_rowid='p_id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS TBot.poems_fts_insert AFTER INSERT ON poems BEGIN "
+    "INSERT INTO poems_fts (rowid, author, name, text) VALUES (new.p_id, new.author, new.name, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS TBot.poems_fts_delete AFTER DELETE ON poems BEGIN "
+    "INSERT INTO poems_fts (poems_fts, rowid, author, name, text) "
+    "VALUES ('delete', old.p_id, old.author, old.name, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS TBot.poems_fts_update AFTER UPDATE ON poems BEGIN "
+    "INSERT INTO poems_fts (poems_fts, rowid, author, name, text) "
+    "VALUES ('delete', old.p_id, old.author, old.name, old.text); "
+    "INSERT INTO poems_fts (rowid, author, name, text) VALUES (new.p_id, new.author, new.name, new.text); END",
+    "INSERT INTO TBot.poems_fts (poems_fts) VALUES ('rebuild')",
+)
+# в MySQL updated_at обновляется через ON UPDATE
+USERS_UPDATED_AT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS TBot.users_updated_at AFTER UPDATE ON users "
+    "FOR EACH ROW WHEN new.updated_at = old.updated_at BEGIN "
+    "UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE chat_id = new.chat_id; END"
+)
+POEMS_UPDATED_AT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS TBot.poems_updated_at AFTER UPDATE ON poems "
+    "FOR EACH ROW WHEN new.updated_at = old.updated_at BEGIN "
+    "UPDATE poems SET updated_at = CURRENT_TIMESTAMP WHERE p_id = new.p_id; END"
+)
+
+
+def is_sqlite(url: str) -> bool:
+    return bool(url) and url.startswith('sqlite')
+
+
+def connect(path: str, timeout: float = 10) -> sqlite3.Connection:
+    """
+    Open connection with DB file attached as TBot and tuned pragmas
+    """
+    connection = sqlite3.connect(':memory:', timeout=timeout, check_same_thread=False)
+    connection.execute(f'ATTACH DATABASE ? AS {SCHEMA}', (path,))
+    for name, value in CONNECTION_PRAGMAS.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+    for name, value in SCHEMA_PRAGMAS.items():
+        connection.execute(f'PRAGMA {SCHEMA}.{name} = {value}')
+    return connection
+
+
+def engine_options(url: str, options: dict) -> dict:
+    """
+    Engine options for SQLite: connections are created by connect, pool options are kept
+    :param url: sqlite:///path/to/file.db
+    :param options: engine options of MySQL backend
+    """
+    path = make_url(url).database
+    timeout = options.get('connect_args', {}).get('connection_timeout', 10)
+    options = {key: value for key, value in options.items() if key != 'connect_args'}
+    options['creator'] = lambda: connect(path, timeout)
+    return options
+
+
+def create_fts(session) -> None:
+    """
+    Create FTS5 index of poems, which is kept up to date by triggers, and fill it
+    """
+    for statement in FTS_STATEMENTS:
+        session.execute(text(statement))
+
+
+def create_triggers(session) -> None:
+    session.execute(text(USERS_UPDATED_AT_TRIGGER))
+    session.execute(text(POEMS_UPDATED_AT_TRIGGER))
+
+
+def fts_query(search_string: str) -> str or None:
+    """
+    FTS5 query: any of stems of words as prefix
+    """
+    stems = [word for word in tokenize(search_string) if word]
+    if not stems:
+        return None
+    return ' OR '.join(f'"{word}"*' for word in dict.fromkeys(stems))
+
+
+def search_poems(session, search_string: str, limit: int) -> list:
+    """
+    Find the most relevant poems by FTS5 index (BM25, author and name weigh more than text)
+    :return: poems ids
+    """
+    query = fts_query(search_string)
+    if query is None:
+        return []
+    rows = session.execute(text(
+        'SELECT rowid FROM TBot.poems_fts WHERE poems_fts MATCH :query '
+        'ORDER BY bm25(poems_fts, 3.0, 2.0, 1.0) LIMIT :limit'
+    ), {'query': query, 'limit': limit})
+    return [poem_id for poem_id, in rows]
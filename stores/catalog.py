@@ -0,0 +1,176 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from loggers import get_logger
+from stores.id_index import IdIndex
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    text TEXT,
+    year INTEGER,
+    genre TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS records_kind_year ON records (kind, year);
+CREATE INDEX IF NOT EXISTS records_kind_genre ON records (kind, genre);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    fetched_at REAL,
+    next_visit REAL NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS pages_next_visit ON pages (next_visit);
+"""
+
+
+class Catalog:
+    """
+    Local catalog of movies, books and restaurants (SQLite)
+    Table "pages" is the crawl frontier, so crawling can be resumed after restart
+    """
+
+    max_indexes = 64  # индексы id для выбора случайной записи по фильтру
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        if os.path.dirname(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self._conn = sqlite3.connect(file_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+        self._version = 0  # меняется при изменении записей
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def add_pages(self, pages: list) -> None:
+        """
+        Add pages to the frontier, known pages are skipped
+        :param pages: [(url, kind, key), ...]
+        """
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR IGNORE INTO pages (url, kind, key) VALUES (?, ?, ?)', pages)
+
+    def page(self, url: str) -> sqlite3.Row or None:
+        rows = self._execute('SELECT * FROM pages WHERE url = ?', (url,))
+        return rows[0] if rows else None
+
+    def due_pages(self, limit: int) -> list:
+        """
+        Pages, which need to be fetched now
+        """
+        return self._execute('SELECT * FROM pages WHERE next_visit <= ? ORDER BY next_visit LIMIT ?',
+                             (time.time(), limit))
+
+    def page_visited(
+            self,
+            url: str,
+            next_visit: float,
+            etag: str = None,
+            last_modified: str = None,
+            content_hash: str = None
+    ) -> None:
+        self._execute(
+            'UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), '
+            'content_hash = COALESCE(?, content_hash), fetched_at = ?, next_visit = ?, errors = 0 '
+            'WHERE url = ?',
+            (etag, last_modified, content_hash, time.time(), next_visit, url)
+        )
+
+    def page_failed(self, url: str, retry_delay: float) -> None:
+        """
+        Postpone page, delay grows with count of errors
+        """
+        self._execute('UPDATE pages SET errors = errors + 1, next_visit = ? * (errors + 1) + ? WHERE url = ?',
+                      (retry_delay, time.time(), url))
+
+    def upsert_records(self, kind: str, records: list) -> None:
+        """
+        Add or update records
+        :param kind: 'movie', 'book' or 'restaurant'
+        :param records: [{'url': ..., 'title': ..., 'text': ..., 'year': ..., 'genre': ...}, ...]
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._version += 1
+            self._conn.executemany(
+                'INSERT INTO records (kind, url, title, text, year, genre, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (url) DO UPDATE SET title = excluded.title, text = excluded.text, '
+                'year = excluded.year, genre = excluded.genre, updated_at = excluded.updated_at',
+                [(kind, record['url'], record.get('title'), record.get('text'),
+                  record.get('year'), record.get('genre'), now) for record in records]
+            )
+
+    @staticmethod
+    def _filter(kind: str, year_from: int = None, year_to: int = None, genre: str = None) -> tuple:
+        where = ['kind = ?']
+        params = [kind]
+        if year_from is not None and year_to is not None:
+            where.append('year BETWEEN ? AND ?')
+            params.extend((year_from, year_to))
+        if genre is not None:
+            where.append('genre = ?')
+            params.append(genre)
+        return ' AND '.join(where), tuple(params)
+
+    def count(self, kind: str, year_from: int = None, year_to: int = None, genre: str = None) -> int:
+        where, params = self._filter(kind, year_from, year_to, genre)
+        return self._execute(f'SELECT COUNT(*) FROM records WHERE {where}', params)[0][0]
+
+    def _index(self, kind: str, year_from: int = None, year_to: int = None, genre: str = None) -> IdIndex:
+        """
+        Index of ids of filtered records, the least recently used indexes are dropped
+        """
+        key = (kind, year_from, year_to, genre)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+            where, params = self._filter(*key)
+            index = IdIndex(
+                f'catalog {key}',
+                lambda: [row_id for row_id, in self._execute(f'SELECT id FROM records WHERE {where}', params)],
+                lambda: self._version
+            )
+            self._indexes[key] = index
+            if len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+            return index
+
+    def random(self, kind: str, year_from: int = None, year_to: int = None, genre: str = None) -> dict or None:
+        """
+        Get random record by indexed filter
+        Id is picked uniformly from the index of the filter, which is reloaded after records are changed
+        """
+        index = self._index(kind, year_from, year_to, genre)
+        index.refresh()
+        row_id = index.random()
+        if row_id is None:
+            return None
+        rows = self._execute('SELECT * FROM records WHERE id = ?', (row_id,))
+        return dict(rows[0]) if rows else None
@@ -0,0 +1,65 @@
+import math
+import threading
+from array import array
+
+
+class ExchangeRates:
+    """
+    Exchange rates time series, one array of rates per currency
+    A new point is added only when rates are changed
+    """
+
+    def __init__(self, currencies: list, max_size: int = 365):
+        self.currencies = list(currencies)
+        self.max_size = max_size
+        self._times = array('d')
+        self._rates = {currency: array('d') for currency in self.currencies}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._times)
+
+    def add(self, timestamp: float, rates: dict) -> bool:
+        """
+        Add rates snapshot
+        Snapshot may be partial: the last value is carried forward for missing currencies (NaN if it is unknown)
+        :param timestamp: time of snapshot
+        :param rates: {'USD': 73.6059, 'EUR': 83.1158}
+        :return: True if rates are changed
+        """
+        rates = {currency: rate for currency, rate in rates.items() if currency in self._rates}
+        if not rates:
+            return False
+        with self._lock:
+            previous = self._latest()
+            if all(previous.get(currency) == rate for currency, rate in rates.items()):
+                return False
+            self._times.append(timestamp)
+            for currency in self.currencies:
+                self._rates[currency].append(rates.get(currency, previous.get(currency, math.nan)))
+            if len(self._times) > self.max_size:
+                del self._times[0]
+                for currency in self.currencies:
+                    del self._rates[currency][0]
+        return True
+
+    def _latest(self) -> dict:
+        if not len(self._times):
+            return {}
+        return {currency: self._rates[currency][-1] for currency in self.currencies
+                if not math.isnan(self._rates[currency][-1])}
+
+    def latest(self) -> dict:
+        """
+        Get the last known rates, currencies without rates are skipped
+        """
+        with self._lock:
+            return self._latest()
+
+    def series(self) -> tuple:
+        """
+        Get copy of series
+        :return: (times, {currency: rates})
+        """
+        with self._lock:
+            return list(self._times), {currency: list(rates) for currency, rates in self._rates.items()}
@@ -0,0 +1,66 @@
+import os
+import json
+import threading
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+class FileIds:
+    """
+    Telegram file_id of already uploaded photos
+    Once a photo is uploaded, it can be sent again by its file_id without upload
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._ids = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        self._ids = {}
+        if os.path.exists(self.file_path):
+            try:
+                with open(self.file_path, encoding='utf-8') as file:
+                    self._ids = json.load(file)
+            except (OSError, ValueError):
+                logger.exception(f'File {self.file_path} is not loaded')
+
+    def get(self, key: str) -> str or None:
+        with self._lock:
+            if self._ids is None:
+                self._load()
+            return self._ids.get(key)
+
+    def set(self, key: str, file_id: str) -> None:
+        with self._lock:
+            if self._ids is None:
+                self._load()
+            if self._ids.get(key) == file_id:
+                return
+            self._ids[key] = file_id
+            self._save()
+
+    def discard(self, key: str) -> None:
+        """
+        Forget file_id, when the file is changed
+        """
+        with self._lock:
+            if self._ids is None:
+                self._load()
+            if self._ids.pop(key, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        tmp_path = f'{self.file_path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or os.curdir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._ids, file)
+            os.replace(tmp_path, self.file_path)
+        except OSError:
+            logger.exception(f'File {self.file_path} is not saved')
+
+
+file_ids = FileIds(os.path.join('file_db', 'file_ids.json'))
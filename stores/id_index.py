@@ -0,0 +1,67 @@
+import random
+import threading
+from array import array
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+class IdIndex:
+    """
+    Compact array of existing row ids for uniform random selection without misses
+    Index is loaded on first use and reloaded by refresh(), if signature of the table is changed
+    """
+
+    def __init__(self, name: str, load, signature):
+        """
+        :param name: name of index for logs
+        :param load: function() -> iterable of ids
+        :param signature: function() -> cheap value, which is changed when ids are changed (count, max id)
+        """
+        self.name = name
+        self._load = load
+        self._signature = signature
+        self._ids = None
+        self._current_signature = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # ids загружаются без блокировки чтения
+
+    def refresh(self) -> None:
+        """
+        Reload ids, if they are changed
+        Ids are loaded outside of the read lock, so random() is not blocked by reloading
+        """
+        with self._load_lock:
+            signature = self._signature()
+            with self._lock:
+                if self._ids is not None and signature == self._current_signature:
+                    return
+            ids = array('q', self._load())
+            with self._lock:
+                self._ids, self._current_signature = ids, signature
+        logger.info(f'Index {self.name} is loaded: {len(ids)} ids')
+
+    def random(self) -> int or None:
+        """
+        Get random id or None, if there are no ids
+        """
+        with self._lock:
+            loaded = self._ids is not None
+        if not loaded:
+            self.refresh()
+        with self._lock:
+            return self._ids[random.randrange(len(self._ids))] if self._ids else None
+
+    def discard(self, row_id: int) -> None:
+        """
+        Remove id of deleted row
+        """
+        with self._lock:
+            if self._ids is not None and row_id in self._ids:
+                self._ids.remove(row_id)
+                self._current_signature = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids) if self._ids is not None else 0
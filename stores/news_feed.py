@@ -0,0 +1,49 @@
+import threading
+from collections import deque
+from itertools import islice
+
+
+class NewsFeed:
+    """
+    Deduplicated headlines store, the newest headline is the first
+    Each headline is kept as ready to send text
+    """
+
+    def __init__(self, max_size: int = 200):
+        self.max_size = max_size
+        self._headlines = deque()
+        self._hrefs = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._headlines)
+
+    def __contains__(self, href: str):
+        return href in self._hrefs
+
+    def add(self, headlines: list) -> int:
+        """
+        Add new headlines
+        :param headlines: [(href, text), ...] from the newest to the oldest
+        :return: count of added headlines
+        """
+        added = 0
+        with self._lock:
+            for href, text in reversed(headlines):
+                if href in self._hrefs:
+                    continue
+                self._headlines.appendleft((href, text))
+                self._hrefs.add(href)
+                added += 1
+            while len(self._headlines) > self.max_size:
+                href, _ = self._headlines.pop()
+                self._hrefs.discard(href)
+        return added
+
+    def latest(self, count: int) -> list:
+        """
+        Get texts of the newest headlines
+        :param count: count of headlines
+        """
+        with self._lock:
+            return [text for _, text in islice(self._headlines, count)]
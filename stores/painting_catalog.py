@@ -0,0 +1,98 @@
+import os
+import io
+import json
+import random
+import hashlib
+import threading
+
+from PIL import Image
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+class PaintingCatalog:
+    """
+    Local catalog of paintings: page, image url, title and path to the downscaled image
+    Catalog is saved to catalog.json in the catalog directory
+    """
+
+    max_image_side = 1280
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.catalog_path = os.path.join(directory, 'catalog.json')
+        self._paintings = {}
+        self._ready = []  # страницы картин с загруженным изображением
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.catalog_path):
+            return
+        try:
+            with open(self.catalog_path, encoding='utf-8') as file:
+                self._paintings = json.load(file)
+            self._ready = [page for page, painting in self._paintings.items()
+                           if painting['image_path'] and os.path.exists(painting['image_path'])]
+            logger.info(f'Painting catalog loaded. len = {len(self._paintings)}')
+        except (OSError, ValueError):
+            logger.exception(f'Painting catalog {self.catalog_path} is not loaded')
+
+    def save(self) -> None:
+        with self._lock:
+            data = dict(self._paintings)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.catalog_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, self.catalog_path)
+
+    def __len__(self):
+        return len(self._paintings)
+
+    def __contains__(self, page: str):
+        return page in self._paintings
+
+    def add(self, page: str, image_url: str, title: str) -> None:
+        with self._lock:
+            self._paintings[page] = {
+                'page': page,
+                'image_url': image_url,
+                'title': title,
+                'image_path': None
+            }
+
+    def without_image(self) -> list:
+        """
+        Paintings, which images are not downloaded yet
+        """
+        with self._lock:
+            return [painting for painting in self._paintings.values() if not painting['image_path']]
+
+    def save_image(self, page: str, content: bytes) -> None:
+        """
+        Downscale image and save it to the catalog directory
+        :param page: painting page
+        :param content: original image bytes
+        """
+        image = Image.open(io.BytesIO(content))
+        image.thumbnail((self.max_image_side, self.max_image_side))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        os.makedirs(self.directory, exist_ok=True)
+        image_path = os.path.join(self.directory, f"{hashlib.sha1(page.encode()).hexdigest()}.jpg")
+        image.save(image_path, 'JPEG', quality=85)
+        with self._lock:
+            self._paintings[page]['image_path'] = image_path
+            self._ready.append(page)
+
+    def random(self) -> dict or None:
+        """
+        Get random painting, which image is downloaded
+        """
+        with self._lock:
+            if not self._ready:
+                return None
+            return self._paintings[random.choice(self._ready)]
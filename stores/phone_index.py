@@ -0,0 +1,99 @@
+import os
+import csv
+import bisect
+from array import array
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+class PhoneIndex:
+    """
+    Local index of numbering plan ranges (ABC/DEF codes)
+    Ranges are kept in sorted arrays, lookup is a binary search
+    Source file format (rossvyaz.gov.ru): "АВС/ DEF;От;До;Емкость;Оператор;Регион"
+    """
+
+    country = 'Россия'
+
+    def __init__(self):
+        self._starts = array('q')
+        self._ends = array('q')
+        self._operators = array('I')
+        self._regions = array('I')
+        self._names = []
+        self._names_ids = {}
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _name_id(self, name: str) -> int:
+        """
+        Store each operator and region name only once
+        """
+        name_id = self._names_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._names.append(name)
+            self._names_ids[name] = name_id
+        return name_id
+
+    @staticmethod
+    def _read_rows(file_path: str) -> list:
+        for encoding in ('utf-8-sig', 'cp1251'):
+            try:
+                with open(file_path, encoding=encoding, newline='') as file:
+                    return list(csv.reader(file, delimiter=';'))
+            except UnicodeDecodeError:
+                continue
+        return []
+
+    def load(self, *files_paths: str) -> None:
+        """
+        Load ranges from files to memory
+        :param files_paths: paths to csv files with ranges
+        """
+        ranges = []
+        for file_path in files_paths:
+            if not os.path.exists(file_path):
+                logger.warning(f'Phone ranges file {file_path} not found')
+                continue
+            for row in self._read_rows(file_path):
+                if len(row) < 6:
+                    continue
+                try:
+                    code = int(row[0])
+                    start = code * 10 ** 7 + int(row[1])
+                    end = code * 10 ** 7 + int(row[2])
+                except ValueError:
+                    continue  # заголовок
+                ranges.append((start, end, row[4].strip(), row[5].strip()))
+            logger.info(f'{file_path} loaded')
+        ranges.sort()
+        starts, ends, operators, regions = array('q'), array('q'), array('I'), array('I')
+        for start, end, operator, region in ranges:
+            starts.append(start)
+            ends.append(end)
+            operators.append(self._name_id(operator))
+            regions.append(self._name_id(region))
+        self._starts, self._ends, self._operators, self._regions = starts, ends, operators, regions
+        logger.info(f'Phone index size: {len(self)}')
+
+    def find(self, number: str) -> dict or None:
+        """
+        Find number info
+        :param number: number like 89161234567
+        :return: {'Страна': ..., 'Регион': ..., 'Изначальный оператор': ...}
+        """
+        if not number or len(number) != 11 or not number.isdigit():
+            return None
+        key = int(number[1:])
+        pos = bisect.bisect_right(self._starts, key) - 1
+        if pos < 0 or key > self._ends[pos]:
+            return None
+        return {
+            'Страна': self.country,
+            'Регион': self._names[self._regions[pos]],
+            'Изначальный оператор': self._names[self._operators[pos]]
+        }
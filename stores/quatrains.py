@@ -0,0 +1,44 @@
+import re
+from array import array
+
+STANZA_RE = re.compile(r'\S[^\n]*(?:\n[ \t]*\S[^\n]*)*')
+LINE_RE = re.compile(r'\S[^\n]*')
+
+MIN_QUATRAINS = 2  # в гадании нужен выбор хотя бы из двух четверостиший
+
+
+def quatrain_offsets(text: str) -> array:
+    """
+    Boundaries of quatrains in poem text
+    Quatrains are stanzas separated by empty lines. Poem without empty lines is split by 4 lines
+    :param text: poem text
+    :return: flat array of offsets: [start of 1st, end of 1st, start of 2nd, end of 2nd, ...]
+    """
+    offsets = array('I')
+    stanzas = list(STANZA_RE.finditer(text or ''))
+    if len(stanzas) > 1:
+        for stanza in stanzas:
+            offsets.extend((stanza.start(), stanza.end()))
+        return offsets
+    lines = list(LINE_RE.finditer(text or ''))
+    for i in range(0, len(lines) - 3, 4):
+        offsets.extend((lines[i].start(), lines[i + 3].end()))
+    return offsets
+
+
+def quatrains_count(offsets: array) -> int:
+    return len(offsets) // 2
+
+
+def is_divination_poem(offsets: array) -> bool:
+    return quatrains_count(offsets) >= MIN_QUATRAINS
+
+
+def get_quatrain(text: str, offsets: array, number: int) -> str:
+    """
+    Get quatrain by number (from 1)
+    :raise IndexError: if there is no quatrain with the number
+    """
+    if not 1 <= number <= quatrains_count(offsets):
+        raise IndexError(f'Quatrain {number} not found')
+    return text[offsets[2 * number - 2]:offsets[2 * number - 1]]
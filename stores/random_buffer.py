@@ -0,0 +1,112 @@
+import queue
+import threading
+import traceback
+from collections import deque, Counter
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+class RandomBuffer:
+    """
+    Bounded queues of ready random items per command and key (years interval, genre, etc.)
+    Request pops a ready item, background fillers produce new items instead of it
+    """
+
+    def __init__(self, size: int = 3, fillers: int = 1):
+        self.size = size
+        self.fillers_count = fillers
+        self._producers = {}
+        self._keys = {}
+        self._items = {}
+        self._lock = threading.Lock()
+        self._refill = queue.Queue()
+        self._pending = set()
+        self._fillers = []
+        self.hits = Counter()
+        self.underflows = Counter()
+
+    def register(self, command: str, producer, keys=None) -> None:
+        """
+        Register function, which produces random item by key
+        :param command: command name
+        :param producer: function(key) -> item
+        :param keys: keys, which are buffered (e.g. ranges from markup), any key if None.
+        Items for other keys are not buffered, so ad-hoc keys from users do not start background scraping
+        """
+        self._producers[command] = producer
+        self._keys[command] = None if keys is None else frozenset(keys)
+
+    def is_buffered(self, command: str, key=None) -> bool:
+        keys = self._keys.get(command)
+        return command in self._producers and (keys is None or key in keys)
+
+    def start(self) -> None:
+        for i in range(self.fillers_count):
+            filler = threading.Thread(target=self._fill_forever, name=f'random_buffer_{i}', daemon=True)
+            filler.start()
+            self._fillers.append(filler)
+
+    def pop(self, command: str, key=None):
+        """
+        Get ready item and request refill
+        :return: item or None if buffer is empty or the key is not buffered
+        """
+        if not self.is_buffered(command, key):
+            return None
+        with self._lock:
+            items = self._items.setdefault((command, key), deque())
+            item = items.popleft() if items else None
+            if item is None:
+                self.underflows[command] += 1
+            else:
+                self.hits[command] += 1
+        if item is None:
+            logger.info(f'Random buffer underflow: {command} {key}. Metrics: {self.metrics()}')
+        self.request_refill(command, key)
+        return item
+
+    def request_refill(self, command: str, key=None) -> None:
+        with self._lock:
+            if (command, key) in self._pending:
+                return
+            self._pending.add((command, key))
+        self._refill.put((command, key))
+
+    def _fill_forever(self) -> None:
+        while True:
+            command, key = self._refill.get()
+            try:
+                self._fill(command, key)
+            except Exception:
+                logger.exception(f'Random buffer fill error {command} {key}: {traceback.format_exc()}')
+            finally:
+                with self._lock:
+                    self._pending.discard((command, key))
+
+    def _fill(self, command: str, key=None) -> None:
+        producer = self._producers[command]
+        while self.depth(command, key) < self.size:
+            item = producer(key)
+            if item is None:
+                return
+            with self._lock:
+                self._items.setdefault((command, key), deque()).append(item)
+
+    def depth(self, command: str, key=None) -> int:
+        with self._lock:
+            return len(self._items.get((command, key), ()))
+
+    def metrics(self) -> dict:
+        """
+        Buffers depth, hits and underflows
+        """
+        with self._lock:
+            depth = {f'{command} {key}' if key is not None else command: len(items)
+                     for (command, key), items in self._items.items()}
+            return {
+                'depth': depth,
+                'hits': dict(self.hits),
+                'underflows': dict(self.underflows)
+            }
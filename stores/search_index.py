@@ -0,0 +1,191 @@
+import re
+import math
+import heapq
+import threading
+from functools import lru_cache
+from collections import Counter, defaultdict
+
+VOWELS = 'аеиоуыэюя'
+
+
+def _endings(after_a: tuple, other: tuple) -> tuple:
+    """
+    Endings sorted from the longest one
+    :param after_a: endings, which must follow "а" or "я"
+    :param other: other endings
+    :return: ((ending, must follow "а" or "я"), ...)
+    """
+    endings = [(ending, True) for ending in after_a] + [(ending, False) for ending in other]
+    return tuple(sorted(endings, key=lambda item: len(item[0]), reverse=True))
+
+
+PERFECTIVE_GERUND = _endings(('в', 'вши', 'вшись'), ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+REFLEXIVE = _endings((), ('ся', 'сь'))
+ADJECTIVE = _endings((), ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+                          'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'))
+PARTICIPLE = _endings(('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+VERB = _endings(('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+                ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен',
+                 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = _endings((), ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий',
+                     'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю',
+                     'ия', 'ья', 'я'))
+SUPERLATIVE = _endings((), ('ейш', 'ейше'))
+DERIVATIONAL = _endings((), ('ост', 'ость'))
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _strip(word: str, endings: tuple) -> str or None:
+    """
+    Remove the longest ending of word
+    :return: word without ending or None if there is no ending
+    """
+    for ending, after_a in endings:
+        if word.endswith(ending):
+            if after_a and word[:-len(ending)][-1:] not in ('а', 'я'):
+                continue
+            return word[:-len(ending)]
+    return None
+
+
+def _region(word: str, start: int = 0) -> int:
+    """
+    Start of the region after the first non-vowel following a vowel
+    """
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """
+    Russian stemmer (Snowball algorithm)
+    :param word: word in lower case
+    """
+    word = word.replace('ё', 'е')
+    rv_start = next((i + 1 for i, char in enumerate(word) if char in VOWELS), len(word))
+    r2_start = _region(word, _region(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        rv = stripped
+    else:
+        stripped = _strip(rv, REFLEXIVE)
+        if stripped is not None:
+            rv = stripped
+        stripped = _strip(rv, ADJECTIVE)
+        if stripped is not None:
+            participle = _strip(stripped, PARTICIPLE)
+            rv = participle if participle is not None else stripped
+        else:
+            stripped = _strip(rv, VERB)
+            if stripped is None:
+                stripped = _strip(rv, NOUN)
+            if stripped is not None:
+                rv = stripped
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = rv[max(r2_start - rv_start, 0):]
+    stripped = _strip(r2, DERIVATIONAL)
+    if stripped is not None:
+        rv = rv[:len(rv) - len(r2) + len(stripped)]
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        stripped = _strip(rv, SUPERLATIVE)
+        if stripped is not None:
+            rv = stripped[:-1] if stripped.endswith('нн') else stripped
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def tokenize(text: str) -> list:
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
+
+
+class SearchIndex:
+    """
+    Inverted index with Russian stemming and BM25 ranking
+    Documents consist of weighted fields: a word in the author or in the name is more relevant than in the text
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, weights: dict = None):
+        """
+        :param weights: {field: weight}
+        """
+        self.weights = weights or {}
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._terms = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, doc_id: int, fields: dict) -> None:
+        """
+        Add or replace document
+        :param doc_id: id of document
+        :param fields: {field: text}
+        """
+        terms = Counter()
+        for field, text in fields.items():
+            weight = self.weights.get(field, 1)
+            for term in tokenize(text or ''):
+                terms[term] += weight
+        length = sum(terms.values())
+        with self._lock:
+            self.remove(doc_id)
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+            self._lengths[doc_id] = length
+            self._terms[doc_id] = tuple(terms)
+            self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            length = self._lengths.pop(doc_id, None)
+            if length is None:
+                return
+            self._total_length -= length
+            for term in self._terms.pop(doc_id):
+                del self._postings[term][doc_id]
+                if not self._postings[term]:
+                    del self._postings[term]
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Find the most relevant documents, which contain all words of query
+        (or any word of query, if there is no document with all words)
+        :return: ids of documents, the most relevant first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not postings or not self._lengths:
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            if not candidates:
+                candidates = set().union(*postings)
+            count = len(self._lengths)
+            avg_length = self._total_length / count
+            idf = [math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5)) for docs in postings]
+            scores = {}
+            for doc_id in candidates:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                score = 0
+                for term_idf, docs in zip(idf, postings):
+                    frequency = docs.get(doc_id)
+                    if frequency:
+                        score += term_idf * frequency * (self.k1 + 1) / (frequency + norm)
+                scores[doc_id] = score
+        return heapq.nlargest(limit, scores, key=scores.get)
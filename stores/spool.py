@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import datetime
+import threading
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value)} is not serializable')
+
+
+class Spool:
+    """
+    Local append-only journal of writes (JSON lines)
+    Writes are kept here while DB is unreachable and are replayed in order later
+    File is synced to disk every sync_every records or sync_interval seconds
+    """
+
+    def __init__(self, file_path: str, sync_every: int = 20, sync_interval: float = 1):
+        self.file_path = file_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        if os.path.dirname(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self._count = self._count_lines()
+        self._file = open(file_path, 'a', encoding='utf-8')
+
+    def _count_lines(self) -> int:
+        if not os.path.exists(self.file_path):
+            return 0
+        with open(self.file_path, encoding='utf-8') as file:
+            return sum(1 for line in file if line.strip())
+
+    def __len__(self):
+        return self._count
+
+    def append(self, kind: str, data) -> None:
+        """
+        Add write to the end of journal
+        :param kind: kind of write
+        :param data: JSON serializable data (datetime is allowed)
+        """
+        line = json.dumps({'kind': kind, 'data': data}, ensure_ascii=False, default=_encode)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self._count += 1
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+
+    def replay(self, handlers: dict, retry_errors: tuple = (Exception,), dead_letter=None) -> int:
+        """
+        Apply journaled writes in order, applied writes are removed from journal
+        Writes are applied without blocking append, appended writes are kept for the next replay.
+        Replay stops at the first write failed with one of retry_errors, it will be the first next time.
+        Writes failed with other errors are passed to dead_letter
+        :param handlers: {kind: function(data)}
+        :param retry_errors: errors, which mean that write can be applied later
+        :param dead_letter: function(kind, data, error), which keeps rejected writes, they are only logged by default
+        :return: count of applied writes
+        """
+        with self._replay_lock:
+            with self._lock:
+                if not self._count:
+                    return 0
+                lines = self._read_lines()
+            # записи применяются без блокировки, новые записи в это время дописываются в конец
+            applied = done = 0
+            for line in lines:
+                entry = None
+                try:
+                    entry = json.loads(line)
+                    handlers[entry['kind']](entry['data'])
+                    applied += 1
+                except retry_errors:
+                    logger.exception(f'Spool replay is stopped, {len(lines) - done} writes left')
+                    break
+                except Exception as e:
+                    logger.exception(f'Spooled write is rejected: {line.strip()}')
+                    if dead_letter is not None and entry is not None:
+                        dead_letter(entry['kind'], entry['data'], e)
+                done += 1
+            with self._lock:
+                self._rewrite(self._read_lines()[done:])
+            return applied
+
+    def _read_lines(self) -> list:
+        self._file.flush()
+        with open(self.file_path, encoding='utf-8') as file:
+            return [line for line in file if line.strip()]
+
+    def _rewrite(self, lines: list) -> None:
+        self._file.close()
+        tmp_path = f'{self.file_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.file_path)
+        self._file = open(self.file_path, 'a', encoding='utf-8')
+        self._count = len(lines)
+        self._unsynced = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync()
+            self._file.close()
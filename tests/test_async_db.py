@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+import pytest_asyncio
+
+import models as md
+from async_db import AsyncDB, async_url
+
+
+def test_async_url():
+    assert async_url('mysql+mysqlconnector://u:p@host/TBot') == 'mysql+aiomysql://u:p@host/TBot'
+    assert async_url('sqlite:///file.db') == 'sqlite+aiosqlite:///file.db'
+
+
+@pytest_asyncio.fixture
+async def adb(tmp_path):
+    adb = AsyncDB(f'sqlite+aiosqlite:///{tmp_path / "tbot.db"}')
+    await adb.create_all()
+    async with adb.session() as session:
+        async with session.begin():
+            await session.execute(md.LibPrivileges.__table__.insert(), [{'p_id': 1, 'name': 'untrusted', 'value': 10}])
+            await session.execute(md.Users.__table__.insert(), [
+                {'chat_id': '1', 'login': 'first', 'first_name': 'First', 'privileges_id': 1, 'active': True},
+            ])
+            await session.execute(md.Poems.__table__.insert(), [
+                {'p_id': 1, 'author': 'Пушкин', 'name': 'Зимний вечер', 'text': 'Буря мглою небо кроет'},
+                {'p_id': 2, 'author': 'Есенин', 'name': 'Берёза', 'text': 'Белая берёза под моим окном'},
+            ])
+    yield adb
+    await adb.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_user(adb):
+    user = await adb.get_user('1')
+    assert (user.login, user.value) == ('first', 10)
+    assert await adb.get_user('2') is None
+
+
+@pytest.mark.asyncio
+async def test_get_poems(adb):
+    assert (await adb.get_poem(2)).author == 'Есенин'
+    assert [poem.p_id for poem in await adb.get_poems([2, 3, 1])] == [2, 1], 'poems must be in order of ids'
+
+
+@pytest.mark.asyncio
+async def test_log_requests_and_stats(adb):
+    day = datetime.datetime(2022, 5, 1, 12, 30)
+    records = [
+        {'chat_id': '1', 'date_ins': day, 'action': 'poem'},
+        {'chat_id': '1', 'date_ins': day, 'action': 'hello'},
+    ]
+    await adb.log_requests(records)
+    await adb.log_requests(records[:1])
+    assert [tuple(row) for row in await adb.stat_daily()] == [(day.date(), 2)]
+    assert [tuple(row) for row in await adb.stat_actions(day.date())] == [('poem', 2)]
+    assert [tuple(row) for row in await adb.stat_users()] == [(2, 'first', 'First')]
@@ -0,0 +1,19 @@
+from stores.cache import LRUCache
+
+
+def test_lru():
+    cache = LRUCache(max_size=2)
+    cache.set(1, 'a')
+    cache.set(2, 'b')
+    assert cache.get(1) == 'a'
+    cache.set(3, 'c')
+    assert 2 not in cache, 'Least recently used value is not evicted'
+    assert cache.get(1) == 'a' and cache.get(3) == 'c'
+    assert cache.get(2) is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_disabled_lru():
+    cache = LRUCache(max_size=0)
+    cache.set(1, 'a')
+    assert cache.get(1) is None
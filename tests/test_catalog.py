@@ -0,0 +1,52 @@
+import time
+from collections import Counter
+
+from stores.catalog import Catalog
+
+
+def test_frontier(tmp_path):
+    catalog = Catalog(str(tmp_path / 'catalog.sqlite'))
+    catalog.add_pages([('http://site/1', 'movie_list', None), ('http://site/2', 'movie_list', None)])
+    catalog.add_pages([('http://site/1', 'movie_list', None)])
+    assert len(catalog.due_pages(10)) == 2, 'Duplicate page is added'
+    catalog.page_visited('http://site/1', time.time() + 60, etag='"abc"', content_hash='hash')
+    catalog.page_failed('http://site/2', 60)
+    assert catalog.due_pages(10) == [], 'Visited page is due'
+    page = catalog.page('http://site/1')
+    assert page['etag'] == '"abc"' and page['content_hash'] == 'hash'
+    assert catalog.page('http://site/2')['errors'] == 1
+    catalog.close()
+
+
+def test_records(tmp_path):
+    file_path = str(tmp_path / 'catalog.sqlite')
+    catalog = Catalog(file_path)
+    assert catalog.random('movie') is None, 'Empty catalog returns record'
+    catalog.upsert_records('movie', [
+        {'url': 'http://site/m/1', 'title': 'Первый', 'year': 1995},
+        {'url': 'http://site/m/2', 'title': 'Второй', 'year': 2005},
+    ])
+    catalog.upsert_records('movie', [{'url': 'http://site/m/1', 'title': 'Первый фильм', 'year': 1995}])
+    catalog.upsert_records('book', [{'url': 'http://site/b/1', 'title': 'Книга', 'genre': 'poetry'}])
+    catalog.close()
+    catalog = Catalog(file_path)
+    assert catalog.count('movie') == 2, 'Records are not kept after restart'
+    assert catalog.random('movie', year_from=1990, year_to=2000)['title'] == 'Первый фильм'
+    assert catalog.random('movie', year_from=2010, year_to=2020) is None
+    assert catalog.random('book', genre='poetry')['url'] == 'http://site/b/1'
+    assert catalog.random('book', genre='prose') is None
+    catalog.close()
+
+
+def test_random_covers_filter(tmp_path):
+    catalog = Catalog(str(tmp_path / 'catalog.sqlite'))
+    for i in range(10):
+        catalog.upsert_records('movie', [{'url': f'http://site/m/{i}', 'year': 1990 + i}])
+        catalog.upsert_records('book', [{'url': f'http://site/b/{i}', 'genre': 'poetry'}])
+    urls = Counter(catalog.random('movie', year_from=1992, year_to=1994)['url'] for _ in range(3000))
+    assert set(urls) == {'http://site/m/2', 'http://site/m/3', 'http://site/m/4'}, 'Random record is out of filter'
+    assert min(urls.values()) > 800, f'Records are not picked uniformly: {urls}'
+    catalog.upsert_records('movie', [{'url': 'http://site/m/new', 'year': 1993}])
+    urls = {catalog.random('movie', year_from=1992, year_to=1994)['url'] for _ in range(200)}
+    assert 'http://site/m/new' in urls, 'Index is not reloaded after records are changed'
+    catalog.close()
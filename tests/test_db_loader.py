@@ -1,11 +1,15 @@
+import threading
+
 import pytest
 from sqlalchemy import exc
 
+import config
 from loaders.db_loader import DBLoader
-from extentions import db
+from extentions import db, session_scope
 from users import tbot_users, MemUsers
 from TBot import TBot
 from loaders.loader import LoaderResponse
+from write_behind import WriteBehind
 
 
 class Message:
@@ -38,6 +42,28 @@ def test_db_connection():
         assert False, 'Database error'
 
 
+def test_session_scope():
+    sessions = []
+    # оба потока живы, пока берут сессию, иначе идентификатор потока может быть переиспользован
+    barrier = threading.Barrier(2)
+
+    def unit_of_work():
+        with session_scope() as session:
+            sessions.append(session())
+            barrier.wait(timeout=5)
+
+    threads = [threading.Thread(target=unit_of_work) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sessions[0] is not sessions[1], 'Threads share the same session'
+    with session_scope() as session:
+        first = session()
+    with session_scope() as session:
+        assert session() is not first, 'Session is not removed after unit of work'
+
+
 def test_get_users():
     dl = DBLoader()
     dl.get_users_from_db()
@@ -62,3 +88,77 @@ def test_replace(disable_db_commit):
     tbot.init_bot()
     res = tbot.replace(msg)
     assert type(res) is LoaderResponse, 'Error replace data type'
+
+
+def stop_workers(dl: DBLoader) -> None:
+    for worker in (dl.spool_worker, dl.poems_worker, dl.new_users, dl.request_log, dl.profile_updates,
+                   dl.pool_metrics_worker, dl.users_sync_worker):
+        worker.stop()
+
+
+def test_profile_updates_coalesced(disable_db_commit, monkeypatch, tmp_path):
+    executed = []
+    _execute = db.session.execute
+
+    def execute(statement, params=None, *args, **kwargs):
+        executed.append(params)
+        return _execute(statement, params, *args, **kwargs)
+
+    # журнал прошлых запусков не пуст: записи ушли бы в него, а не в БД
+    monkeypatch.setattr(config, 'SPOOL_FILE', str(tmp_path / 'spool.jsonl'), raising=False)
+    monkeypatch.setattr(config, 'DEAD_LETTER_FILE', str(tmp_path / 'dead_letters.jsonl'), raising=False)
+    dl = DBLoader()
+    try:
+        monkeypatch.setattr(db.session, 'execute', execute)
+        dl.profile_updates.add({'chat_id': '12345678', 'login': 'old', 'first_name': 'Old'})
+        dl.profile_updates.add({'chat_id': '87654321', 'login': 'other', 'first_name': 'Other'})
+        dl.profile_updates.add({'chat_id': '12345678', 'login': 'new', 'first_name': 'New'})
+        dl.profile_updates.flush()
+        assert executed == [[
+            {'b_chat_id': '12345678', 'b_login': 'new', 'b_first_name': 'New'},
+            {'b_chat_id': '87654321', 'b_login': 'other', 'b_first_name': 'Other'},
+        ]], 'Updates of the same user are not coalesced into one row with the last values'
+    finally:
+        stop_workers(dl)
+
+
+def test_add_user_in_background(monkeypatch):
+    monkeypatch.setattr(config, 'USE_DB', True)
+    writes = []
+    dl = DBLoader.__new__(DBLoader)
+    dl._write = lambda kind, data: writes.append((kind, data))
+    dl.new_users = WriteBehind('new_users', dl._write_new_users)
+    chat_id = '12345679'
+    dl.add_user(chat_id=chat_id, login='test_login', first_name='test', privileges=30)
+    try:
+        assert tbot_users(chat_id) is not None, 'User is not added to memory'
+        assert writes == [], 'User is written to DB by handler'
+        request = {'chat_id': chat_id, 'date_ins': '2026-01-01 00:00:00', 'action': 'poem'}
+        dl._write_log_requests([request])
+        user = {'chat_id': chat_id, 'login': 'test_login', 'first_name': 'test', 'privileges': 30}
+        assert writes == [('add_users', [user]), ('log_requests', [request])], 'User is written after its requests'
+    finally:
+        tbot_users.del_user(chat_id)
+
+
+def test_divination_pool_from_threads():
+    dl = DBLoader.__new__(DBLoader)
+    dl._divination_lock = threading.Lock()
+    dl.poem_quatrains = {poem_id: [(0, 10)] for poem_id in range(200)}
+    dl.divination_ids = list(range(200))
+    dl._get_poem_by_id = lambda poem_id: None  # все стихи удалены
+    results, errors = [], []
+
+    def divination():
+        try:
+            results.append(dl._get_divination_poem())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=divination) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, f'Parallel removal of deleted poems fails: {errors}'
+    assert results == [None] * 8 and dl.divination_ids == []
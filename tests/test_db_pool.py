@@ -0,0 +1,76 @@
+from sqlalchemy import exc
+
+from db_pool import PoolMetrics, retry_on_disconnect, pool_metrics
+from deadline import Deadline
+
+
+class Session:
+    def __init__(self):
+        self.removed = 0
+
+    def rollback(self):
+        pass
+
+    def remove(self):
+        self.removed += 1
+
+
+class Lost(Exception):
+    errno = 2013
+
+
+def test_retry_on_disconnect():
+    session = Session()
+    calls = []
+
+    @retry_on_disconnect(session, retries=2, backoff=0)
+    def query():
+        calls.append(1)
+        if len(calls) < 3:
+            raise exc.OperationalError('select 1', {}, Lost())
+        return 'ok'
+
+    retries = pool_metrics.retries
+    assert query() == 'ok'
+    assert session.removed == 2, 'Session is not reset before retry'
+    assert pool_metrics.retries == retries + 2
+
+
+def test_not_disconnect_is_raised():
+    @retry_on_disconnect(Session(), backoff=0)
+    def query():
+        raise exc.OperationalError('select 1', {}, Exception('syntax error'))
+
+    try:
+        query()
+    except exc.OperationalError:
+        pass
+    else:
+        assert False, 'Error is not raised'
+
+
+def test_no_retry_after_deadline():
+    calls = []
+
+    @retry_on_disconnect(Session(), retries=2, backoff=0.2)
+    def query():
+        calls.append(1)
+        raise exc.OperationalError('select 1', {}, Lost())
+
+    try:
+        with Deadline(0.1):
+            query()
+    except exc.OperationalError:
+        pass
+    else:
+        assert False, 'Error is not raised'
+    assert len(calls) == 1, 'Query is retried after deadline'
+
+
+def test_metrics():
+    metrics = PoolMetrics()
+    metrics.add_wait(0.01)
+    metrics.add_wait(0.03)
+    metrics.add_timeout()
+    assert metrics.as_dict() == {'checkouts': 2, 'wait_avg_ms': 20.0, 'wait_max_ms': 30.0,
+                                 'timeouts': 1, 'retries': 0}
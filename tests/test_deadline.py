@@ -0,0 +1,19 @@
+from deadline import Deadline
+
+
+def test_deadline():
+    deadline = Deadline(10)
+    assert not deadline.expired
+    assert deadline.timeout(0.1) == 0.1, 'Timeout is more than default'
+    assert Deadline.current() is None
+    with deadline:
+        assert Deadline.current() is deadline, 'Deadline is not activated'
+        assert Deadline.current_timeout(60) <= 10, 'Timeout is more than remaining time'
+    assert Deadline.current() is None, 'Deadline is not deactivated'
+
+
+def test_expired_deadline():
+    deadline = Deadline(0)
+    assert deadline.expired
+    assert deadline.remaining() == 0
+    assert deadline.timeout() == Deadline.min_timeout
@@ -0,0 +1,15 @@
+from send_service import DevNotifier
+
+
+def test_digest():
+    sent = []
+    notifier = DevNotifier(channels=('telegram',), send=lambda data, by: sent.append((data, by)))
+    notifier.notify('TBot NEW USER', 'user 1')
+    notifier.notify('TBot NEW USER', 'user 2')
+    notifier.notify('TBot DB connection error', 'error')
+    assert not sent, 'Alert is sent synchronously'
+    notifier._alerts.flush()
+    assert sent == [
+        ({'subject': 'TBot NEW USER (2)', 'text': 'user 1\nuser 2'}, 'telegram'),
+        ({'subject': 'TBot DB connection error', 'text': 'error'}, 'telegram'),
+    ]
@@ -0,0 +1,22 @@
+from stores.exchange_rates import ExchangeRates
+
+
+def test_add():
+    rates = ExchangeRates(['USD', 'EUR'], max_size=2)
+    assert rates.latest() == {}
+    assert rates.add(1, {'USD': 73.6, 'EUR': 83.1})
+    assert not rates.add(2, {'USD': 73.6, 'EUR': 83.1}), 'Same rates are added'
+    assert rates.add(3, {'USD': 74.0}), 'Partial rates are not added'
+    assert rates.latest() == {'USD': 74.0, 'EUR': 83.1}, 'Last rate is not carried forward'
+    assert rates.add(4, {'USD': 75.0, 'EUR': 84.0})
+    times, series = rates.series()
+    assert times == [3, 4], 'Max size is exceeded'
+    assert series['USD'] == [74.0, 75.0]
+    assert rates.latest() == {'USD': 75.0, 'EUR': 84.0}
+
+
+def test_unknown_currency():
+    rates = ExchangeRates(['USD', 'EUR'])
+    assert rates.add(1, {'USD': 73.6})
+    assert rates.latest() == {'USD': 73.6}, 'Missing currency is shown'
+    assert not rates.add(2, {'GBP': 100.0}), 'Not configured currency is added'
@@ -0,0 +1,23 @@
+import threading
+
+from extentions import SQLAlchemy
+
+
+def test_standalone_sqlalchemy():
+    db = SQLAlchemy('sqlite://', session_options={'scopefunc': threading.get_ident, 'expire_on_commit': False})
+
+    class Item(db.Model):
+        __tablename__ = 'items'
+
+        i_id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(100))
+
+    assert db._engine is None, 'Engine is created before the first use'
+    db.create_all()
+    item = Item(i_id=1, name='first')
+    db.session.add(item)
+    db.session.commit()
+    db.session.remove()
+    assert item.name == 'first', 'Attributes are expired after commit'
+    assert Item.query.filter(Item.name == 'first').one().i_id == 1
+    db.session.remove()
@@ -0,0 +1,29 @@
+from stores.file_ids import FileIds
+
+
+def test_discard(tmp_path):
+    file_path = str(tmp_path / 'file_ids.json')
+    ids = FileIds(file_path)
+    ids.set('exchange_chart', 'AgAD1')
+    ids.discard('exchange_chart')
+    ids.discard('unknown')
+    assert ids.get('exchange_chart') is None
+    assert FileIds(file_path).get('exchange_chart') is None, 'Discarded file_id is kept in file'
+
+
+def test_save_and_load(tmp_path):
+    file_path = str(tmp_path / 'db' / 'file_ids.json')
+    ids = FileIds(file_path)
+    assert ids.get('poem') is None
+    ids.set('poem', 'AgAD1')
+    ids.set('poem', 'AgAD2')
+    assert FileIds(file_path).get('poem') == 'AgAD2', 'file_id is not saved'
+
+
+def test_broken_file(tmp_path):
+    file_path = tmp_path / 'file_ids.json'
+    file_path.write_text('{broken')
+    ids = FileIds(str(file_path))
+    assert ids.get('poem') is None, 'Broken file is not ignored'
+    ids.set('poem', 'AgAD1')
+    assert FileIds(str(file_path)).get('poem') == 'AgAD1'
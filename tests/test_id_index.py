@@ -0,0 +1,50 @@
+import threading
+
+from stores.id_index import IdIndex
+
+
+def test_random_without_misses():
+    rows = {1, 5, 9}
+    loads = []
+
+    def load():
+        loads.append(1)
+        return sorted(rows)
+
+    index = IdIndex('test', load, lambda: (len(rows), max(rows, default=None)))
+    assert {index.random() for _ in range(100)} == {1, 5, 9}, 'Not existing id is returned'
+    index.refresh()
+    assert len(loads) == 1, 'Not changed index is reloaded'
+    rows.add(12)
+    index.refresh()
+    assert len(index) == 4 and len(loads) == 2, 'Changed index is not reloaded'
+    index.discard(5)
+    assert 5 not in {index.random() for _ in range(100)}, 'Discarded id is returned'
+
+
+def test_empty():
+    index = IdIndex('test', list, lambda: (0, None))
+    assert index.random() is None
+
+
+def test_random_during_reload():
+    rows = [1, 2]
+    loading = threading.Event()
+    release = threading.Event()
+
+    def load():
+        if len(rows) > 2:
+            loading.set()
+            release.wait(5)
+        return list(rows)
+
+    index = IdIndex('test', load, lambda: len(rows))
+    assert index.random() in (1, 2)
+    rows.append(3)
+    thread = threading.Thread(target=index.refresh)
+    thread.start()
+    assert loading.wait(5)
+    assert index.random() in (1, 2), 'Random is blocked or broken by reloading'
+    release.set()
+    thread.join(5)
+    assert len(index) == 3, 'Index is not reloaded'
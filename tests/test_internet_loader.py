@@ -46,7 +46,6 @@ async def test_routes():
     """Test all the routes"""
     il = InternetLoader()
     tasks = []
-    il.async_url_data = []
     headers = {
         'User-Agent': 'Mozilla/5.0',
         'Connection': 'close'
@@ -59,9 +58,9 @@ async def test_routes():
                 continue
             url = check_config_attribute(name)
             tasks.append(asyncio.create_task(il._get_url(session, url)))
-        await asyncio.gather(*tasks)
-        for res in il.async_url_data:
-            assert res.status == 200
+        for res in await asyncio.gather(*tasks):
+            if res is not None:
+                assert res.status == 200
 
 
 def test_get_exchange():
@@ -0,0 +1,42 @@
+import pytest
+
+from deadline import Deadline
+from loaders.loader import Loader, LoaderRequest, LoaderResponse, check_permission
+
+
+class Handlers(Loader):
+
+    @check_permission()
+    def sync_handler(self, request: LoaderRequest) -> LoaderResponse:
+        return LoaderResponse(text=str(Deadline.current() is request.deadline))
+
+    @check_permission()
+    async def async_handler(self, request: LoaderRequest) -> LoaderResponse:
+        return LoaderResponse(text=str(Deadline.current() is request.deadline))
+
+    @check_permission(needed_level='root')
+    async def root_handler(self, request: LoaderRequest) -> LoaderResponse:
+        return LoaderResponse(text='root')
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    monkeypatch.setattr(Loader, 'privileges_levels', {'regular': 30, 'root': 50})
+    return Handlers()
+
+
+def test_sync_deadline(handlers):
+    request = LoaderRequest(text='', privileges=30, chat_id='1', deadline=Deadline(10))
+    assert handlers.sync_handler(request).text == 'True', 'Deadline is not activated'
+    assert Deadline.current() is None, 'Deadline is not deactivated'
+
+
+@pytest.mark.asyncio
+async def test_async_deadline(handlers):
+    request = LoaderRequest(text='', privileges=30, chat_id='1', deadline=Deadline(10))
+    coroutine = handlers.async_handler(request)
+    assert Deadline.current() is None, 'Deadline is activated before coroutine is run'
+    assert (await coroutine).text == 'True', 'Deadline is not activated in coroutine'
+    assert Deadline.current() is None, 'Deadline is not deactivated'
+    denied = await handlers.root_handler(LoaderRequest(text='', privileges=30, chat_id='1'))
+    assert denied.text == 'Permission denied'
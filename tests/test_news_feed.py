@@ -0,0 +1,12 @@
+from stores.news_feed import NewsFeed
+
+
+def test_add_and_latest():
+    feed = NewsFeed(max_size=3)
+    assert feed.add([('/b', 'b'), ('/a', 'a')]) == 2
+    assert feed.add([('/c', 'c'), ('/b', 'b')]) == 1, 'Duplicate is added'
+    assert feed.latest(10) == ['c', 'b', 'a'], 'Wrong order of headlines'
+    feed.add([('/e', 'e'), ('/d', 'd')])
+    assert len(feed) == 3, 'Max size is exceeded'
+    assert feed.latest(2) == ['e', 'd']
+    assert '/a' not in feed, 'Old headline is not removed'
@@ -0,0 +1,37 @@
+import io
+
+from PIL import Image
+
+from stores.painting_catalog import PaintingCatalog
+
+
+def image_bytes(width: int, height: int) -> bytes:
+    file = io.BytesIO()
+    Image.new('RGBA', (width, height), 'red').save(file, 'PNG')
+    return file.getvalue()
+
+
+def test_add_and_random(tmp_path):
+    catalog = PaintingCatalog(str(tmp_path))
+    catalog.add('http://site/p/1', 'http://site/i/1.png', 'Первая')
+    catalog.add('http://site/p/2', 'http://site/i/2.png', 'Вторая')
+    assert catalog.random() is None, 'Painting without image is picked'
+    assert len(catalog.without_image()) == 2
+    catalog.save_image('http://site/p/1', image_bytes(2000, 1000))
+    assert [painting['page'] for painting in catalog.without_image()] == ['http://site/p/2']
+    painting = catalog.random()
+    assert painting['title'] == 'Первая'
+    with Image.open(painting['image_path']) as image:
+        assert max(image.size) == PaintingCatalog.max_image_side, 'Image is not downscaled'
+        assert image.mode == 'RGB'
+
+
+def test_save_and_load(tmp_path):
+    catalog = PaintingCatalog(str(tmp_path))
+    catalog.add('http://site/p/1', 'http://site/i/1.png', 'Первая')
+    catalog.add('http://site/p/2', 'http://site/i/2.png', 'Вторая')
+    catalog.save_image('http://site/p/1', image_bytes(10, 10))
+    catalog.save()
+    loaded = PaintingCatalog(str(tmp_path))
+    assert len(loaded) == 2 and 'http://site/p/2' in loaded, 'Catalog is not loaded'
+    assert loaded.random()['page'] == 'http://site/p/1', 'Downloaded images are not loaded'
@@ -0,0 +1,31 @@
+from stores.phone_index import PhoneIndex
+
+
+RANGES = (
+    'АВС/ DEF;От;До;Емкость;Оператор;Регион\n'
+    '916;0;9999999;10000000;ПАО "Мобильные ТелеСистемы";г. Москва и Московская область\n'
+    '900;0;99999;100000;ООО "Т2 Мобайл";Краснодарский край\n'
+    '900;100000;199999;100000;ООО "Т2 Мобайл";Ростовская обл.\n'
+)
+
+
+def test_find(tmp_path):
+    file_path = tmp_path / 'DEF-9xx.csv'
+    file_path.write_text(RANGES, encoding='utf-8')
+    index = PhoneIndex()
+    index.load(str(file_path))
+    assert len(index) == 3, 'Wrong count of ranges'
+    info = index.find('89000150000')
+    assert info['Регион'] == 'Ростовская обл.'
+    assert info['Изначальный оператор'] == 'ООО "Т2 Мобайл"'
+    assert index.find('89161234567')['Страна'] == 'Россия'
+    assert index.find('89010000000') is None, 'Number out of ranges is found'
+    assert index.find('8900') is None, 'Wrong number is found'
+
+
+def test_cp1251_file(tmp_path):
+    file_path = tmp_path / 'DEF-9xx.csv'
+    file_path.write_bytes(RANGES.encode('cp1251'))
+    index = PhoneIndex()
+    index.load(str(file_path), str(tmp_path / 'not_exists.csv'))
+    assert index.find('89000000001')['Регион'] == 'Краснодарский край'
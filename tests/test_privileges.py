@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+from sqlalchemy import exc
+
+import config
+from loaders.privileges import Privileges
+
+Row = namedtuple('Row', ['p_id', 'name', 'value'])
+
+
+def test_lazy_load(monkeypatch):
+    calls = []
+
+    def query():
+        calls.append(1)
+        return [Row(1, 'regular', 30), Row(2, 'root', 50)]
+
+    privileges = Privileges()
+    monkeypatch.setattr(privileges, '_query', query)
+    monkeypatch.setattr(config, 'USE_DB', True)
+    assert not calls, 'Privileges are loaded before use'
+    assert privileges['root'] == 50
+    assert privileges.id_of(30) == 1 and privileges.value_of(2) == 50
+    assert len(calls) == 1, 'Privileges are not cached'
+
+
+def test_fallback_and_retry(monkeypatch):
+    rows = []
+
+    def query():
+        if not rows:
+            raise exc.DatabaseError('select', {}, Exception('no connection'))
+        return rows
+
+    privileges = Privileges(retries=2, backoff=0, retry_interval=0)
+    monkeypatch.setattr(privileges, '_query', query)
+    monkeypatch.setattr(config, 'USE_DB', True)
+    assert dict(privileges) == config.PRIVILEGES_LEVELS, 'Config levels are not used'
+    rows.append(Row(1, 'regular', 31))
+    assert privileges['regular'] == 31, 'Loading is not retried'
+
+
+def test_unknown_key_while_db_is_down(monkeypatch):
+    calls = []
+
+    def query():
+        calls.append(1)
+        raise exc.DatabaseError('select', {}, Exception('no connection'))
+
+    privileges = Privileges(retries=3, backoff=10, retry_interval=60)
+    monkeypatch.setattr(privileges, '_query', query)
+    monkeypatch.setattr(config, 'USE_DB', True)
+    monkeypatch.setattr(config, 'PRIVILEGES_LEVELS', {'regular': 30}, raising=False)
+    monkeypatch.setattr('time.sleep', lambda seconds: None)
+    privileges['regular']
+    loads = len(calls)
+    assert privileges.id_of(30) is None and privileges.value_of(1) is None
+    assert len(calls) == loads, 'Unknown keys reload privileges before retry interval'
@@ -0,0 +1,30 @@
+from stores.quatrains import quatrain_offsets, quatrains_count, is_divination_poem, get_quatrain
+
+STANZAS = 'Мороз и солнце;\nДень чудесный!\nЕще ты дремлешь,\nДруг прелестный\n\n' \
+          'Вечор, ты помнишь,\nВьюга злилась,\nНа мутном небе\nМгла носилась;\n'
+
+
+def test_stanzas():
+    offsets = quatrain_offsets(STANZAS)
+    assert quatrains_count(offsets) == 2
+    assert is_divination_poem(offsets)
+    assert get_quatrain(STANZAS, offsets, 2) == 'Вечор, ты помнишь,\nВьюга злилась,\nНа мутном небе\nМгла носилась;'
+
+
+def test_lines_without_stanzas():
+    text = STANZAS.replace('\n\n', '\n') + 'Лишняя строка'
+    offsets = quatrain_offsets(text)
+    assert quatrains_count(offsets) == 2, 'Poem without empty lines is not split by 4 lines'
+    assert get_quatrain(text, offsets, 1) == 'Мороз и солнце;\nДень чудесный!\nЕще ты дремлешь,\nДруг прелестный'
+
+
+def test_not_divination_poem():
+    text = 'Одна строка\nИ еще одна'
+    offsets = quatrain_offsets(text)
+    assert not is_divination_poem(offsets)
+    try:
+        get_quatrain(text, offsets, 1)
+    except IndexError:
+        pass
+    else:
+        assert False, 'Not existing quatrain is returned'
@@ -0,0 +1,16 @@
+from sqlalchemy import create_engine
+
+import models as md
+import sqlite_backend
+import query_plans
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    url = f'sqlite:///{tmp_path / "tbot.db"}'
+    engine = create_engine(url, **sqlite_backend.engine_options(url, {}))
+    md.Users.__table__.create(engine)
+    md.LogRequests.__table__.create(engine)
+    with engine.connect() as connection:
+        for name, (uses_index, plan) in query_plans.check(connection).items():
+            assert uses_index, f'{name} does not use {query_plans.HOT_QUERIES_INDEXES[name]}: {plan}'
+    engine.dispose()
@@ -0,0 +1,51 @@
+import time
+import itertools
+
+from stores.random_buffer import RandomBuffer
+
+
+def wait_for_depth(buffer, command, key, depth):
+    for _ in range(100):
+        if buffer.depth(command, key) == depth:
+            return
+        time.sleep(0.01)
+
+
+def test_pop_and_refill():
+    counter = itertools.count()
+    buffer = RandomBuffer(size=2)
+    buffer.register('movie', lambda years: f'{years} {next(counter)}')
+    buffer.start()
+    assert buffer.pop('movie', (1990, 2000)) is None, 'Empty buffer returns item'
+    wait_for_depth(buffer, 'movie', (1990, 2000), 2)
+    assert buffer.depth('movie', (1990, 2000)) == 2, 'Buffer is not refilled'
+    assert buffer.pop('movie', (1990, 2000)) == '(1990, 2000) 0'
+    assert buffer.depth('movie', (2000, 2010)) == 0, 'Keys are mixed'
+    metrics = buffer.metrics()
+    assert metrics['underflows'] == {'movie': 1}
+    assert metrics['hits'] == {'movie': 1}
+
+
+def test_producer_error():
+    buffer = RandomBuffer(size=2)
+
+    def bad_producer(key):
+        raise ValueError('site is down')
+
+    buffer.register('food', bad_producer)
+    buffer.start()
+    assert buffer.pop('food') is None
+    time.sleep(0.05)
+    assert buffer.depth('food') == 0
+    assert buffer.pop('food') is None, 'Filler is dead after error'
+
+
+def test_not_buffered_key():
+    calls = []
+    buffer = RandomBuffer(size=2)
+    buffer.register('movie', calls.append, keys=[(1990, 2000)])
+    buffer.start()
+    assert buffer.pop('movie', (1991, 1992)) is None
+    time.sleep(0.05)
+    assert calls == [], 'Ad-hoc key is prefetched'
+    assert buffer.metrics()['depth'] == {}, 'Ad-hoc key is kept in buffer'
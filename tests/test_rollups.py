@@ -0,0 +1,36 @@
+import datetime
+from collections import Counter
+
+import models as md
+from rollups import count_requests, upsert_statements, stat_daily_query, stat_actions_query, stat_users_query
+
+
+def test_count_requests():
+    day = datetime.datetime(2022, 5, 1, 12, 30)
+    counts = count_requests([
+        {'chat_id': '1', 'date_ins': day, 'action': 'poem'},
+        {'chat_id': '1', 'date_ins': day.isoformat(), 'action': 'poem'},
+        {'chat_id': '2', 'date_ins': day + datetime.timedelta(days=1), 'action': 'news'},
+        {'chat_id': '2', 'date_ins': day, 'action': 'hello'},
+        {'chat_id': '2', 'date_ins': day, 'action': None},
+    ])
+    assert counts[md.StatDaily] == {(day.date(),): 2, (day.date() + datetime.timedelta(days=1),): 1}
+    assert counts[md.StatActions][(day.date(), 'poem')] == 2
+    assert counts[md.StatUsers] == {(day.date(), '1'): 2, (day.date() + datetime.timedelta(days=1), '2'): 1}
+
+
+def test_upsert_statements():
+    day = datetime.date(2022, 5, 1)
+    counts = Counter({(day, 'poem'): 2, (day, 'news'): 1})
+    assert len(upsert_statements(md.StatActions, counts, 'sqlite')) == 1, 'SQLite must get one upsert'
+    assert all(insert is None for _, insert in upsert_statements(md.StatActions, counts, 'mysql'))
+    generic = upsert_statements(md.StatActions, counts, 'postgresql')
+    assert len(generic) == 2 and all(insert is not None for _, insert in generic), 'UPDATE and INSERT for each row'
+    assert upsert_statements(md.StatActions, Counter(), 'sqlite') == []
+
+
+def test_stat_queries():
+    day = datetime.date(2022, 5, 1)
+    for build in (stat_daily_query, stat_actions_query, stat_users_query):
+        assert 'WHERE' not in str(build()), f'{build.__name__}: all history is filtered'
+        assert 'WHERE' in str(build(day)), f'{build.__name__}: interval is not filtered'
@@ -0,0 +1,23 @@
+from stores.search_index import SearchIndex, stem
+
+
+def test_stem():
+    assert stem('осенний') == stem('осенние') == stem('осень')
+    assert stem('берёзой') == stem('березы')
+    assert stem('стихотворения') == stem('стихотворение')
+
+
+def test_search():
+    index = SearchIndex(weights={'author': 3, 'name': 2, 'text': 1})
+    index.add(1, {'author': 'Есенин', 'name': 'Берёза', 'text': 'Белая берёза под моим окном'})
+    index.add(2, {'author': 'Пушкин', 'name': 'Осень', 'text': 'Октябрь уж наступил, уж роща отряхает'})
+    index.add(3, {'author': 'Тютчев', 'name': 'Есть в осени первоначальной', 'text': 'Короткая, но дивная пора'})
+    assert index.search('осенний') == [2, 3], 'Name is not ranked by weight'
+    assert index.search('Есенин березы') == [1]
+    assert index.search('Пушкин береза') == [1, 2], 'No results for partial match'
+    assert index.search('осень', limit=1) == [2]
+    assert index.search('зима') == []
+    index.add(2, {'author': 'Пушкин', 'name': 'Зима', 'text': 'Зима!.. Крестьянин, торжествуя'})
+    assert index.search('осень') == [3], 'Replaced document is found'
+    index.remove(3)
+    assert index.search('осень') == [] and len(index) == 2
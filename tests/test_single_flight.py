@@ -0,0 +1,60 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_do():
+    sf = SingleFlight()
+    calls = []
+    results = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(sf.do('url', slow_call))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1, 'Call is not coalesced'
+    assert len(set(map(id, results))) == 1, 'Result is not shared'
+    assert not len(sf), 'Finished call is not removed'
+
+
+def test_do_exception():
+    sf = SingleFlight()
+
+    def bad_call():
+        raise ValueError('bad')
+
+    with pytest.raises(ValueError):
+        sf.do('url', bad_call)
+    assert sf.do('url', lambda: 1) == 1, 'Failed call is cached'
+
+
+def test_do_async_in_different_loops():
+    sf = SingleFlight()
+    calls = []
+    results = []
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return 'page'
+
+    def run():
+        results.append(asyncio.run(sf.do_async('url', slow_call)))
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1, 'Call is not coalesced'
+    assert results == ['page'] * 3
@@ -0,0 +1,61 @@
+import datetime
+
+from stores.spool import Spool
+
+
+def test_replay_in_order(tmp_path):
+    file_path = str(tmp_path / 'spool.jsonl')
+    spool = Spool(file_path, sync_every=2)
+    spool.append('log', {'chat_id': '1', 'date_ins': datetime.datetime(2022, 1, 1, 10, 0)})
+    spool.append('user', {'chat_id': '2'})
+    spool.append('log', {'chat_id': '3', 'date_ins': None})
+    spool.close()
+    spool = Spool(file_path)
+    assert len(spool) == 3, 'Writes are not kept after restart'
+
+    applied = []
+
+    def fail(data):
+        raise ConnectionError
+
+    assert spool.replay({'log': applied.append, 'user': fail}, (ConnectionError,)) == 1
+    assert applied == [{'chat_id': '1', 'date_ins': '2022-01-01T10:00:00'}]
+    assert len(spool) == 2, 'Failed write is removed'
+    assert spool.replay({'log': applied.append, 'user': applied.append}) == 2
+    assert [data['chat_id'] for data in applied] == ['1', '2', '3'], 'Wrong order of writes'
+    assert len(spool) == 0
+    spool.close()
+
+
+def test_drop_bad_write(tmp_path):
+    spool = Spool(str(tmp_path / 'spool.jsonl'))
+    spool.append('bad', {})
+    spool.append('log', {'chat_id': '1'})
+    applied = []
+
+    def bad(data):
+        raise ValueError
+
+    rejected = []
+    assert spool.replay({'bad': bad, 'log': applied.append}, (ConnectionError,),
+                        lambda kind, data, error: rejected.append((kind, type(error)))) == 1
+    assert applied == [{'chat_id': '1'}]
+    assert rejected == [('bad', ValueError)], 'Rejected write is not passed to dead letters'
+    assert len(spool) == 0, 'Bad write blocks spool'
+    spool.close()
+
+
+def test_append_during_replay(tmp_path):
+    spool = Spool(str(tmp_path / 'spool.jsonl'))
+    spool.append('log', {'chat_id': '1'})
+    applied = []
+
+    def log(data):
+        applied.append(data)
+        spool.append('log', {'chat_id': '2'})  # запись во время воспроизведения не блокируется
+
+    assert spool.replay({'log': log}) == 1
+    assert len(spool) == 1, 'Write appended during replay is lost'
+    assert spool.replay({'log': applied.append}) == 1
+    assert [data['chat_id'] for data in applied] == ['1', '2']
+    spool.close()
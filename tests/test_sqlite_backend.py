@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+import models as md
+import sqlite_backend
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine('sqlite://', **sqlite_backend.engine_options(f'sqlite:///{tmp_path / "tbot.db"}', {}))
+    md.Poems.__table__.create(engine)
+    with Session(engine) as session:
+        session.execute(md.Poems.__table__.insert(), [
+            {'p_id': 1, 'author': 'Пушкин', 'name': 'Осень', 'text': 'Октябрь уж наступил'},
+            {'p_id': 2, 'author': 'Есенин', 'name': 'Берёза', 'text': 'Белая берёза под моим окном'},
+        ])
+        sqlite_backend.create_fts(session)
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_pragmas(session):
+    assert session.execute(text('PRAGMA TBot.journal_mode')).scalar() == 'wal'
+    assert session.execute(text('PRAGMA foreign_keys')).scalar() == 1
+
+
+def test_fts_query():
+    assert sqlite_backend.fts_query('осенний лес, осень') == '"осен"* OR "лес"*'
+    assert sqlite_backend.fts_query('!!!') is None
+
+
+def test_search_poems(session):
+    assert sqlite_backend.search_poems(session, 'осенний', 10) == [1]
+    session.execute(md.Poems.__table__.insert(), [{'p_id': 3, 'author': 'Блок', 'name': 'Осенний вечер', 'text': ''}])
+    session.execute(md.Poems.__table__.update().where(md.Poems.p_id == 1).values(name='Октябрь'))
+    assert sqlite_backend.search_poems(session, 'осенний', 10) == [3], 'FTS index is not updated by triggers'
+    assert sqlite_backend.search_poems(session, 'берёзы Есенина', 10) == [2]
+
+
+def test_poems_updated_at(session):
+    poems = md.Poems.__table__
+    session.execute(text(sqlite_backend.POEMS_UPDATED_AT_TRIGGER))
+    session.execute(poems.update().values(updated_at=datetime.datetime(2000, 1, 1)))
+    session.execute(poems.update().where(poems.c.p_id == 1).values(text='Октябрь уж наступил, уж роща отряхает'))
+    updated = dict(session.execute(select(poems.c.p_id, poems.c.updated_at)).all())
+    assert updated[1].year > 2000, 'updated_at is not changed by edit'
+    assert updated[2].year == 2000, 'updated_at of not edited poem is changed'
@@ -0,0 +1,37 @@
+from users import MemUsers
+
+
+def test_apply_users():
+    users = MemUsers()
+    users.add_users([{'chat_id': '1', 'login': 'a', 'privileges': 30, 'active': True}])
+    users('1').cache = {'poem': 'cached'}
+    before = users._users
+    assert users.apply_users([{'chat_id': '1', 'login': 'a', 'privileges': 30, 'active': True}]) == 0
+    assert users._users is before, 'Users are replaced without changes'
+    changed = users.apply_users([
+        {'chat_id': '1', 'login': 'b', 'privileges': 50, 'active': True},
+        {'chat_id': '2', 'login': 'c', 'privileges': 30, 'active': True},
+    ])
+    assert changed == 2
+    assert users('1').login == 'b' and users('1').privileges == 50
+    assert users('1').cache == {'poem': 'cached'}, 'Cache of user is lost'
+    assert '2' in users
+    assert users('2').login == 'c'
+
+
+def test_apply_users_keeps_objects():
+    users = MemUsers()
+    users.add_users([{'chat_id': '1', 'login': 'a', 'first_name': 'A', 'privileges': 30, 'active': True}])
+    user = users('1')
+    changes = users.changes
+    users.update_user('1', privileges=50)
+    changed = users.apply_users(
+        [{'chat_id': '1', 'login': 'db', 'first_name': 'Db', 'privileges': 30, 'description': 'd', 'active': True}],
+        skip_fields={'1': ('login',)},
+        changed_since=changes
+    )
+    assert changed == 1
+    assert users('1') is user, 'User object is replaced'
+    assert user.login == 'a', 'Field with pending update is changed'
+    assert user.privileges == 50, 'Field changed in memory during sync is reverted'
+    assert user.first_name == 'Db' and user.description == 'd', 'Fields from DB are not merged'
@@ -0,0 +1,43 @@
+import threading
+
+from workers import PeriodicWorker
+
+
+def test_interval_and_stop():
+    calls = []
+    called = threading.Event()
+
+    def func():
+        calls.append(1)
+        called.set()
+
+    worker = PeriodicWorker('test', func, interval=60)
+    worker.start()
+    assert called.wait(1), 'Worker has not called func'
+    called.clear()
+    assert not called.wait(0.2), 'Func is called before interval'
+    worker.trigger()
+    assert called.wait(1), 'Trigger has not called func'
+    worker.stop()
+    worker.join(1)
+    assert not worker.is_alive(), 'Worker is not stopped'
+    assert len(calls) == 2
+
+
+def test_first_delay_and_error():
+    called = threading.Event()
+
+    def func():
+        called.set()
+        raise ValueError('error')
+
+    worker = PeriodicWorker('test', func, interval=0.01, first_delay=60)
+    worker.start()
+    assert not called.wait(0.2), 'Func is called before first delay'
+    worker.trigger()
+    assert called.wait(1), 'Trigger has not ended first delay'
+    called.clear()
+    assert called.wait(1), 'Worker is stopped by error'
+    worker.stop()
+    worker.join(1)
+    assert not worker.is_alive(), 'Worker is not stopped'
@@ -0,0 +1,64 @@
+import time
+
+from write_behind import WriteBehind
+
+
+def test_batches():
+    batches = []
+    log = WriteBehind('test_log', batches.append, batch_size=3, interval=60)
+    log.start()
+    log.add(1)
+    log.add(2)
+    assert batches == [], 'Batch is written before threshold'
+    log.add(3)
+    for _ in range(100):
+        if batches:
+            break
+        time.sleep(0.01)
+    assert batches == [[1, 2, 3]], 'Full batch is not written'
+    log.add(4)
+    log.stop()
+    assert batches[-1] == [4], 'Records are not flushed on stop'
+    assert len(log) == 0
+
+
+def test_write_error():
+    def write(records):
+        raise ConnectionError
+
+    log = WriteBehind('test_log', write, batch_size=10, max_size=3)
+    for i in range(5):
+        log.add(i)
+    assert log.flush() == 0
+    assert len(log) == 3, 'Records are not kept or max size is exceeded'
+    log.write = list
+    assert log.flush() == 3
+
+
+def test_rejected_records():
+    written, rejected = [], []
+
+    def write(records):
+        if 'bad' in records:
+            raise ValueError('bad record')
+        written.extend(records)
+
+    log = WriteBehind('test_log', write, is_retryable=lambda error: isinstance(error, ConnectionError),
+                      dead_letter=lambda records, error: rejected.extend(records))
+    for record in (1, 2, 'bad', 4, 5):
+        log.add(record)
+    assert log.flush() == 4
+    assert written == [1, 2, 4, 5], 'Good records of batch are not written'
+    assert rejected == ['bad'], 'Rejected record is not dead-lettered'
+    assert len(log) == 0, 'Rejected record poisons the queue'
+
+
+def test_pending():
+    seen = []
+    log = WriteBehind('test_log', lambda records: seen.append(log.pending()), batch_size=10)
+    log.add(1)
+    log.add(2)
+    assert log.pending() == [1, 2]
+    log.flush()
+    assert seen == [[1, 2]], 'Records being written are not pending'
+    assert log.pending() == []
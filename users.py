@@ -1,3 +1,5 @@
+import threading
+
 from sqlalchemy.engine.row import Row
 
 from loggers import get_logger
@@ -7,6 +9,8 @@ logger = get_logger(__name__)
 
 
 class User:
+    FIELDS = ('login', 'first_name', 'privileges', 'description', 'active')
+
     def __init__(
             self,
             chat_id: str,
@@ -48,6 +52,9 @@ class User:
 class MemUsers:
     def __init__(self):
         self._users = {}
+        self._lock = threading.Lock()  # для изменений, чтение без блокировки
+        self._changes = 0  # счетчик изменений пользователей в памяти
+        self._changed = {}  # {chat_id: {поле: номер последнего изменения}}
 
     def __call__(self, user_id=None) -> list or User:
         if not user_id:
@@ -55,36 +62,87 @@ class MemUsers:
         else:
             return self._users[user_id] if user_id in self._users.keys() else None
 
+    @staticmethod
+    def _user_from_data(user) -> User:
+        if isinstance(user, dict):
+            return User(
+                chat_id=user.get('chat_id'),
+                login=user.get('login'),
+                first_name=user.get('first_name'),
+                privileges=user.get('privileges'),
+                description=user.get('description'),
+                active=user.get('active')
+            )
+        elif isinstance(user, Row):
+            return User(
+                chat_id=user.chat_id,
+                login=user.login,
+                first_name=user.first_name,
+                privileges=user.value,
+                description=user.description,
+                active=user.active
+            )
+        raise TBotException(code=6, message=f'Bad type of user: {type(user)}')
+
     def add_users(self, user_data: list):
         if len(user_data):
-            for user in user_data:
-                if isinstance(user, dict):
-                    chat_id = user.get('chat_id')
-                    login = user.get('login')
-                    first_name = user.get('first_name')
-                    privileges = user.get('privileges')
-                    description = user.get('description')
-                    active = user.get('active')
-                elif isinstance(user, Row):
-                    chat_id = user.chat_id
-                    login = user.login
-                    first_name = user.first_name
-                    privileges = user.value
-                    description = user.description
-                    active = user.active
-                else:
-                    raise TBotException(code=6, message=f'Bad type of user: {type(user)}')
-                self.add_user(
-                    chat_id=chat_id,
-                    login=login,
-                    first_name=first_name,
-                    privileges=privileges,
-                    description=description,
-                    active=active
-                )
+            with self._lock:
+                for user in user_data:
+                    user = self._user_from_data(user)
+                    self._users[user.chat_id] = user
         else:
             raise TBotException(code=6, message=f'Input data is empty')
 
+    @property
+    def changes(self) -> int:
+        """
+        Number of the last change of users in memory, to find changes made after it
+        """
+        return self._changes
+
+    def update_user(self, chat_id: str, **fields) -> None:
+        """
+        Change fields of user in memory, the same User object is changed
+        """
+        with self._lock:
+            user = self._users[chat_id]
+            self._changes += 1
+            for field, value in fields.items():
+                setattr(user, field, value)
+                self._changed.setdefault(chat_id, {})[field] = self._changes
+
+    def apply_users(self, user_data: list, skip_fields: dict = None, changed_since: int = None) -> int:
+        """
+        Add users and merge fields of existing users into their User objects (cache and references are kept)
+        :param skip_fields: {chat_id: fields}, which are not merged (e.g. their updates are not written to DB yet)
+        :param changed_since: number of change (see changes), fields changed in memory after it are not merged
+        :return: count of changed users
+        """
+        skip_fields = skip_fields or {}
+        with self._lock:
+            added = {}
+            changed = 0
+            for user in user_data:
+                user = self._user_from_data(user)
+                old = self._users.get(user.chat_id)
+                if old is None:
+                    added[user.chat_id] = user
+                    changed += 1
+                    continue
+                skipped = set(skip_fields.get(user.chat_id, ()))
+                if changed_since is not None:
+                    skipped.update(field for field, change in self._changed.get(user.chat_id, {}).items()
+                                   if change > changed_since)
+                fields = [field for field in User.FIELDS
+                          if field not in skipped and getattr(old, field) != getattr(user, field)]
+                for field in fields:
+                    setattr(old, field, getattr(user, field))
+                changed += bool(fields)
+            if added:
+                # словарь заменяется, чтобы не менять его во время чтения без блокировки
+                self._users = {**self._users, **added}
+            return changed
+
     def add_user(
             self,
             chat_id: str,
@@ -94,20 +152,22 @@ class MemUsers:
             description: str = None,
             active: bool = True
     ):
-        self._users[chat_id] = User(
-            chat_id=chat_id,
-            login=login,
-            first_name=first_name,
-            privileges=privileges,
-            description=description,
-            active=active
-        )
+        with self._lock:
+            self._users[chat_id] = User(
+                chat_id=chat_id,
+                login=login,
+                first_name=first_name,
+                privileges=privileges,
+                description=description,
+                active=active
+            )
 
     def del_user(self, chat_id: str):
         if not chat_id:
             raise TBotException(code=2, message=f'User {chat_id} not found')
         else:
-            self._users.pop(chat_id)
+            with self._lock:
+                self._users.pop(chat_id)
 
     def all(self):
         return self._users.values()
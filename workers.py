@@ -0,0 +1,43 @@
+import threading
+import traceback
+
+from loggers import get_logger
+
+logger = get_logger(__name__)
+
+
+class PeriodicWorker(threading.Thread):
+    """
+    Daemon thread, which calls func every interval seconds
+    """
+
+    def __init__(self, name: str, func, interval: float, first_delay: float = 0):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.interval = interval
+        self.first_delay = first_delay
+        self._wake_up = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        logger.info(f'Worker {self.name} is started')
+        if self.first_delay:
+            self._wake_up.wait(self.first_delay)
+        while not self._stopped.is_set():
+            self._wake_up.clear()
+            try:
+                self.func()
+            except Exception:
+                logger.exception(f'Worker {self.name} error: {traceback.format_exc()}')
+            self._wake_up.wait(self.interval)
+        logger.info(f'Worker {self.name} is stopped')
+
+    def trigger(self) -> None:
+        """
+        Call func now, without waiting of interval
+        """
+        self._wake_up.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake_up.set()
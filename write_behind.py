@@ -0,0 +1,116 @@
+import atexit
+import threading
+import traceback
+
+from loggers import get_logger
+from workers import PeriodicWorker
+
+logger = get_logger(__name__)
+
+
+class WriteBehind:
+    """
+    Buffer of records, which are written by batches in background
+    Batch is written when batch_size records are collected or every interval seconds, and at exit
+    """
+
+    def __init__(self, name: str, write, batch_size: int = 100, interval: float = 5, max_size: int = 10000,
+                 is_retryable=None, dead_letter=None):
+        """
+        :param name: name of background worker
+        :param write: function(records), which writes batch
+        :param batch_size: count of records, which triggers writing
+        :param interval: max time between writings
+        :param max_size: max count of kept records, if writing fails (the oldest are dropped)
+        :param is_retryable: function(error) -> bool, batch failed with retryable error is kept and written later
+        (all errors are retryable by default). Batch failed with other error is split to find rejected records
+        :param dead_letter: function(records, error), which keeps rejected records, they are only logged by default
+        """
+        self.name = name
+        self.write = write
+        self.is_retryable = is_retryable or (lambda error: True)
+        self.dead_letter = dead_letter
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self._records = []
+        self._writing = []  # записи, которые пишутся сейчас
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = PeriodicWorker(name, self.flush, interval, first_delay=interval)
+
+    def start(self) -> None:
+        self._worker.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        self._worker.stop()
+        self.flush()
+
+    def add(self, record) -> None:
+        with self._lock:
+            self._records.append(record)
+            is_full = len(self._records) >= self.batch_size
+        if is_full:
+            self._worker.trigger()
+
+    def flush(self) -> int:
+        """
+        Write all buffered records
+        :return: count of written records
+        """
+        with self._flush_lock:
+            with self._lock:
+                records, self._records = self._records, []
+                self._writing = records
+            if not records:
+                return 0
+            try:
+                written, pending = self._write_split(records)
+            except BaseException:
+                with self._lock:
+                    self._writing = []
+                raise
+            with self._lock:
+                self._writing = []
+                if pending:
+                    self._records = pending + self._records
+                    dropped = len(self._records) - self.max_size
+                    if dropped > 0:
+                        del self._records[:dropped]
+                        logger.error(f'{self.name}: {dropped} records are dropped')
+            return written
+
+    def pending(self) -> list:
+        """
+        Records, which are not written yet (buffered or being written now)
+        """
+        with self._lock:
+            return self._writing + self._records
+
+    def _write_split(self, records: list) -> tuple:
+        """
+        Write records, batch failed with not retryable error is split in halves until rejected records are found
+        :return: (count of written records, records to write later)
+        """
+        try:
+            self.write(records)
+            return len(records), []
+        except Exception as e:
+            if self.is_retryable(e):
+                logger.exception(f'{self.name}: {len(records)} records are not written: {traceback.format_exc()}')
+                return 0, records
+            if len(records) == 1:
+                logger.exception(f'{self.name}: record is rejected {records[0]}: {traceback.format_exc()}')
+                if self.dead_letter is not None:
+                    self.dead_letter(records, e)
+                return 0, []
+        middle = len(records) // 2
+        written, pending = self._write_split(records[:middle])
+        if pending:
+            return written, pending + records[middle:]
+        written_tail, pending = self._write_split(records[middle:])
+        return written + written_tail, pending
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)